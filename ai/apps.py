@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class AiConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "ai"
+
+    def ready(self):
+        if settings.AI_WARMUP_ON_START:
+            from .inference import local_resources
+            from .registry import registry
+            registry.warm_up(local_resources(), background=True)
@@ -0,0 +1,95 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Collects items submitted from concurrent requests into batches of up to
+    ``max_batch_size``, waiting at most ``max_wait_ms`` after the first item, runs
+    ``process_batch`` once per batch on a background thread and hands each caller
+    its own result. ``process_batch`` takes a list of items and returns a list of
+    results in the same order.
+    """
+
+    def __init__(self, name, process_batch, max_batch_size=16, max_wait_ms=5):
+        self.name = name
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.max_batch_seen = 0
+        self.max_queue_depth = 0
+        self.queue_wait_seconds = 0.0
+        self.batch_seconds = 0.0
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f"batcher-{self.name}", daemon=True)
+                self._thread.start()
+
+    def submit(self, item, timeout=None):
+        self._ensure_started()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        depth = self._queue.qsize()
+        with self._metrics_lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+        return future.result(timeout=timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            items = [item for item, _, _ in batch]
+            try:
+                results = list(self.process_batch(items))
+                if len(results) != len(batch):
+                    # zip() would leave the callers past the shortest list waiting forever
+                    raise RuntimeError(f"{self.name} batch returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+            finished = time.perf_counter()
+            with self._metrics_lock:
+                self.batches += 1
+                self.items += len(batch)
+                self.max_batch_seen = max(self.max_batch_seen, len(batch))
+                self.queue_wait_seconds += sum(started - submitted for _, _, submitted in batch)
+                self.batch_seconds += finished - started
+
+    def metrics(self):
+        with self._metrics_lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self.max_queue_depth,
+                'batches': self.batches,
+                'items': self.items,
+                'avg_batch_size': round(self.items / self.batches, 2) if self.batches else None,
+                'max_batch_size_seen': self.max_batch_seen,
+                'avg_queue_wait_ms': round(self.queue_wait_seconds / self.items * 1000, 3) if self.items else None,
+                'avg_batch_ms': round(self.batch_seconds / self.batches * 1000, 3) if self.batches else None,
+            }
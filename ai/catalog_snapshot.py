@@ -0,0 +1,157 @@
+import re
+import threading
+from bisect import bisect_left
+
+import numpy as np
+
+_TOKEN = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+
+class CatalogSnapshot:
+    """
+    Read-only, array-backed view of ``product_list`` built once per catalog version.
+    Price and inventory live in NumPy columns with precomputed orderings, and titles
+    are indexed token -> product positions, so the fallback answers in get_insights
+    are lookups instead of scans over the product dicts.
+    """
+
+    def __init__(self, product_list):
+        self.products = list(product_list)
+        count = len(self.products)
+        self.titles_lower = [product['title'].lower() for product in self.products]
+        self.prices = np.fromiter((product['price'] for product in self.products), dtype=np.float64, count=count)
+        self.inventory = np.fromiter((product['inventory_quantity'] or 0 for product in self.products), dtype=np.int64, count=count)
+
+        # Stable sorts keep catalog order among ties, like min()/max() over the list did
+        self.price_order = np.argsort(self.prices, kind='stable')
+        self.inventory_order = np.argsort(self.inventory, kind='stable')
+        self.sorted_inventory = self.inventory[self.inventory_order]
+        self._cheapest = int(self.price_order[0]) if count else None
+        self._most_expensive = int(np.argmax(self.prices)) if count else None
+        self._highest_stock = int(np.argmax(self.inventory)) if count else None
+
+        self.by_title = {}
+        self.by_title_lower = {}
+        postings = {}
+        for position, product in enumerate(self.products):
+            self.by_title.setdefault(product['title'], []).append(position)
+            self.by_title_lower.setdefault(self.titles_lower[position], []).append(position)
+            for token in set(tokenize(product['title'])):
+                postings.setdefault(token, []).append(position)
+        self.vocabulary = sorted(postings)
+        self.postings = {token: np.asarray(positions, dtype=np.int64) for token, positions in postings.items()}
+
+    def __len__(self):
+        return len(self.products)
+
+    def _take(self, positions):
+        return [self.products[i] for i in positions]
+
+    def cheapest(self):
+        return self.products[self._cheapest] if self._cheapest is not None else None
+
+    def most_expensive(self):
+        return self.products[self._most_expensive] if self._most_expensive is not None else None
+
+    def highest_stock(self):
+        return self.products[self._highest_stock] if self._highest_stock is not None else None
+
+    def with_title(self, title, case_sensitive=True):
+        positions = self.by_title.get(title, []) if case_sensitive else self.by_title_lower.get(title.lower(), [])
+        return self._take(positions)
+
+    def with_any_title(self, titles):
+        # Products whose title equals one of ``titles`` exactly, in catalog order
+        positions = sorted({i for title in set(titles) for i in self.by_title.get(title, [])})
+        return self._take(positions)
+
+    def below_stock(self, threshold):
+        # Products with inventory < threshold, in catalog order
+        end = int(np.searchsorted(self.sorted_inventory, threshold, side='left'))
+        return self._take(np.sort(self.inventory_order[:end]))
+
+    def in_stock(self):
+        # Products with inventory > 0, in catalog order
+        start = int(np.searchsorted(self.sorted_inventory, 0, side='right'))
+        return self._take(np.sort(self.inventory_order[start:]))
+
+    def in_stock_priced(self):
+        # Products with both a price and stock, in catalog order
+        start = int(np.searchsorted(self.sorted_inventory, 0, side='right'))
+        positions = np.sort(self.inventory_order[start:])
+        return self._take(positions[self.prices[positions] > 0])
+
+    def _prefix_postings(self, token):
+        # Titles containing a word that starts with ``token``
+        position = bisect_left(self.vocabulary, token)
+        matches = []
+        while position < len(self.vocabulary) and self.vocabulary[position].startswith(token):
+            matches.append(self.postings[self.vocabulary[position]])
+            position += 1
+        if not matches:
+            return np.empty(0, dtype=np.int64)
+        if len(matches) == 1:
+            return matches[0]
+        return np.unique(np.concatenate(matches))
+
+    def _phrase_candidates(self, phrase):
+        tokens = tokenize(phrase)
+        if not tokens:
+            return None
+        candidates = None
+        for token in tokens:
+            positions = self._prefix_postings(token)
+            candidates = positions if candidates is None else np.intersect1d(candidates, positions, assume_unique=True)
+            if candidates.size == 0:
+                break
+        return candidates
+
+    def matching(self, phrase):
+        """Products whose title contains ``phrase`` (case-insensitive), in catalog order."""
+        phrase = phrase.lower()
+        candidates = self._phrase_candidates(phrase)
+        if candidates is None:
+            candidates = range(len(self.products))
+        return [self.products[i] for i in candidates if phrase in self.titles_lower[i]]
+
+    def with_words(self, phrase):
+        """Products whose title contains every word of ``phrase`` as a whole word, in catalog order."""
+        candidates = None
+        for token in tokenize(phrase):
+            positions = self.postings.get(token, np.empty(0, dtype=np.int64))
+            candidates = positions if candidates is None else np.intersect1d(candidates, positions, assume_unique=True)
+        return self._take(candidates) if candidates is not None else []
+
+    def matching_words(self, phrase):
+        """Products whose title has a word starting with each word of ``phrase``, in any order."""
+        candidates = self._phrase_candidates(phrase.lower())
+        return self._take(candidates) if candidates is not None else []
+
+    def matching_any(self, words):
+        """Products whose title contains at least one of ``words``, in catalog order."""
+        words = [word.lower() for word in words]
+        found = set()
+        for word in words:
+            candidates = self._phrase_candidates(word)
+            if candidates is None:
+                candidates = range(len(self.products))
+            found.update(int(i) for i in candidates)
+        return [self.products[i] for i in sorted(found) if any(word in self.titles_lower[i] for word in words)]
+
+
+_snapshots = {}
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot(product_list, catalog_version, namespace=None):
+    # One snapshot per store (index namespace) and catalog version, rebuilt only when that store's catalog changes
+    with _snapshot_lock:
+        version, snapshot = _snapshots.get(namespace, (None, None))
+        if snapshot is None or version != catalog_version:
+            snapshot = CatalogSnapshot(product_list)
+            _snapshots[namespace] = (catalog_version, snapshot)
+        return snapshot
@@ -0,0 +1,79 @@
+import re
+
+from django.conf import settings
+
+from .catalog_snapshot import tokenize
+from .intents import STOPWORDS
+
+# Context assembly for QA. Instead of joining the text of every retrieved match into one
+# context, the matches are scored against the question, the relevant ones are kept up to a
+# token budget, and QA runs over each kept passage separately in one batch. The model then
+# reads a few short sequences instead of one long one the size of top_k.
+
+NO_CONTEXT = "No relevant data found"
+# Passages need at least this share of the best passage's relevance to be read
+MIN_RELATIVE_RELEVANCE = 0.75
+# Words of the metadata template every passage contains
+TEMPLATE_WORDS = frozenset(('with', 'inventory', 'quantity'))
+
+_PIECE = re.compile(r'\w+|[^\w\s]')
+
+
+def estimate_tokens(text):
+    # Words and punctuation marks, close to the QA tokenizer's count for catalog text
+    # (RoBERTa splits long numbers further) without loading it in the web worker
+    return len(_PIECE.findall(text))
+
+
+def passage_text(match):
+    return match['metadata']['text']
+
+
+def concatenated_context(matches):
+    # What get_insights fed the QA model before passages, kept for AI_QA_CONTEXT=concat
+    return " ".join(passage_text(match) for match in matches) if matches else NO_CONTEXT
+
+
+def select_passages(query, matches, budget=None):
+    """
+    Passages from ``matches`` to run QA on, most relevant first, and stats about the
+    selection. Relevance is the share of the question's content words a passage contains,
+    ties keep the retrieval order. Passages well below the most relevant one are dropped
+    (all are kept when none shares a word with the question), then passages are kept
+    until ``budget`` tokens; the most relevant one always is.
+    """
+    budget = budget or settings.AI_QA_CONTEXT_TOKENS
+    words = {token for token in tokenize(query) if token not in STOPWORDS and token not in TEMPLATE_WORDS}
+    scored = []
+    seen = set()
+    for rank, match in enumerate(matches):
+        text = passage_text(match)
+        if text in seen:
+            continue
+        seen.add(text)
+        overlap = len(words & set(tokenize(text))) / len(words) if words else 0.0
+        scored.append((overlap, rank, text))
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    if scored and scored[0][0] > 0:
+        cutoff = scored[0][0] * MIN_RELATIVE_RELEVANCE
+        scored = [item for item in scored if item[0] >= cutoff]
+
+    passages = []
+    tokens = 0
+    for overlap, rank, text in scored:
+        cost = estimate_tokens(text)
+        if passages and tokens + cost > budget:
+            continue
+        passages.append(text)
+        tokens += cost
+    stats = {"retrieved": len(matches), "passages": len(passages), "tokens": tokens, "budget": budget}
+    return passages, stats
+
+
+def best_answer(results):
+    # Highest scoring span over all passages; the first (most relevant) passage wins ties
+    best = None
+    for position, result in enumerate(results):
+        if best is None or result.get('score', 0) > best.get('score', 0):
+            best = dict(result, passage=position)
+    return best or {'answer': '', 'score': 0.0}
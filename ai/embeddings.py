@@ -0,0 +1,45 @@
+import numpy as np
+from django.conf import settings
+
+from .indexing import product_text
+from .registry import registry
+
+
+def embed_texts(texts, batch_size=None, tokenizer=None, model=None):
+    """
+    Embed ``texts`` in padded batches and return a contiguous float32 matrix with
+    one row per text, in input order.
+    """
+    import torch
+
+    batch_size = batch_size or settings.AI_EMBEDDING_BATCH_SIZE
+    tokenizer = tokenizer or registry.get('tokenizer')
+    model = model or registry.get('embedding_model')
+    max_length = settings.AI_MAX_SEQ_LENGTH or None
+    texts = list(texts)
+    dimension = model.config.hidden_size
+    output = np.empty((len(texts), dimension), dtype=np.float32)
+    if not texts:
+        return output
+
+    # Group texts of similar length so each batch carries as little padding as possible
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    with torch.inference_mode():
+        for start in range(0, len(order), batch_size):
+            rows = order[start:start + batch_size]
+            inputs = tokenizer([texts[i] for i in rows], padding=True, truncation=True, max_length=max_length, return_tensors='pt')
+            hidden = model(**inputs).last_hidden_state
+            # Mean over real tokens only, padding positions are masked out
+            mask = inputs['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+            output[rows] = pooled.cpu().numpy()
+    return output
+
+
+def embed_products(products, batch_size=None):
+    return embed_texts([product_text(product) for product in products], batch_size=batch_size)
+
+
+def create_vector_from_product(product):
+    # Single product convenience wrapper around the batch path
+    return embed_products([product], batch_size=1)[0].tolist()
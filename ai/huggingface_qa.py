@@ -1,4 +1,8 @@
-from transformers import pipeline
+from .registry import registry
 
-# Initialize Hugging Face QA model (can be GPT, RoBERTa, etc.)
-qa_pipeline = pipeline('question-answering', model='deepset/roberta-base-squad2')
+
+def __getattr__(name):
+    # The Hugging Face QA model (RoBERTa) is loaded by the registry on first access
+    if name == 'qa_pipeline':
+        return registry.get('qa_pipeline')
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,184 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from ai_shopify_dashboard.timing import stage
+
+# Pinecone accepts at most ~2MB per upsert request, 100 vectors of 768 floats stays well below that
+UPSERT_BATCH_SIZE = 100
+VECTOR_DIMENSION = 768
+
+
+def product_text(product):
+    # The text that gets embedded for a product, shared by indexing and the manifest hash
+    return f"{product.get('title', 'Unknown product')} priced at {product.get('price', '0.00')} with inventory {product.get('inventory_quantity', 0)}"
+
+
+def product_metadata(product):
+    return {
+        'text': f"{product.get('title', 'Unknown product')} with inventory quantity {product.get('inventory_quantity', 0)}",
+        'inventory_quantity': product.get('inventory_quantity', 0),
+        'price': product.get('price', 0)
+    }
+
+
+def content_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingManifest:
+    """
+    Persistent record of what is already in the vector index: product id -> hash of
+    the embedded text. Only products whose text changed are re-embedded, and products
+    missing from the catalog are removed from the index.
+
+    Stored as an append-only log of ``id<TAB>hash`` lines (an empty hash deletes the
+    id), so a sync writes only what it changed. The log is compacted once it holds
+    more than COMPACT_FACTOR lines per live product.
+    """
+    COMPACT_FACTOR = 2
+    COMPACT_MIN_LINES = 1024
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.hashes = {}
+        self.lines = 0
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        legacy_path = f"{os.path.splitext(self.path)[0]}.npz"
+        if not os.path.exists(self.path) and legacy_path != self.path and os.path.exists(legacy_path):
+            # Manifests used to be an npz of ids, hashes and vectors; keep the hashes so nothing is re-embedded
+            with np.load(legacy_path, allow_pickle=False) as data:
+                self.hashes = dict(zip(data['ids'].tolist(), data['hashes'].tolist()))
+            self.compact()
+            return
+        if not os.path.exists(self.path):
+            return
+        torn = False
+        with open(self.path, encoding='utf-8') as fh:
+            for line in fh:
+                product_id, tab, digest = line.rstrip('\n').partition('\t')
+                if not tab or not line.endswith('\n'):
+                    # A line cut short by a crash, its change was never acknowledged
+                    torn = True
+                    continue
+                self.lines += 1
+                if digest:
+                    self.hashes[product_id] = digest
+                else:
+                    self.hashes.pop(product_id, None)
+        if torn:
+            # Appending after a partial line would corrupt the next one
+            self.compact()
+
+    def _ensure_directory(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def append(self, changes):
+        """Record ``(product id, hash or None)`` changes, None for a deleted product."""
+        self._ensure_directory()
+        with open(self.path, 'a', encoding='utf-8') as fh:
+            fh.writelines(f"{product_id}\t{digest or ''}\n" for product_id, digest in changes)
+        self.lines += len(changes)
+        if self.lines > max(self.COMPACT_MIN_LINES, self.COMPACT_FACTOR * len(self.hashes)):
+            self.compact()
+
+    def compact(self):
+        # Rewrite the log with one line per live product; a temporary file first so a crash never loses it
+        tmp_path = f"{self.path}.tmp"
+        self._ensure_directory()
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            fh.writelines(f"{product_id}\t{digest}\n" for product_id, digest in self.hashes.items())
+        os.replace(tmp_path, self.path)
+        self.lines = len(self.hashes)
+
+    def sync(self, product_list, index, embed):
+        """
+        Bring ``index`` in line with ``product_list``. ``embed`` maps a list of product
+        dicts to a matrix with one vector per product. Returns counts of skipped,
+        embedded and deleted products.
+        """
+        with self._lock:
+            products = [product for product in product_list if isinstance(product, dict)]
+            current = {str(product['id']) for product in products}
+            removed = [product_id for product_id in self.hashes if product_id not in current]
+            return self._apply(products, removed, index, embed)
+
+    def apply(self, products, deleted_ids, index, embed):
+        """
+        Incremental counterpart of ``sync`` for a batch of changes: upsert ``products``
+        and remove ``deleted_ids``, leaving the rest of the index untouched.
+        """
+        with self._lock:
+            removed = [str(product_id) for product_id in deleted_ids if str(product_id) in self.hashes]
+            return self._apply(products, removed, index, embed)
+
+    def _apply(self, products, removed, index, embed):
+        changed = []
+        for product in products:
+            product_id = str(product['id'])
+            digest = content_hash(product_text(product))
+            if self.hashes.get(product_id) != digest:
+                changed.append((product_id, digest, product))
+
+        vectors = []
+        if changed:
+            with stage('embedding'):
+                matrix = np.asarray(embed([product for _, _, product in changed]), dtype=np.float32)
+            assert matrix.shape[1] == VECTOR_DIMENSION  # Ensure this matches your index
+            for (product_id, _, product), row in zip(changed, matrix):
+                vectors.append({
+                    'id': product_id,
+                    'values': row.tolist(),
+                    'metadata': product_metadata(product)
+                })
+
+        with stage('upsert'):
+            for start in range(0, len(vectors), UPSERT_BATCH_SIZE):
+                index.upsert(vectors[start:start + UPSERT_BATCH_SIZE])
+            for start in range(0, len(removed), UPSERT_BATCH_SIZE):
+                index.delete(ids=removed[start:start + UPSERT_BATCH_SIZE])
+
+        # Only record the new state once the index has accepted it
+        for product_id, digest, _ in changed:
+            self.hashes[product_id] = digest
+        for product_id in removed:
+            self.hashes.pop(product_id, None)
+
+        if changed or removed:
+            with stage('upsert'):
+                index.flush()
+                self.append([(product_id, digest) for product_id, digest, _ in changed] +
+                            [(product_id, None) for product_id in removed])
+
+        return {
+            'skipped': len(products) - len(changed),
+            'embedded': len(changed),
+            'deleted': len(removed)
+        }
+
+
+_manifests = {}
+_manifest_lock = threading.Lock()
+
+
+def manifest_path(namespace=None):
+    if not namespace:
+        return settings.AI_EMBEDDING_MANIFEST_PATH
+    root, ext = os.path.splitext(settings.AI_EMBEDDING_MANIFEST_PATH)
+    return f"{root}-{namespace}{ext}"
+
+
+def get_manifest(namespace=None):
+    # One manifest per vector index namespace, product ids of different stores may collide
+    with _manifest_lock:
+        if namespace not in _manifests:
+            _manifests[namespace] = EmbeddingManifest(manifest_path(namespace))
+        return _manifests[namespace]
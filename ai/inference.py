@@ -0,0 +1,119 @@
+import threading
+
+from django.conf import settings
+
+from .batching import MicroBatcher
+from .embeddings import embed_texts
+from .indexing import product_text
+from .registry import registry
+
+# Resources the web worker itself needs: in 'server' mode the models live in the inference server
+LOCAL_RESOURCES = {
+    'local': ['qa_pipeline', 'tokenizer', 'embedding_model', 'vector_store'],
+    'server': ['vector_store'],
+}
+
+
+def qa_kwargs():
+    # Cap the window the QA model reads at once, shorter sequences are much cheaper on CPU
+    if settings.AI_MAX_SEQ_LENGTH:
+        return {'max_seq_len': settings.AI_MAX_SEQ_LENGTH, 'doc_stride': min(128, settings.AI_MAX_SEQ_LENGTH // 4)}
+    return {}
+
+
+def run_qa_batch(items, qa_pipeline=None):
+    qa_pipeline = qa_pipeline or registry.get('qa_pipeline')
+    results = qa_pipeline([{'question': question, 'context': context} for question, context in items], batch_size=len(items), **qa_kwargs())
+    # The pipeline returns a bare dict for a single example
+    return [results] if isinstance(results, dict) else list(results)
+
+
+def _embed_batch(texts):
+    return list(embed_texts(texts, batch_size=len(texts)))
+
+
+qa_batcher = MicroBatcher('qa', run_qa_batch, settings.AI_BATCH_MAX_SIZE, settings.AI_BATCH_MAX_WAIT_MS)
+embedding_batcher = MicroBatcher('query_embedding', _embed_batch, settings.AI_BATCH_MAX_SIZE, settings.AI_BATCH_MAX_WAIT_MS)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            from .inference_server import InferenceClient
+            _client = InferenceClient(settings.AI_INFERENCE_ADDRESS, timeout=settings.AI_INFERENCE_TIMEOUT)
+        return _client
+
+
+def _remote(method, *args):
+    """
+    Run ``method`` on the inference server. Returns None when the server cannot be
+    reached, times out or fails the call, and AI_INFERENCE_FALLBACK allows running the
+    model in this process instead.
+    """
+    if settings.AI_INFERENCE_MODE != 'server':
+        return None
+    from .inference_server import InferenceError  # It imports this module
+    try:
+        return getattr(get_client(), method)(*args)
+    except (ConnectionError, FileNotFoundError, EOFError, TimeoutError, InferenceError) as e:
+        if settings.AI_INFERENCE_FALLBACK:
+            print(f"Inference server failed ({e}), running {method} in-process")
+            return None
+        raise
+
+
+def answer_question(question, context):
+    result = _remote('answer_question', question, context)
+    if result is not None:
+        return result
+    if settings.AI_MICRO_BATCHING:
+        return qa_batcher.submit((question, context))
+    return registry.get('qa_pipeline')(question=question, context=context, **qa_kwargs())
+
+
+def answer_passages(question, passages):
+    """QA over each passage separately, as one batch; one result per passage."""
+    if len(passages) == 1:
+        # A single sequence can still be grouped with other requests by the micro-batcher
+        return [answer_question(question, passages[0])]
+    items = [(question, passage) for passage in passages]
+    results = _remote('answer_questions', items)
+    if results is not None:
+        return results
+    return run_qa_batch(items)
+
+
+def remote_embed_products(products):
+    # Through the inference server when there is one, ai.embeddings.embed_products always runs in-process
+    texts = [product_text(product) for product in products]
+    result = _remote('embed_texts', texts)
+    if result is not None:
+        return result
+    return embed_texts(texts)
+
+
+def embed_query(query):
+    # The query is embedded with the same template as the products it is compared against
+    text = product_text({'title': query, 'price': '0.00', 'inventory_quantity': 0})
+    result = _remote('embed_texts', [text])
+    if result is not None:
+        return result[0].tolist()
+    if settings.AI_MICRO_BATCHING:
+        return embedding_batcher.submit(text).tolist()
+    return embed_texts([text], batch_size=1)[0].tolist()
+
+
+def local_resources():
+    return LOCAL_RESOURCES[settings.AI_INFERENCE_MODE]
+
+
+def batching_metrics():
+    return {
+        'enabled': settings.AI_MICRO_BATCHING,
+        'qa': qa_batcher.metrics(),
+        'query_embedding': embedding_batcher.metrics(),
+    }
@@ -0,0 +1,143 @@
+import threading
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+from django.conf import settings
+
+from .batching import MicroBatcher
+from .embeddings import embed_texts
+from .inference import run_qa_batch
+from .registry import registry
+
+# A single process owns the QA and embedding models and serves every web worker
+# over a Unix socket or loopback TCP (multiprocessing.connection, HMAC authenticated).
+
+
+def parse_address(address):
+    # 'unix:/run/ai.sock' or '/run/ai.sock' -> Unix socket, 'host:port' -> TCP
+    if address.startswith('unix:'):
+        return address[len('unix:'):], 'AF_UNIX'
+    if address.startswith('/'):
+        return address, 'AF_UNIX'
+    host, port = address.rsplit(':', 1)
+    return (host, int(port)), 'AF_INET'
+
+
+def authkey():
+    return (settings.AI_INFERENCE_AUTHKEY or settings.SECRET_KEY).encode('utf-8')
+
+
+class InferenceServer:
+
+    def __init__(self, address, max_batch_size=16, max_wait_ms=5):
+        self.address, self.family = parse_address(address)
+        # The batcher thread and 'qa_batch' callers share one pipeline, qa_lock serializes them
+        self.qa_lock = threading.Lock()
+        self.qa_batcher = MicroBatcher('server-qa', self._run_qa_batch, max_batch_size, max_wait_ms)
+        # Embedding requests can already be batches (indexing), each one is run as is
+        self.embed_lock = threading.Lock()
+        self.listener = None
+
+    def handle(self, method, payload):
+        if method == 'ping':
+            return {'resources': registry.status()}
+        if method == 'embed':
+            with self.embed_lock:
+                return np.ascontiguousarray(embed_texts(payload['texts'], batch_size=payload.get('batch_size')))
+        if method == 'qa':
+            return self.qa_batcher.submit((payload['question'], payload['context']))
+        if method == 'qa_batch':
+            return self._run_qa_batch(payload['items'])
+        raise ValueError(f"Unknown inference method: {method}")
+
+    def _run_qa_batch(self, items):
+        with self.qa_lock:
+            return run_qa_batch(items)
+
+    def _serve_connection(self, connection):
+        with connection:
+            while True:
+                try:
+                    method, payload = connection.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    connection.send(('ok', self.handle(method, payload)))
+                except Exception as e:
+                    connection.send(('error', f"{type(e).__name__}: {e}"))
+
+    def serve_forever(self, warm_up=True):
+        if warm_up:
+            registry.warm_up(['tokenizer', 'embedding_model', 'qa_pipeline'])
+        self.listener = Listener(self.address, family=self.family, authkey=authkey())
+        while True:
+            try:
+                connection = self.listener.accept()
+            except OSError:
+                if self.listener is None:
+                    return
+                continue
+            threading.Thread(target=self._serve_connection, args=(connection,), daemon=True).start()
+
+    def close(self):
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.close()
+
+
+class InferenceError(Exception):
+    pass
+
+
+class InferenceClient:
+    """Talks to the InferenceServer, one persistent connection per calling thread."""
+
+    def __init__(self, address, timeout=None):
+        self.address, self.family = parse_address(address)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = Client(self.address, family=self.family, authkey=authkey())
+            self._local.connection = connection
+        return connection
+
+    def _drop_connection(self):
+        connection = getattr(self._local, 'connection', None)
+        self._local.connection = None
+        if connection is not None:
+            connection.close()
+
+    def call(self, method, payload=None):
+        for attempt in range(2):
+            try:
+                connection = self._connection()
+                connection.send((method, payload or {}))
+                if self.timeout is not None and not connection.poll(self.timeout):
+                    # The reply would arrive out of order on the next call, start over
+                    self._drop_connection()
+                    raise InferenceError(f"Inference server did not answer '{method}' within {self.timeout}s")
+                status, result = connection.recv()
+                break
+            except (EOFError, ConnectionError, BrokenPipeError):
+                # Server restarted since the connection was opened, reconnect once
+                self._drop_connection()
+                if attempt:
+                    raise
+        if status == 'error':
+            raise InferenceError(result)
+        return result
+
+    def embed_texts(self, texts, batch_size=None):
+        return self.call('embed', {'texts': list(texts), 'batch_size': batch_size})
+
+    def answer_question(self, question, context):
+        return self.call('qa', {'question': question, 'context': context})
+
+    def answer_questions(self, items):
+        return self.call('qa_batch', {'items': list(items)})
+
+    def status(self):
+        return self.call('ping')
@@ -0,0 +1,41 @@
+from django.db.models import F
+from django.utils import timezone
+
+from ecommerce.models import WebhookEvent
+from ecommerce.pagination import product_record
+from ecommerce.webhooks import apply_to_mirror, coalesce, pending_events
+
+from .indexing import get_manifest
+from .inference import remote_embed_products
+from .registry import registry
+
+
+def index_record(payload):
+    # Same shape and float price as the product list get_insights indexes, so content hashes match
+    record = product_record(payload)
+    record['price'] = float(record['price'])
+    return record
+
+
+def process_pending(limit=1000, max_attempts=5):
+    """
+    Apply up to ``limit`` queued product webhooks to the mirror and the vector index
+    as one batch. Several events for the same product collapse into its final state,
+    so a burst of updates costs one embedding. Returns None when the queue is empty.
+    """
+    events = pending_events(limit)
+    if not events:
+        return None
+    ids = [event.id for event in events]
+    upserts, deleted = coalesce(events)
+    try:
+        upserts = apply_to_mirror(upserts, deleted)
+        stats = get_manifest().apply([index_record(payload) for payload in upserts], deleted,
+                                     registry.get('vector_store'), remote_embed_products)
+    except Exception as e:
+        WebhookEvent.objects.filter(id__in=ids).update(attempts=F('attempts') + 1, error=str(e))
+        # Give up on events that keep failing so they do not block the queue forever
+        WebhookEvent.objects.filter(id__in=ids, attempts__gte=max_attempts).update(processed_at=timezone.now())
+        raise
+    WebhookEvent.objects.filter(id__in=ids).update(processed_at=timezone.now(), error='')
+    return dict(stats, events=len(events), products=len(upserts) + len(deleted))
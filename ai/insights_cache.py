@@ -0,0 +1,154 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .indexing import product_text
+
+
+def normalize_query(query):
+    # "Which products are out of stock?" and "which  products are OUT of stock" share an entry
+    return re.sub(r'\s+', ' ', query).strip().lower().rstrip('?!. ')
+
+
+def catalog_fingerprint(product_list):
+    """Version of the catalog as seen by get_insights, changes whenever any indexed field does."""
+    digest = hashlib.sha1()
+    for text in sorted(f"{product['id']}|{product_text(product)}" for product in product_list):
+        digest.update(text.encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+class LocalCacheBackend:
+    """In-process LRU with a per-entry TTL."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self, prefix=''):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DjangoCacheBackend:
+    """Stores entries in a configured Django cache, shared between workers when that cache is."""
+
+    def __init__(self, alias, ttl):
+        from django.core.cache import caches
+        self.cache = caches[alias]
+        self.ttl = ttl
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.ttl)
+
+    def clear(self, prefix=''):
+        # Keys embed the catalog version, entries of older versions simply expire
+        pass
+
+    def __len__(self):
+        return 0
+
+
+class InsightsCache:
+    """
+    Answers by store (index namespace, None for the default store), query and catalog
+    version. Each store's catalog versions are tracked separately, so a change in one
+    store only drops that store's answers.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.versions = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _prefix(namespace):
+        return f"insights:{namespace or ''}:"
+
+    def _key(self, query, version, namespace=None):
+        return self._prefix(namespace) + hashlib.sha1(f"{version}:{normalize_query(query)}".encode('utf-8')).hexdigest()
+
+    def _observe_version(self, version, namespace=None):
+        with self._lock:
+            previous = self.versions.get(namespace)
+            if previous is not None and version != previous:
+                # The store's catalog changed, its cached answers are stale
+                self.backend.clear(self._prefix(namespace))
+                self.invalidations += 1
+            self.versions[namespace] = version
+
+    def get(self, query, version, namespace=None):
+        self._observe_version(version, namespace)
+        value = self.backend.get(self._key(query, version, namespace))
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, query, version, value, namespace=None):
+        self.backend.set(self._key(query, version, namespace), value)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'entries': len(self.backend),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'invalidations': self.invalidations,
+            'catalog_version': self.versions.get(None),
+            'store_catalog_versions': {namespace: version for namespace, version in self.versions.items() if namespace is not None}
+        }
+
+
+def create_insights_cache():
+    backend = settings.AI_INSIGHTS_CACHE_BACKEND
+    if backend == 'none':
+        return None
+    if backend == 'local':
+        return InsightsCache(LocalCacheBackend(settings.AI_INSIGHTS_CACHE_SIZE, settings.AI_INSIGHTS_CACHE_TTL))
+    if backend == 'django':
+        return InsightsCache(DjangoCacheBackend(settings.AI_INSIGHTS_CACHE_ALIAS, settings.AI_INSIGHTS_CACHE_TTL))
+    raise ValueError(f"Unknown AI_INSIGHTS_CACHE_BACKEND: {backend}")
+
+
+insights_cache = create_insights_cache()
@@ -0,0 +1,271 @@
+import re
+import time
+
+from ai_shopify_dashboard.timing import stage
+from ecommerce.analytics import get_rollup
+
+from .catalog_snapshot import tokenize
+
+# Structured catalog questions ("cheapest", "price of X", "how many X available", ...)
+# recognised with compiled patterns and answered straight from the catalog snapshot.
+# Only questions no pattern claims, or whose product cannot be found in the catalog,
+# go on to retrieval and QA.
+
+LOW_STOCK_THRESHOLD = 5
+MAX_LISTED = 25  # products listed in one answer, the total is always reported
+
+# Question and intent words, left out when looking for the product a question is about
+STOPWORDS = frozenset("""
+    a an the is are am was were be do does did has have had we you our your i me my it its this that these those there
+    of for to in on at by with and or vs versus any some all anything something everything please tell show list
+    give what whats which who
+    how many much units unit left remaining currently right now available availability stock inventory
+    level levels count product products item items out low running almost sold below under less fewer than
+    price prices priced cost costs costing cheapest cheap least expensive most priciest highest lowest compare
+    best seller sellers selling top
+""".split())
+
+BEST_SELLERS = re.compile(r"\b(best[- ]?sell(?:er|ers|ing)|top[- ]sell(?:er|ers|ing)|most sold|sells? the most|sold the most)\b")
+COMPARE = re.compile(r"\bcompare\s+(?P<first>.+?)\s+(?:and|with|vs\.?|versus|to)\s+(?P<second>.+)")
+HOW_MANY = re.compile(r"\bhow (?:many|much)\b(?P<product>.*?)\b(?P<scope>available|in stock|left|in inventory|do we have)\b")
+PRICE = re.compile(r"\b(?:price|cost)s?\b(?:\s+(?:of|for))?(?P<product>.*)|\bhow much (?:is|are|does|do)\b(?P<product2>.*?)(?:\bcosts?\b|$)")
+OUT_OF_STOCK = re.compile(r"\b(?:out of stock|sold out)\b")
+LOW_STOCK = re.compile(r"\b(?:low (?:in |on )?stock|running low|almost out)\b"
+                       r"|\b(?:below|under|less than|fewer than)\s+\d+\b.*\b(?:stock|units|inventory)\b"
+                       r"|\b(?:stock|units|inventory)\b.*\b(?:below|under|less than|fewer than)\s+\d+")
+STOCK_BELOW = re.compile(r"\b(?:below|under|less than|fewer than)\s+(\d+)")
+CHEAPEST = re.compile(r"\b(?:cheapest|least expensive|lowest price[sd]?)\b")
+MOST_EXPENSIVE = re.compile(r"\b(?:most expensive|priciest|highest price[sd]?)\b")
+AVAILABILITY = re.compile(r"^(?:is|are|do we have)\s+(?P<product>.+?)\s+(?:available|in stock)\b|^(?P<product2>.+?)\s+(?:available|in stock)\W*$")
+IN_STOCK = re.compile(r"\b(?:which|what|list|show)\b.*\bin stock\b")
+
+# First match wins, so the more specific patterns come first
+INTENTS = [
+    ('compare', COMPARE),
+    ('best_sellers', BEST_SELLERS),
+    ('how_many', HOW_MANY),
+    ('out_of_stock', OUT_OF_STOCK),
+    ('low_stock', LOW_STOCK),
+    ('cheapest', CHEAPEST),
+    ('most_expensive', MOST_EXPENSIVE),
+    # After the superlatives, "highest price" is not a question about the price of "highest"
+    ('price', PRICE),
+    ('in_stock', IN_STOCK),
+    ('availability', AVAILABILITY),
+]
+
+
+def classify(query):
+    """(intent, match) of the first pattern the question matches, or None for an open-ended question."""
+    text = query.lower().strip()
+    for name, pattern in INTENTS:
+        match = pattern.search(text)
+        if match:
+            return name, match
+    return None
+
+
+def product_phrase(text):
+    # Single letters are leftovers like the s of "what's", numbers stay (titles often end in one)
+    return ' '.join(token for token in tokenize(text or '')
+                    if token not in STOPWORDS and not (len(token) == 1 and token.isalpha()))
+
+
+def _singular(phrase):
+    return ' '.join(token[:-1] if len(token) > 3 and token.endswith('s') else token for token in phrase.split())
+
+
+def resolve_products(snapshot, phrase):
+    """
+    Catalog products ``phrase`` refers to, trying the strictest reading first: the exact
+    title, titles with all of its words, titles containing it, titles with words starting
+    with each of its words; then the same with plurals made singular.
+    """
+    if not phrase:
+        return []
+    for candidate in dict.fromkeys((phrase, _singular(phrase))):
+        for lookup in (lambda p: snapshot.with_title(p, case_sensitive=False), snapshot.with_words,
+                       snapshot.matching, snapshot.matching_words):
+            products = lookup(candidate)
+            if products:
+                return products
+    return []
+
+
+def _group(match, *names):
+    for name in names:
+        if name in match.re.groupindex and match.group(name):
+            return match.group(name)
+    return None
+
+
+def describe(product):
+    return {
+        "title": product['title'],
+        "price": product['price'],
+        "inventory_quantity": product['inventory_quantity'],
+        "availability": 'in stock' if product['inventory_quantity'] > 0 else 'out of stock'
+    }
+
+
+def product_list(message, products):
+    return {"message": message, "total": len(products), "products": [describe(product) for product in products[:MAX_LISTED]]}
+
+
+def _scope(snapshot, query):
+    # Products the question narrows itself to ("low stock mugs"), None when it names none.
+    # A name that matches nothing makes the question unanswerable here
+    phrase = product_phrase(query)
+    if not phrase:
+        return None
+    return resolve_products(snapshot, phrase) or False
+
+
+def _filtered(products, scope):
+    if scope is None:
+        return products
+    ids = {product['id'] for product in scope}
+    return [product for product in products if product['id'] in ids]
+
+
+def answer_compare(match, query, snapshot, sales):
+    picked = []
+    for phrase in (match.group('first'), match.group('second')):
+        products = resolve_products(snapshot, product_phrase(phrase))
+        if len(products) != 1:
+            return None  # Unknown or ambiguous, let retrieval and QA have a go
+        picked.append(products[0])
+    first, second = picked
+    return {
+        "message": f"{first['title']} has {first['inventory_quantity']} in stock, priced at {first['price']}. "
+                   f"{second['title']} has {second['inventory_quantity']} in stock, priced at {second['price']}.",
+        "products": [describe(first), describe(second)]
+    }
+
+
+def answer_best_sellers(match, query, snapshot, sales):
+    if not sales:
+        return None
+    rollup = get_rollup()
+    start, end = rollup.default_period()
+    best_sellers = rollup.top_products(start, end, limit=5, metric='units')
+    if not best_sellers:
+        return None
+    return {"message": f"Best sellers by units sold from {start} to {end}.", "best_sellers": best_sellers}
+
+
+def answer_how_many(match, query, snapshot, sales):
+    phrase = product_phrase(_group(match, 'product'))
+    if not phrase:
+        in_stock = snapshot.in_stock()
+        units = sum(product['inventory_quantity'] for product in in_stock)
+        if match.group('scope') == 'do we have':
+            # The whole catalog, out of stock products included
+            return {"message": f"We have {len(snapshot)} products, {len(in_stock)} of them in stock with {units} units in total.",
+                    "total": len(snapshot), "in_stock": len(in_stock), "units": units}
+        return {"message": f"{len(in_stock)} products are in stock, {units} units in total.", "total": len(in_stock)}
+    products = resolve_products(snapshot, phrase)
+    if not products:
+        return None
+    result = product_list(" ".join(f"There are {product['inventory_quantity']} units of {product['title']} available."
+                                   for product in products[:MAX_LISTED]), products)
+    result["units"] = sum(product['inventory_quantity'] for product in products)
+    return result
+
+
+def answer_price(match, query, snapshot, sales):
+    products = resolve_products(snapshot, product_phrase(_group(match, 'product', 'product2')))
+    if not products:
+        return None
+    return product_list(" ".join(f"The price of {product['title']} is {product['price']}." for product in products[:MAX_LISTED]), products)
+
+
+def answer_out_of_stock(match, query, snapshot, sales):
+    scope = _scope(snapshot, query)
+    if scope is False:
+        return None
+    products = _filtered(snapshot.below_stock(1), scope)
+    return product_list(f"{len(products)} products are out of stock.", products)
+
+
+def answer_low_stock(match, query, snapshot, sales):
+    below = STOCK_BELOW.search(query.lower())
+    threshold = int(below.group(1)) if below else LOW_STOCK_THRESHOLD
+    scope = _scope(snapshot, STOCK_BELOW.sub(' ', query.lower()))
+    if scope is False:
+        return None
+    products = _filtered(snapshot.below_stock(threshold), scope)
+    return product_list(f"{len(products)} products have fewer than {threshold} units in stock.", products)
+
+
+def _extreme(snapshot, query, overall, pick, label):
+    scope = _scope(snapshot, query)
+    if scope is False:
+        return None
+    product = overall() if scope is None else pick(scope, key=lambda product: product['price'])
+    if product is None:
+        return None
+    return {"message": f"{product['title']} is the {label} product, priced at {product['price']}.", "products": [describe(product)]}
+
+
+def answer_cheapest(match, query, snapshot, sales):
+    return _extreme(snapshot, query, snapshot.cheapest, min, 'cheapest')
+
+
+def answer_most_expensive(match, query, snapshot, sales):
+    return _extreme(snapshot, query, snapshot.most_expensive, max, 'most expensive')
+
+
+def answer_availability(match, query, snapshot, sales):
+    products = resolve_products(snapshot, product_phrase(_group(match, 'product', 'product2')))
+    if not products:
+        return None
+    return product_list(" ".join(
+        f"{product['title']} is {'in stock' if product['inventory_quantity'] > 0 else 'out of stock'} "
+        f"with {product['inventory_quantity']} units available." for product in products[:MAX_LISTED]
+    ), products)
+
+
+def answer_in_stock(match, query, snapshot, sales):
+    scope = _scope(snapshot, query)
+    if scope is False:
+        return None
+    products = _filtered(snapshot.in_stock(), scope)
+    return product_list(f"{len(products)} products are in stock.", products)
+
+
+HANDLERS = {
+    'compare': answer_compare,
+    'best_sellers': answer_best_sellers,
+    'how_many': answer_how_many,
+    'price': answer_price,
+    'out_of_stock': answer_out_of_stock,
+    'low_stock': answer_low_stock,
+    'cheapest': answer_cheapest,
+    'most_expensive': answer_most_expensive,
+    'availability': answer_availability,
+    'in_stock': answer_in_stock,
+}
+
+
+def route(query, snapshot, sales=True):
+    """
+    Answer ``query`` from the catalog if it is a structured question. Returns
+    ``(payload, routing)``; payload is None when the question has to go through
+    retrieval and QA. ``routing`` (intent, whether it was answered here and how long
+    deciding took) is meant for the response metadata. ``sales`` allows answers from
+    the order rollups, which only cover the default store.
+    """
+    start = time.perf_counter()
+    with stage('routing'):
+        classified = classify(query)
+        payload = None
+        if classified:
+            name, match = classified
+            payload = HANDLERS[name](match, query, snapshot, sales)
+    routing = {
+        "intent": classified[0] if classified else "open_ended",
+        "routed": payload is not None,
+        "ms": round((time.perf_counter() - start) * 1000, 3)
+    }
+    return payload, routing
@@ -0,0 +1,174 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+
+from django.conf import settings
+
+from .catalog_snapshot import tokenize
+from .indexing import product_metadata
+from .intents import STOPWORDS
+
+# BM25 over product titles and product types, next to the vector index. Dense vectors of
+# mean-pooled DistilBERT handle product names and SKU codes poorly; an inverted index finds
+# them exactly and costs a few dictionary lookups per query word.
+
+K1 = 1.2
+B = 0.75
+RRF_K = 60  # Reciprocal rank fusion constant, the usual value from the literature
+
+_CODE = re.compile(r'\w+(?:[-/.]\w+)+')
+
+
+def stem(word):
+    # Plurals only: 'mugs' finds 'Mug'. Applied to titles and queries alike, so an odd stem still matches
+    return word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') and not word.isdigit() else word
+
+
+def terms(text):
+    # Words, plus codes such as 'AB-1234' or '12.5/L' with their separators removed,
+    # so 'ab1234' finds them as well as 'ab 1234'
+    text = (text or '').lower()
+    return [stem(word) for word in tokenize(text)] + [re.sub(r'[-/.]', '', code) for code in _CODE.findall(text)]
+
+
+def query_terms(query):
+    # Stopwords are checked before stemming ('does' is not the stem of anything)
+    words = [stem(word) for word in tokenize(query) if word not in STOPWORDS]
+    return list(dict.fromkeys(words + [re.sub(r'[-/.]', '', code) for code in _CODE.findall(query.lower())]))
+
+
+def document_key(product):
+    return f"{product.get('title') or ''}\n{product.get('product_type') or ''}"
+
+
+class LexicalIndex:
+    """
+    Inverted index product id -> term frequencies of its title and product type, kept in
+    step with the catalog by ``sync``: only products whose title or type changed are
+    re-indexed, and products missing from the catalog are removed.
+    """
+
+    def __init__(self):
+        self.keys = {}
+        self.documents = {}
+        self.lengths = {}
+        self.postings = {}
+        self.records = {}
+        self.total_length = 0
+        self.version = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.documents)
+
+    def _remove(self, product_id):
+        counts = self.documents.pop(product_id)
+        for term in counts:
+            posting = self.postings[term]
+            del posting[product_id]
+            if not posting:
+                del self.postings[term]
+        self.total_length -= self.lengths.pop(product_id)
+        del self.keys[product_id]
+
+    def _add(self, product_id, key):
+        counts = Counter(terms(key))
+        for term, frequency in counts.items():
+            self.postings.setdefault(term, {})[product_id] = frequency
+        self.documents[product_id] = counts
+        self.lengths[product_id] = sum(counts.values())
+        self.total_length += self.lengths[product_id]
+        self.keys[product_id] = key
+
+    def sync(self, product_list, version=None):
+        """Bring the index in line with ``product_list``. Returns counts of indexed and deleted products."""
+        with self._lock:
+            if version is not None and version == self.version:
+                return {'indexed': 0, 'deleted': 0}
+            records = {}
+            indexed = 0
+            for product in product_list:
+                product_id = str(product['id'])
+                records[product_id] = product
+                key = document_key(product)
+                if self.keys.get(product_id) != key:
+                    if product_id in self.keys:
+                        self._remove(product_id)
+                    self._add(product_id, key)
+                    indexed += 1
+            removed = [product_id for product_id in self.keys if product_id not in records]
+            for product_id in removed:
+                self._remove(product_id)
+            # Price and stock change without re-indexing, the records always follow the catalog
+            self.records = records
+            self.version = version
+            return {'indexed': indexed, 'deleted': len(removed)}
+
+    def search(self, query, top_k=10):
+        """
+        ``(product id, BM25 score, share of the query terms it contains)`` of the best
+        ``top_k`` products, best first.
+        """
+        words = query_terms(query)
+        with self._lock:
+            count = len(self.documents)
+            if not words or not count:
+                return []
+            average = self.total_length / count
+            scores = {}
+            matched = Counter()
+            for term in words:
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+                for product_id, frequency in posting.items():
+                    scores[product_id] = scores.get(product_id, 0.0) + idf * frequency * (K1 + 1) / (
+                        frequency + K1 * (1 - B + B * self.lengths[product_id] / average))
+                    matched[product_id] += 1
+        best = heapq.nsmallest(top_k, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(product_id, score, matched[product_id] / len(words)) for product_id, score in best]
+
+    def matches(self, hits):
+        # Hits in the shape of vector index matches, so retrieval results can be mixed
+        return [
+            {'id': product_id, 'score': score, 'metadata': product_metadata(self.records[product_id])}
+            for product_id, score, _ in hits if product_id in self.records
+        ]
+
+
+def decisive(hits):
+    """
+    True when lexical retrieval alone answers the lookup: the best product contains every
+    query term and scores clearly above the next one, as for a product name or SKU.
+    """
+    if not hits or hits[0][2] < 1.0:
+        return False
+    return len(hits) == 1 or hits[0][1] >= hits[1][1] * settings.AI_LEXICAL_DECISIVE_MARGIN
+
+
+def fuse(vector_matches, lexical_matches, top_k=10):
+    """
+    Reciprocal rank fusion of two ranked match lists. Metadata comes from the lexical
+    match when there is one, it follows the catalog while the vector index may still sync.
+    """
+    fused = {}
+    for matches in (lexical_matches, vector_matches):
+        for rank, match in enumerate(matches):
+            entry = fused.setdefault(match['id'], {'id': match['id'], 'score': 0.0, 'metadata': match.get('metadata') or {}})
+            entry['score'] += 1 / (RRF_K + rank + 1)
+    return sorted(fused.values(), key=lambda match: -match['score'])[:top_k]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_lexical_index(namespace=None):
+    # One index per store, like the vector index namespaces. Rebuilt from the catalog after a restart
+    with _indexes_lock:
+        if namespace not in _indexes:
+            _indexes[namespace] = LexicalIndex()
+        return _indexes[namespace]
@@ -0,0 +1,75 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ai.catalog_snapshot import CatalogSnapshot
+from ai.management.commands.benchmark_embeddings import synthetic_catalog
+
+
+def _linear_intents(product_list):
+    # The list scans get_insights used before the catalog snapshot, kept as the baseline
+    return {
+        'cheapest': lambda: min(product_list, key=lambda x: x['price'], default=None),
+        'most expensive': lambda: max(product_list, key=lambda x: x['price'], default=None),
+        'best': lambda: (
+            max(product_list, key=lambda x: x['price'], default=None),
+            max(product_list, key=lambda x: x['inventory_quantity'], default=None),
+            [p for p in product_list if p['price'] > 0 and p['inventory_quantity'] > 0],
+        ),
+        'low stock (<5)': lambda: [p for p in product_list if p['inventory_quantity'] < 5],
+        'how many ... available': lambda: [p for p in product_list if 'wireless mug' in p['title'].lower()],
+        'price of ...': lambda: [p for p in product_list if 'leather watch 42' in p['title'].lower()],
+        'available (any word)': lambda: [p for p in product_list if any(name in p['title'].lower() for name in ['vintage', 'lamp'])],
+        'compare': lambda: [p for p in product_list if p['title'] in ['Classic Mug 7', 'Compact Lamp 99']],
+        'exact title': lambda: [p for p in product_list if p['title'].lower() == 'premium shirt 12'],
+    }
+
+
+def _snapshot_intents(snapshot):
+    return {
+        'cheapest': snapshot.cheapest,
+        'most expensive': snapshot.most_expensive,
+        'best': lambda: (snapshot.most_expensive(), snapshot.highest_stock(), snapshot.in_stock_priced()),
+        'low stock (<5)': lambda: snapshot.below_stock(5),
+        'how many ... available': lambda: snapshot.matching('wireless mug'),
+        'price of ...': lambda: snapshot.matching('leather watch 42'),
+        'available (any word)': lambda: snapshot.matching_any(['vintage', 'lamp']),
+        'compare': lambda: snapshot.with_any_title(['Classic Mug 7', 'Compact Lamp 99']),
+        'exact title': lambda: snapshot.with_title('premium shirt 12', case_sensitive=False),
+    }
+
+
+def _best_of(fn, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+class Command(BaseCommand):
+    help = "Per-intent latency of the get_insights fallback answers: list scans vs the columnar catalog snapshot."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=50000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        product_list = synthetic_catalog(options['products'])
+
+        start = time.perf_counter()
+        snapshot = CatalogSnapshot(product_list)
+        build_ms = (time.perf_counter() - start) * 1000
+        self.stdout.write(f"{len(product_list)} products, snapshot built once per catalog version in {build_ms:.1f} ms\n")
+
+        linear = _linear_intents(product_list)
+        indexed = _snapshot_intents(snapshot)
+        self.stdout.write(f"{'intent':<24} {'scan (ms)':>10} {'snapshot (ms)':>14} {'speedup':>9} {'same result':>12}")
+        for name in linear:
+            linear_seconds, linear_result = _best_of(linear[name], options['repeat'])
+            indexed_seconds, indexed_result = _best_of(indexed[name], options['repeat'])
+            speedup = linear_seconds / indexed_seconds if indexed_seconds else float('inf')
+            same = 'yes' if linear_result == indexed_result else 'no'
+            self.stdout.write(f"{name:<24} {linear_seconds * 1000:10.3f} {indexed_seconds * 1000:14.3f} {speedup:8.0f}x {same:>12}")
@@ -0,0 +1,63 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from ai.embeddings import create_vector_from_product, embed_products
+
+
+def synthetic_catalog(size, seed=0):
+    rng = random.Random(seed)
+    adjectives = ['Classic', 'Organic', 'Wireless', 'Vintage', 'Premium', 'Compact', 'Leather', 'Cotton']
+    nouns = ['Shirt', 'Headphones', 'Backpack', 'Mug', 'Sneakers', 'Lamp', 'Notebook', 'Watch']
+    return [
+        {
+            'id': i,
+            'title': f"{rng.choice(adjectives)} {rng.choice(nouns)} {rng.randint(1, 999)}",
+            'price': round(rng.uniform(1, 500), 2),
+            'inventory_quantity': rng.randint(0, 200)
+        }
+        for i in range(size)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Compare per-product and batched embedding throughput on synthetic catalogs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,1000,10000', help="Comma separated catalog sizes.")
+        parser.add_argument('--batch-size', type=int, default=None, help="Batch size for the batched path (defaults to AI_EMBEDDING_BATCH_SIZE).")
+        parser.add_argument('--single-limit', type=int, default=None,
+                            help="Only time the per-product path on catalogs up to this size; larger sizes are extrapolated from the last measured rate.")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        # Warm up both paths so model initialization does not end up in the first measurement
+        embed_products(synthetic_catalog(8))
+        create_vector_from_product(synthetic_catalog(1)[0])
+
+        single_rate = None
+        self.stdout.write(f"{'products':>10} {'single (s)':>12} {'batched (s)':>12} {'speedup':>9}")
+        for size in sizes:
+            catalog = synthetic_catalog(size)
+
+            if options['single_limit'] is None or size <= options['single_limit']:
+                start = time.perf_counter()
+                for product in catalog:
+                    create_vector_from_product(product)
+                single_seconds = time.perf_counter() - start
+                single_rate = single_seconds / size
+                single_label = f"{single_seconds:12.2f}"
+            elif single_rate is not None:
+                single_seconds = single_rate * size
+                single_label = f"{'~' + format(single_seconds, '.2f'):>12}"
+            else:
+                single_seconds = None
+                single_label = f"{'-':>12}"
+
+            start = time.perf_counter()
+            embed_products(catalog, batch_size=options['batch_size'])
+            batched_seconds = time.perf_counter() - start
+
+            speedup = f"{single_seconds / batched_seconds:8.1f}x" if single_seconds else f"{'-':>9}"
+            self.stdout.write(f"{size:>10} {single_label} {batched_seconds:12.2f} {speedup}")
@@ -0,0 +1,119 @@
+import io
+import json
+import os
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from ai.embeddings import embed_texts
+from ai.indexing import product_text
+from ai.registry import EMBEDDING_MODEL_NAME, load_embedding_model, load_qa_pipeline
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'fixtures', 'inference_eval.json')
+
+
+def _weights_mb(model):
+    import torch
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / 2 ** 20
+
+
+def _rss_mb():
+    try:
+        with open('/proc/self/status') as fh:
+            for line in fh:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) * 1000
+
+
+class Command(BaseCommand):
+    help = "Latency, throughput, memory and answer/embedding drift of int8 inference against the fp32 baseline."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', default=None, help="Comma separated torch intra-op thread counts to try (default: torch's default).")
+        parser.add_argument('--max-seq-length', type=int, default=None, help="Cap the tokens per sequence for both models.")
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--json', dest='json_path', default=None, help="Also write the results to this file.")
+
+    def handle(self, *args, **options):
+        import torch
+        from transformers import AutoTokenizer
+
+        with open(FIXTURE_PATH) as fh:
+            fixture = json.load(fh)
+        qa_items = [{'question': item['question'], 'context': item['context']} for item in fixture['qa']]
+        texts = [product_text(product) for product in fixture['products']]
+        tokenizer = AutoTokenizer.from_pretrained(EMBEDDING_MODEL_NAME)
+
+        qa_kwargs = {}
+        if options['max_seq_length']:
+            qa_kwargs = {'max_seq_len': options['max_seq_length'], 'doc_stride': min(128, options['max_seq_length'] // 4)}
+        thread_counts = [int(t) for t in options['threads'].split(',')] if options['threads'] else [torch.get_num_threads()]
+
+        baseline = None
+        results = []
+        for threads in thread_counts:
+            torch.set_num_threads(threads)
+            for mode in ('fp32', 'int8'):
+                quantize = mode == 'int8'
+                qa_pipeline = load_qa_pipeline(quantize=quantize)
+                model = load_embedding_model(quantize=quantize)
+
+                # Warm-up
+                qa_pipeline(question=qa_items[0]['question'], context=qa_items[0]['context'], **qa_kwargs)
+                embed_texts(texts[:4], tokenizer=tokenizer, model=model)
+
+                single = []
+                for _ in range(options['repeat']):
+                    for item in qa_items:
+                        start = time.perf_counter()
+                        qa_pipeline(question=item['question'], context=item['context'], **qa_kwargs)
+                        single.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                answers = qa_pipeline(qa_items, batch_size=8, **qa_kwargs)
+                qa_throughput = len(qa_items) / (time.perf_counter() - start)
+
+                start = time.perf_counter()
+                embeddings = embed_texts(texts, batch_size=32, tokenizer=tokenizer, model=model)
+                embed_throughput = len(texts) / (time.perf_counter() - start)
+
+                if baseline is None:
+                    baseline = {'answers': [a['answer'] for a in answers], 'embeddings': embeddings}
+                agreement = np.mean([a['answer'] == b for a, b in zip(answers, baseline['answers'])])
+                norms = np.linalg.norm(embeddings, axis=1) * np.linalg.norm(baseline['embeddings'], axis=1)
+                cosine = np.sum(embeddings * baseline['embeddings'], axis=1) / np.maximum(norms, 1e-12)
+
+                results.append({
+                    'mode': mode,
+                    'threads': threads,
+                    'qa_p50_ms': round(_percentile(single, 50), 1),
+                    'qa_p95_ms': round(_percentile(single, 95), 1),
+                    'qa_per_s': round(qa_throughput, 1),
+                    'embed_per_s': round(embed_throughput, 1),
+                    'weights_mb': round(_weights_mb(qa_pipeline.model) + _weights_mb(model), 1),
+                    'rss_mb': round(_rss_mb(), 1) if _rss_mb() else None,
+                    'qa_exact_match_vs_fp32': round(float(agreement), 3),
+                    'embedding_cosine_mean': round(float(cosine.mean()), 4),
+                    'embedding_cosine_min': round(float(cosine.min()), 4),
+                })
+                del qa_pipeline, model
+
+        columns = list(results[0])
+        self.stdout.write("  ".join(f"{c:>14}" for c in columns))
+        for row in results:
+            self.stdout.write("  ".join(f"{str(row[c]):>14}" for c in columns))
+        self.stdout.write("(fp32 baseline for drift: first thread count; rss_mb is cumulative for the process)")
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump({'max_seq_length': options['max_seq_length'], 'results': results}, fh, indent=2)
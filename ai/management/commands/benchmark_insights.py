@@ -0,0 +1,254 @@
+import json
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import zlib
+from unittest import mock
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+
+from ai import inference, views
+from ai.indexing import VECTOR_DIMENSION, EmbeddingManifest
+from ai.pipeline import wait_for_syncs
+from ai.registry import registry
+from ai.vector_store import LocalVectorStore
+from ai_shopify_dashboard.timing import collect
+from ecommerce import conditional
+from ecommerce.fake_shopify import FakeShopifyServer, generate_fixtures
+
+STAGES = ['catalog_fetch', 'products_check', 'cache_lookup', 'snapshot', 'embedding', 'upsert', 'index_wait', 'routing', 'lexical',
+          'query_embedding', 'query_embedding_wait', 'retrieval', 'context', 'qa', 'fallback']
+
+
+def fake_embed_texts(texts, batch_size=None, **kwargs):
+    # Deterministic pseudo-embeddings: the same text always maps to the same unit vector
+    matrix = np.empty((len(texts), VECTOR_DIMENSION), dtype=np.float32)
+    for i, text in enumerate(texts):
+        matrix[i] = np.random.default_rng(zlib.crc32(text.encode('utf-8'))).standard_normal(VECTOR_DIMENSION)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+class FakeQAPipeline:
+    """Answers with the start of the context and a score derived from the question, so some queries hit the fallback branches."""
+
+    def __call__(self, inputs=None, question=None, context=None, batch_size=None, **kwargs):
+        items = inputs if inputs is not None else [{'question': question, 'context': context}]
+        results = [
+            {'answer': ' '.join(item['context'].split()[:4]), 'score': (zlib.crc32(item['question'].encode('utf-8')) % 100) / 100, 'start': 0, 'end': 0}
+            for item in items
+        ]
+        return results if inputs is not None else results[0]
+
+
+def benchmark_queries(products):
+    # One query per get_insights branch, built from titles that exist in the catalog
+    out_of_stock = next((p for p in products if p['variants'][0]['inventory_quantity'] == 0), products[0])
+    first, second = products[0], products[len(products) // 2]
+    noun = first['title'].split()[1]
+    return [
+        out_of_stock['title'],
+        "Which products are out of stock?",
+        "Which products are low stock?",
+        "Which products are in stock?",
+        f"Is the {second['title']} available",
+        f"how many {noun} available",
+        "What is the most expensive product?",
+        "What is the cheapest product?",
+        "What is the best product?",
+        f"What is the price {first['title']}",
+        f"compare {first['title'].split()[-1]} and {second['title'].split()[-1]}",
+        f"Tell me about {noun} products",
+    ]
+
+
+def percentiles(values):
+    if not values:
+        return None
+    array = np.asarray(values)
+    return {
+        'p50': round(float(np.percentile(array, 50)), 3),
+        'p95': round(float(np.percentile(array, 95)), 3),
+        'p99': round(float(np.percentile(array, 99)), 3),
+        'mean': round(float(array.mean()), 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ("Run get_insights end to end against a fake Shopify and a local vector index on synthetic catalogs, "
+            "reporting p50/p95/p99 latency per stage and peak memory.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,1000,5000', help="Comma separated catalog sizes.")
+        parser.add_argument('--repeat', type=int, default=5, help="Warm passes over the query set per catalog size.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--leak-rate', type=float, default=1000.0,
+                            help="Client-side Shopify call pacing (calls/s). Defaults to effectively unthrottled, use 2 to include Shopify's standard limit.")
+        parser.add_argument('--concurrency', type=int, default=None, help="AI_PIPELINE_CONCURRENCY for the run (1 is sequential).")
+        parser.add_argument('--consistency', choices=['strict', 'eventual'], default=None, help="AI_PIPELINE_CONSISTENCY for the run.")
+        parser.add_argument('--real-models', action='store_true', help="Use the configured QA and embedding models instead of the fakes.")
+        parser.add_argument('--with-cache', action='store_true', help="Keep the insights answer cache on (off by default so every pass runs the pipeline).")
+        parser.add_argument('--json', dest='json_path', default=None, help="Write the results to this file.")
+        parser.add_argument('--compare', default=None, help="A previous --json file to print p50/p95 deltas against.")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        server = FakeShopifyServer().start()
+        patches = [mock.patch.object(views, 'insights_cache', views.insights_cache if options['with_cache'] else None)]
+        if not options['real_models']:
+            patches.append(mock.patch.object(inference, 'embed_texts', fake_embed_texts))
+            registry.set('qa_pipeline', FakeQAPipeline())
+
+        results = []
+        try:
+            settings_overrides = {
+                'SHOPIFY_BASE_URL': server.base_url,
+                'SHOPIFY_LEAK_RATE': options['leak_rate'],
+                'CATALOG_SOURCE': 'shopify',
+                'AI_INFERENCE_MODE': 'local',
+            }
+            if options['concurrency'] is not None:
+                settings_overrides['AI_PIPELINE_CONCURRENCY'] = options['concurrency']
+            if options['consistency'] is not None:
+                settings_overrides['AI_PIPELINE_CONSISTENCY'] = options['consistency']
+            with override_settings(**settings_overrides):
+                for patch in patches:
+                    patch.start()
+                for size in sizes:
+                    results.append(self.run_size(server, size, options))
+        finally:
+            for patch in patches:
+                patch.stop()
+            server.stop()
+
+        report = {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'real_models': options['real_models'],
+            'with_cache': options['with_cache'],
+            'repeat': options['repeat'],
+            'leak_rate': options['leak_rate'],
+            'concurrency': options['concurrency'] or settings.AI_PIPELINE_CONCURRENCY,
+            'consistency': options['consistency'] or settings.AI_PIPELINE_CONSISTENCY,
+            'results': results,
+        }
+        self.print_report(report)
+        if options['compare']:
+            with open(options['compare']) as fh:
+                self.print_comparison(json.load(fh), report)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(f"Wrote {options['json_path']}")
+
+    def run_size(self, server, size, options):
+        fixtures = generate_fixtures(products=size, orders=0, customers=0, seed=options['seed'])
+        server.fixtures = fixtures
+        queries = benchmark_queries(fixtures['products'])
+        factory = RequestFactory()
+
+        def run(query):
+            request = factory.get('/ai/get_insights/', {'query': query})
+            with collect() as timer:
+                start = time.perf_counter()
+                response = views.get_insights(request)
+                total = (time.perf_counter() - start) * 1000
+            if response.status_code != 200:
+                raise RuntimeError(f"get_insights failed for {query!r}: {response.content[:200]}")
+            return total, timer.as_dict()
+
+        def empty_index(directory):
+            # A fresh local index and manifest, so the next request embeds and upserts the whole catalog,
+            # and no catalog or answer cached by an earlier run
+            registry.set('vector_store', LocalVectorStore(os.path.join(directory, 'index')))
+            conditional.invalidate('products')
+            if views.insights_cache is not None:
+                views.insights_cache.backend.clear()
+            manifest = EmbeddingManifest(os.path.join(directory, 'manifest.tsv'))
+            return mock.patch.object(views, 'get_manifest', lambda namespace=None: manifest)
+
+        with tempfile.TemporaryDirectory() as directory:
+            # Peak Python allocations of a cold request, measured separately since tracing slows everything down
+            with empty_index(os.path.join(directory, 'traced')):
+                tracemalloc.start()
+                run(queries[-1])
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+            with empty_index(os.path.join(directory, 'timed')):
+                cold_total, cold_stages = run(queries[-1])
+                # With eventual consistency the cold request may return before the index is built
+                wait_for_syncs()
+
+                totals = []
+                stages = {name: [] for name in STAGES}
+                for _ in range(options['repeat']):
+                    for query in queries:
+                        total, timings = run(query)
+                        totals.append(total)
+                        for name in STAGES:
+                            if name in timings:
+                                stages[name].append(timings[name])
+                        # Nested spans such as shopify_request are left out, they are already inside catalog_fetch.
+                        # Stages on the pool overlap the request thread, so the sum can exceed the total
+                        stages.setdefault('other', []).append(max(0.0, total - sum(timings.get(name, 0) for name in STAGES)))
+                wait_for_syncs()
+
+        return {
+            'products': size,
+            'queries': len(queries),
+            'cold_ms': dict(cold_stages, other=round(max(0.0, cold_total - sum(cold_stages.get(name, 0) for name in STAGES)), 3), total=round(cold_total, 3)),
+            'warm_ms': dict({name: percentiles(values) for name, values in stages.items() if values}, total=percentiles(totals)),
+            'cold_peak_traced_mb': round(peak / 2 ** 20, 1),
+            # Linux reports ru_maxrss in KiB; this is the process peak so far, not per size
+            'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }
+
+    def print_report(self, report):
+        for result in report['results']:
+            self.stdout.write(f"\n{result['products']} products, {result['queries']} queries x {report['repeat']} "
+                              f"(cold total {result['cold_ms']['total']:.1f} ms, cold peak {result['cold_peak_traced_mb']} MB traced, "
+                              f"max RSS {result['max_rss_mb']} MB)")
+            self.stdout.write(f"  {'stage':<16} {'cold ms':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+            for name in STAGES + ['other', 'total']:
+                warm = result['warm_ms'].get(name)
+                cold = result['cold_ms'].get(name)
+                if warm is None and cold is None:
+                    continue
+                cold_label = f"{cold:10.2f}" if cold is not None else f"{'-':>10}"
+                if warm is None:
+                    self.stdout.write(f"  {name:<16} {cold_label} {'-':>10} {'-':>10} {'-':>10}")
+                    continue
+                self.stdout.write(f"  {name:<16} {cold_label} {warm['p50']:10.2f} {warm['p95']:10.2f} {warm['p99']:10.2f}")
+
+    def print_comparison(self, baseline, report):
+        previous = {result['products']: result for result in baseline['results']}
+        self.stdout.write(f"\nDelta vs {baseline.get('commit') or 'baseline'} (negative is faster)")
+        for result in report['results']:
+            before = previous.get(result['products'])
+            if before is None:
+                continue
+            self.stdout.write(f"  {result['products']} products")
+            for name in STAGES + ['other', 'total']:
+                now, then = result['warm_ms'].get(name), before['warm_ms'].get(name)
+                if not now or not then:
+                    continue
+                changes = []
+                for q in ('p50', 'p95'):
+                    delta = now[q] - then[q]
+                    relative = f" ({delta / then[q] * 100:+.0f}%)" if then[q] else ""
+                    changes.append(f"{q} {delta:+.2f} ms{relative}")
+                self.stdout.write(f"    {name:<16} {', '.join(changes)}")
@@ -0,0 +1,101 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from ai.batching import MicroBatcher
+from ai.indexing import product_metadata
+from ai.management.commands.benchmark_embeddings import synthetic_catalog
+
+QUESTIONS = [
+    "Which products are out of stock?",
+    "What is the cheapest backpack?",
+    "How many wireless headphones are available?",
+    "What is the price of the leather watch?",
+    "Which mug has the most stock?",
+    "Is the vintage lamp in stock?",
+]
+
+
+def _stubbed_contexts(count, top_k=10):
+    # Retrieval is stubbed out: every question gets the metadata text of top_k catalog products
+    catalog = synthetic_catalog(count * top_k, seed=1)
+    return [
+        " ".join(product_metadata(product)['text'] for product in catalog[i * top_k:(i + 1) * top_k])
+        for i in range(count)
+    ]
+
+
+class FakeQAPipeline:
+    """
+    Stand-in with a fixed per-forward overhead plus a per-example cost, for running
+    without model weights. Forwards are serialized, like torch saturating every core.
+    """
+
+    def __init__(self, overhead_ms, per_item_ms):
+        self.overhead = overhead_ms / 1000
+        self.per_item = per_item_ms / 1000
+        self._cpu = threading.Lock()
+
+    def __call__(self, inputs=None, question=None, context=None, batch_size=None):
+        items = inputs if inputs is not None else [{'question': question, 'context': context}]
+        with self._cpu:
+            time.sleep(self.overhead + self.per_item * len(items))
+        results = [{'answer': item['context'][:20], 'score': 0.5, 'start': 0, 'end': 20} for item in items]
+        return results if inputs is not None else results[0]
+
+
+class Command(BaseCommand):
+    help = "Throughput of concurrent QA requests with and without the micro-batching scheduler (retrieval stubbed)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', default='1,16,32,64', help="Comma separated numbers of concurrent clients.")
+        parser.add_argument('--requests', type=int, default=256, help="Questions per run.")
+        parser.add_argument('--max-batch-size', type=int, default=16)
+        parser.add_argument('--max-wait-ms', type=float, default=5)
+        parser.add_argument('--fake-model', action='store_true',
+                            help="Use a sleep-based fake QA model (20 ms per forward + 2 ms per example) instead of RoBERTa.")
+
+    def handle(self, *args, **options):
+        if options['fake_model']:
+            qa_pipeline = FakeQAPipeline(20, 2)
+        else:
+            from ai.registry import registry
+            qa_pipeline = registry.get('qa_pipeline')
+
+        contexts = _stubbed_contexts(len(QUESTIONS))
+        work = [(QUESTIONS[i % len(QUESTIONS)], contexts[i % len(contexts)]) for i in range(options['requests'])]
+
+        def process_batch(items):
+            results = qa_pipeline([{'question': q, 'context': c} for q, c in items], batch_size=len(items))
+            return [results] if isinstance(results, dict) else list(results)
+
+        # Warm-up so lazy initialization is not measured
+        qa_pipeline(question=work[0][0], context=work[0][1])
+
+        self.stdout.write(f"{'clients':>8} {'mode':>9} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'avg batch':>10}")
+        for concurrency in [int(c) for c in options['concurrency'].split(',') if c.strip()]:
+            batcher = MicroBatcher('benchmark', process_batch, options['max_batch_size'], options['max_wait_ms'])
+            modes = {
+                'direct': lambda item: qa_pipeline(question=item[0], context=item[1]),
+                'batched': lambda item: batcher.submit(item),
+            }
+            for mode, call in modes.items():
+                latencies = []
+
+                def timed(item):
+                    start = time.perf_counter()
+                    call(item)
+                    latencies.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    list(pool.map(timed, work))
+                elapsed = time.perf_counter() - start
+
+                latencies.sort()
+                p50 = latencies[len(latencies) // 2] * 1000
+                p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+                avg_batch = batcher.metrics()['avg_batch_size'] if mode == 'batched' else 1
+                self.stdout.write(f"{concurrency:>8} {mode:>9} {len(work) / elapsed:9.1f} {p50:9.1f} {p95:9.1f} {avg_batch:>10}")
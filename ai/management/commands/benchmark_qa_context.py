@@ -0,0 +1,145 @@
+import math
+import random
+import re
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ai.catalog_snapshot import tokenize
+from ai.context import best_answer, concatenated_context, estimate_tokens, select_passages
+from ai.indexing import product_metadata
+from ai.inference import qa_kwargs
+from ai.intents import STOPWORDS
+from ai.management.commands.benchmark_embeddings import synthetic_catalog
+
+TEMPLATES = [
+    "How many units of {title} do we have?",
+    "What is the inventory quantity of {title}?",
+    "How much {title} stock is left?",
+    "Tell me the inventory for {title}",
+]
+
+_SEGMENT = re.compile(r'(?<=\d) (?=[A-Z])')  # Between the metadata texts of two products
+
+
+class FakeQAPipeline:
+    """
+    Stand-in for running without model weights. Answers with the last number of the
+    product text sharing the most words with the question, and costs a fixed overhead per
+    forward plus a per-token cost of the padded batch, with contexts longer than
+    ``max_seq_len`` split into overlapping windows like the real pipeline does.
+    """
+
+    def __init__(self, overhead_ms=5, per_token_ms=0.05, max_seq_len=384, doc_stride=128):
+        self.overhead = overhead_ms / 1000
+        self.per_token = per_token_ms / 1000
+        self.max_seq_len = max_seq_len
+        self.doc_stride = doc_stride
+
+    def _sequences(self, question, context):
+        length = estimate_tokens(question) + estimate_tokens(context) + 4
+        if length <= self.max_seq_len:
+            return [length]
+        return [self.max_seq_len] * (math.ceil((length - self.max_seq_len) / self.doc_stride) + 1)
+
+    def _answer(self, question, context):
+        words = {token for token in tokenize(question) if token not in STOPWORDS}
+        best, best_overlap = '', -1.0
+        for segment in _SEGMENT.split(context):
+            overlap = len(words & set(tokenize(segment))) / max(len(words), 1)
+            if overlap > best_overlap:
+                numbers = re.findall(r'\d+', segment)
+                best, best_overlap = numbers[-1] if numbers else segment, overlap
+        return {'answer': best, 'score': best_overlap, 'start': 0, 'end': 0}
+
+    def __call__(self, inputs=None, question=None, context=None, batch_size=None, **kwargs):
+        items = inputs if inputs is not None else [{'question': question, 'context': context}]
+        sequences = [length for item in items for length in self._sequences(item['question'], item['context'])]
+        time.sleep(self.overhead + self.per_token * len(sequences) * max(sequences))
+        results = [self._answer(item['question'], item['context']) for item in items]
+        return results if inputs is not None else results[0]
+
+
+def retrieved(catalog, target, top_k, rng):
+    # Retrieval is stubbed: the target among products with the same noun first, then any others,
+    # at a random rank, the way a dense index ranks near-duplicates around the right product
+    noun = target['title'].split()[1]
+    similar = [product for product in catalog if product is not target and product['title'].split()[1] == noun]
+    others = [product for product in catalog if product is not target and product['title'].split()[1] != noun]
+    picked = rng.sample(similar, min(len(similar), top_k - 1))
+    picked += rng.sample(others, top_k - 1 - len(picked))
+    picked.insert(rng.randrange(top_k), target)
+    return [{'id': str(product['id']), 'score': 0.0, 'metadata': product_metadata(product)} for product in picked]
+
+
+def summary(values):
+    array = np.asarray(values) * 1000
+    return float(np.percentile(array, 50)), float(np.percentile(array, 95))
+
+
+class Command(BaseCommand):
+    help = ("Offline evaluation of QA context assembly: latency and answer agreement of budgeted per-passage "
+            "QA against one concatenated context, over stubbed retrieval results with a known answer.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=100)
+        parser.add_argument('--top-k', default='10,25,50', help="Comma separated numbers of retrieved matches.")
+        parser.add_argument('--budgets', default='48,96,192', help="Comma separated passage token budgets.")
+        parser.add_argument('--catalog-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--fake-model', action='store_true',
+                            help="Use a lexical fake QA model (5 ms per forward + 0.05 ms per padded token) instead of RoBERTa.")
+
+    def handle(self, *args, **options):
+        if options['fake_model']:
+            qa_pipeline = FakeQAPipeline()
+            kwargs = {}
+        else:
+            from ai.registry import registry
+            qa_pipeline = registry.get('qa_pipeline')
+            kwargs = qa_kwargs()
+
+        catalog = synthetic_catalog(options['catalog_size'], seed=options['seed'])
+        rng = random.Random(options['seed'])
+        targets = rng.sample(catalog, options['questions'])
+        questions = [rng.choice(TEMPLATES).format(title=target['title']) for target in targets]
+
+        # Warm-up so lazy initialization is not measured
+        qa_pipeline(question=questions[0], context=targets[0]['title'], **kwargs)
+
+        self.stdout.write(f"{'top_k':>6} {'budget':>7} {'concat p50':>11} {'p95':>7} {'passages p50':>13} {'p95':>7} "
+                          f"{'kept':>5} {'tokens':>7} {'agree %':>8} {'concat ok %':>12} {'passages ok %':>14}")
+        for top_k in [int(k) for k in options['top_k'].split(',') if k.strip()]:
+            retrievals = [retrieved(catalog, target, top_k, random.Random(options['seed'] + i)) for i, target in enumerate(targets)]
+
+            concat_times, concat_answers = [], []
+            for question, matches in zip(questions, retrievals):
+                start = time.perf_counter()
+                concat_answers.append(qa_pipeline(question=question, context=concatenated_context(matches), **kwargs))
+                concat_times.append(time.perf_counter() - start)
+
+            for budget in [int(b) for b in options['budgets'].split(',') if b.strip()]:
+                times, answers, kept, tokens = [], [], [], []
+                for question, matches in zip(questions, retrievals):
+                    start = time.perf_counter()
+                    passages, stats = select_passages(question, matches, budget)
+                    results = qa_pipeline([{'question': question, 'context': passage} for passage in passages],
+                                          batch_size=len(passages), **kwargs)
+                    answers.append(best_answer([results] if isinstance(results, dict) else results))
+                    times.append(time.perf_counter() - start)
+                    kept.append(stats['passages'])
+                    tokens.append(stats['tokens'])
+
+                agree = sum(a['answer'].strip().lower() == b['answer'].strip().lower() for a, b in zip(concat_answers, answers))
+                concat_ok = sum(str(target['inventory_quantity']) in answer['answer'] for target, answer in zip(targets, concat_answers))
+                passages_ok = sum(str(target['inventory_quantity']) in answer['answer'] for target, answer in zip(targets, answers))
+                count = len(questions)
+                concat_p50, concat_p95 = summary(concat_times)
+                p50, p95 = summary(times)
+                self.stdout.write(f"{top_k:>6} {budget:>7} {concat_p50:11.1f} {concat_p95:7.1f} {p50:13.1f} {p95:7.1f} "
+                                  f"{np.mean(kept):5.1f} {np.mean(tokens):7.0f} {agree / count * 100:8.0f} "
+                                  f"{concat_ok / count * 100:12.0f} {passages_ok / count * 100:14.0f}")
+        self.stdout.write(f"(AI_QA_TOP_K={settings.AI_QA_TOP_K}, AI_QA_CONTEXT_TOKENS={settings.AI_QA_CONTEXT_TOKENS}; "
+                          f"'ok' is the answer containing the asked product's inventory quantity)")
@@ -0,0 +1,93 @@
+import os
+import random
+import tempfile
+import time
+from unittest import mock
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ai import inference
+from ai.indexing import EmbeddingManifest
+from ai.lexical import LexicalIndex, decisive, fuse
+from ai.management.commands.benchmark_insights import fake_embed_texts
+from ai.vector_store import LocalVectorStore
+from ecommerce.fake_shopify import generate_fixtures
+from ecommerce.pagination import product_record
+
+
+def lookups(records, count, rng):
+    """(kind, query, ids of the products that answer it) for name, partial name and category questions."""
+    queries = []
+    for record in rng.sample(records, count):
+        adjective, noun, number = record['title'].split()
+        queries.append(('name', record['title'].lower(), {record['id']}))
+        queries.append(('partial', f"{noun} {number}", {record['id']}))
+        similar = {other['id'] for other in records if other['title'].split()[:2] == [adjective, noun]}
+        queries.append(('category', f"Tell me about {adjective.lower()} {noun.lower()}s", similar))
+    return queries
+
+
+class Command(BaseCommand):
+    help = ("Hit rate and latency of vector-only against hybrid (BM25 + vector, reciprocal rank fusion) "
+            "retrieval on a synthetic catalog, by kind of question.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--queries', type=int, default=100, help="Products looked up, three questions each.")
+        parser.add_argument('--top-k', type=int, default=None, help="Matches per question (default AI_QA_TOP_K).")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--real-models', action='store_true', help="Embed with the configured model instead of the fake.")
+
+    def handle(self, *args, **options):
+        top_k = options['top_k'] or settings.AI_QA_TOP_K
+        fixtures = generate_fixtures(products=options['products'], orders=0, customers=0, seed=options['seed'])
+        records = [product_record(product) for product in fixtures['products']]
+        for record in records:
+            record['price'] = float(record['price'])
+        queries = lookups(records, options['queries'], random.Random(options['seed']))
+
+        patches = [] if options['real_models'] else [mock.patch.object(inference, 'embed_texts', fake_embed_texts)]
+        for patch in patches:
+            patch.start()
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                index = LocalVectorStore(os.path.join(directory, 'index'))
+                EmbeddingManifest(os.path.join(directory, 'manifest.tsv')).sync(records, index, inference.remote_embed_products)
+                lexical = LexicalIndex()
+                start = time.perf_counter()
+                lexical.sync(records)
+                build_ms = (time.perf_counter() - start) * 1000
+                results = {mode: self.run(mode, queries, index, lexical, top_k) for mode in ('vector', 'hybrid')}
+        finally:
+            for patch in patches:
+                patch.stop()
+
+        self.stdout.write(f"{options['products']} products, BM25 index built in {build_ms:.1f} ms, top_k {top_k}")
+        self.stdout.write(f"{'kind':>9} {'mode':>7} {'hit@1 %':>8} {'hit@k %':>8} {'p50 ms':>8} {'p95 ms':>8} {'embedded %':>11}")
+        for kind in ('name', 'partial', 'category'):
+            for mode, rows in results.items():
+                rows = [row for row in rows if row['kind'] == kind]
+                latencies = np.asarray([row['ms'] for row in rows])
+                self.stdout.write(f"{kind:>9} {mode:>7} {np.mean([row['hit1'] for row in rows]) * 100:8.0f} "
+                                  f"{np.mean([row['hitk'] for row in rows]) * 100:8.0f} {np.percentile(latencies, 50):8.2f} "
+                                  f"{np.percentile(latencies, 95):8.2f} {np.mean([row['embedded'] for row in rows]) * 100:11.0f}")
+
+    def run(self, mode, queries, index, lexical, top_k):
+        rows = []
+        for kind, query, relevant in queries:
+            start = time.perf_counter()
+            hits = lexical.search(query, top_k) if mode == 'hybrid' else []
+            embedded = not decisive(hits)
+            if embedded:
+                matches = index.query(vector=inference.embed_query(query), top_k=top_k, include_metadata=True)['matches']
+                if mode == 'hybrid':
+                    matches = fuse(matches, lexical.matches(hits), top_k)
+            else:
+                matches = lexical.matches(hits)
+            elapsed = (time.perf_counter() - start) * 1000
+            ids = [int(match['id']) for match in matches]
+            rows.append({'kind': kind, 'ms': elapsed, 'embedded': embedded,
+                         'hit1': bool(ids) and ids[0] in relevant, 'hitk': bool(relevant & set(ids))})
+        return rows
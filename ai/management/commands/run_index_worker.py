@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ai.indexing import get_manifest
+from ai.inference import local_resources, remote_embed_products
+from ai.ingestion import process_pending
+from ai.registry import registry
+from ecommerce.catalog import product_records
+from ecommerce.webhooks import pending_count
+
+
+class Command(BaseCommand):
+    help = "Drain the product webhook queue into the local mirror and the vector index, in coalesced batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Process what is queued and exit.")
+        parser.add_argument('--bootstrap', action='store_true', help="First sync the whole catalog into the index (initial build).")
+        parser.add_argument('--source', default=None, help="Catalog source for --bootstrap ('shopify', 'graphql' or 'mirror').")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Most events applied in one batch.")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds between checks of an empty queue.")
+        parser.add_argument('--debounce-ms', type=float, default=500,
+                            help="Wait this long after new events show up, so a burst lands in one batch.")
+        parser.add_argument('--max-attempts', type=int, default=5)
+
+    def handle(self, *args, **options):
+        # Only the embedder and the index, the QA model stays with the web workers
+        registry.warm_up([name for name in local_resources() if name != 'qa_pipeline'])
+        if options['bootstrap']:
+            product_list = [dict(record, price=float(record['price'])) for record in product_records(options['source'])]
+            stats = get_manifest().sync(product_list, registry.get('vector_store'), remote_embed_products)
+            self.stdout.write(f"Bootstrap: {stats}")
+
+        while True:
+            if pending_count() == 0:
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+                continue
+            if not options['once']:
+                time.sleep(options['debounce_ms'] / 1000)
+            start = time.perf_counter()
+            try:
+                stats = process_pending(options['batch_size'], options['max_attempts'])
+            except Exception as e:
+                if options['once']:
+                    raise
+                self.stderr.write(f"Index batch failed, retrying: {e}")
+                time.sleep(options['poll_interval'])
+                continue
+            if stats:
+                self.stdout.write(f"Applied {stats['events']} events ({stats['products']} products) in "
+                                  f"{time.perf_counter() - start:.2f}s: {stats['embedded']} embedded, "
+                                  f"{stats['skipped']} unchanged, {stats['deleted']} deleted")
@@ -0,0 +1,39 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ai.inference_server import InferenceServer, parse_address
+from ai.registry import registry
+
+
+class Command(BaseCommand):
+    help = "Load the QA and embedding models once and serve them to the web workers (AI_INFERENCE_MODE=server)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--address', default=None, help="Overrides AI_INFERENCE_ADDRESS ('unix:/path.sock' or 'host:port').")
+        parser.add_argument('--max-batch-size', type=int, default=settings.AI_BATCH_MAX_SIZE)
+        parser.add_argument('--max-wait-ms', type=float, default=settings.AI_BATCH_MAX_WAIT_MS)
+
+    def handle(self, *args, **options):
+        address = options['address'] or settings.AI_INFERENCE_ADDRESS
+        path, family = parse_address(address)
+        if family == 'AF_UNIX':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            # A socket left behind by a previous run would make bind() fail
+            if os.path.exists(path):
+                os.unlink(path)
+
+        server = InferenceServer(address, options['max_batch_size'], options['max_wait_ms'])
+        self.stdout.write("Loading models...")
+        registry.warm_up(['tokenizer', 'embedding_model', 'qa_pipeline'])
+        for name, status in registry.status().items():
+            if status['loaded']:
+                self.stdout.write(f"  {name}: {status['load_seconds']}s")
+        try:
+            self.stdout.write(f"Serving inference on {address}")
+            server.serve_forever(warm_up=False)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
@@ -0,0 +1,95 @@
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+
+from ai_shopify_dashboard.timing import stage
+
+# Thread pool for the get_insights stages that do not depend on each other: the query
+# embedding runs while the catalog is fetched, and the index sync while the snapshot is
+# built and the query is answered. Model inference and HTTP both release the GIL.
+
+_executor = None
+_executor_workers = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    # Recreated when AI_PIPELINE_CONCURRENCY changes (benchmarks switch it between runs)
+    global _executor, _executor_workers
+    workers = settings.AI_PIPELINE_CONCURRENCY
+    with _executor_lock:
+        if workers != _executor_workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='insights-stage') if workers > 1 else None
+            _executor_workers = workers
+        return _executor
+
+
+def submit(fn, *args, **kwargs):
+    """
+    Run ``fn`` on the stage pool and return its Future. The pool does not copy context
+    variables by itself, so each call runs in a copy of the caller's context and its
+    stage() timings land on the request's timer. With concurrency off ``fn`` runs right
+    away in the caller, which keeps the old sequential behaviour.
+    """
+    executor = get_executor()
+    if executor is None:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def run_stage(name, fn, *args):
+    with stage(name):
+        return fn(*args)
+
+
+_syncs = {}
+_syncs_lock = threading.RLock()
+
+
+def sync_index(manifest, product_list, key, index, embed):
+    """
+    Start syncing the index with ``product_list`` unless a sync with the same ``key``
+    (index namespace and catalog version) is already running, in which case its Future
+    is shared.
+    """
+    with _syncs_lock:
+        future = _syncs.get(key)
+        if future is not None:
+            return future
+        future = submit(manifest.sync, product_list, index, embed)
+        _syncs[key] = future
+
+    def done(finished):
+        with _syncs_lock:
+            if _syncs.get(key) is finished:
+                del _syncs[key]
+        if finished.exception() is not None:
+            # Nobody may be waiting for it any more in eventual mode
+            print(f"Index sync failed: {finished.exception()}")
+
+    future.add_done_callback(done)
+    return future
+
+
+def index_status(future, wait):
+    # Sync stats once it finished; with wait=False a running sync is reported as such
+    if wait or future.done():
+        with stage('index_wait'):
+            return future.result()
+    return {"status": "in_progress"}
+
+
+def wait_for_syncs():
+    with _syncs_lock:
+        futures = list(_syncs.values())
+    for future in futures:
+        future.exception()
@@ -0,0 +1,155 @@
+import threading
+import time
+
+QA_MODEL_NAME = 'deepset/roberta-base-squad2'
+EMBEDDING_MODEL_NAME = 'distilbert-base-uncased'
+
+
+class ResourceRegistry:
+    """
+    Loads heavy resources (models, API clients) on first use instead of at import
+    time and remembers how long each one took. ``warm_up`` loads them ahead of the
+    first request, optionally from a background thread.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._resources = {}
+        self._load_seconds = {}
+        self._errors = {}
+        self._locks = {}
+        self._warm_up_thread = None
+
+    def register(self, name, loader):
+        self._loaders[name] = loader
+        self._locks[name] = threading.Lock()
+
+    def get(self, name):
+        if name in self._resources:
+            return self._resources[name]
+        with self._locks[name]:
+            # Another thread may have finished loading while we waited for the lock
+            if name not in self._resources:
+                start = time.perf_counter()
+                try:
+                    resource = self._loaders[name]()
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    raise
+                self._load_seconds[name] = time.perf_counter() - start
+                self._errors.pop(name, None)
+                self._resources[name] = resource
+        return self._resources[name]
+
+    def set(self, name, resource):
+        # Install an already built resource in place of the loader (benchmarks, local fakes)
+        self._resources[name] = resource
+        self._load_seconds[name] = 0.0
+        self._errors.pop(name, None)
+
+    def is_loaded(self, name):
+        return name in self._resources
+
+    def warm_up(self, names=None, background=False):
+        names = list(names or self._loaders)
+        if not background:
+            self._load_all(names)
+            return None
+        if self._warm_up_thread is None or not self._warm_up_thread.is_alive():
+            self._warm_up_thread = threading.Thread(target=self._load_all, args=(names,), name='ai-warm-up', daemon=True)
+            self._warm_up_thread.start()
+        return self._warm_up_thread
+
+    def _load_all(self, names):
+        for name in names:
+            try:
+                self.get(name)
+            except Exception as e:
+                print(f"Failed to load {name}: {e}")
+
+    def status(self):
+        return {
+            name: {
+                'loaded': name in self._resources,
+                'load_seconds': round(self._load_seconds[name], 3) if name in self._load_seconds else None,
+                'error': self._errors.get(name)
+            }
+            for name in self._loaders
+        }
+
+    @property
+    def warming_up(self):
+        return self._warm_up_thread is not None and self._warm_up_thread.is_alive()
+
+
+_torch_configured = False
+
+
+def configure_torch():
+    # Per-process CPU settings, applied once before the first model is loaded
+    global _torch_configured
+    if _torch_configured:
+        return
+    import torch
+    from django.conf import settings
+    if settings.AI_TORCH_THREADS:
+        torch.set_num_threads(settings.AI_TORCH_THREADS)
+    if settings.AI_TORCH_INTEROP_THREADS:
+        try:
+            torch.set_num_interop_threads(settings.AI_TORCH_INTEROP_THREADS)
+        except RuntimeError:
+            # Only allowed before any inter-op parallel work has started
+            pass
+    _torch_configured = True
+
+
+def quantize_dynamic(model):
+    # int8 weights for every nn.Linear, activations quantized on the fly (CPU only)
+    import torch
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_qa_pipeline(quantize=False):
+    from transformers import pipeline
+    configure_torch()
+    qa_pipeline = pipeline('question-answering', model=QA_MODEL_NAME)
+    if quantize:
+        qa_pipeline.model = quantize_dynamic(qa_pipeline.model)
+    return qa_pipeline
+
+
+def load_embedding_model(quantize=False):
+    from transformers import AutoModel
+    configure_torch()
+    model = AutoModel.from_pretrained(EMBEDDING_MODEL_NAME)
+    model.eval()
+    if quantize:
+        model = quantize_dynamic(model)
+    return model
+
+
+def _load_qa_pipeline():
+    from django.conf import settings
+    return load_qa_pipeline(quantize=settings.AI_QUANTIZE)
+
+
+def _load_tokenizer():
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(EMBEDDING_MODEL_NAME)
+
+
+def _load_embedding_model():
+    from django.conf import settings
+    return load_embedding_model(quantize=settings.AI_QUANTIZE)
+
+
+def _load_vector_store():
+    from .vector_store import create_vector_store
+    return create_vector_store()
+
+
+registry = ResourceRegistry()
+registry.register('qa_pipeline', _load_qa_pipeline)
+registry.register('tokenizer', _load_tokenizer)
+registry.register('embedding_model', _load_embedding_model)
+registry.register('vector_store', _load_vector_store)
@@ -0,0 +1,282 @@
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from .catalog_snapshot import CatalogSnapshot
+from .indexing import VECTOR_DIMENSION, EmbeddingManifest
+from .inference_server import InferenceServer
+from .intents import route
+from .vector_store import LocalVectorStore
+
+
+def fake_embed(products):
+    return np.random.default_rng(len(products)).random((len(products), VECTOR_DIMENSION))
+
+
+def catalog(count):
+    return [{'id': i, 'title': f"Product {i}", 'price': 10.0, 'inventory_quantity': i} for i in range(count)]
+
+
+class TemporaryDirectoryTestCase(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+
+class EmbeddingManifestTests(TemporaryDirectoryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.index = LocalVectorStore(os.path.join(self.directory, 'index'))
+        self.path = os.path.join(self.directory, 'manifest.tsv')
+
+    def test_only_changes_are_embedded_and_appended(self):
+        products = catalog(50)
+        manifest = EmbeddingManifest(self.path)
+        self.assertEqual(manifest.sync(products, self.index, fake_embed), {'skipped': 0, 'embedded': 50, 'deleted': 0})
+        size = os.path.getsize(self.path)
+
+        products[3]['inventory_quantity'] = 99
+        self.assertEqual(manifest.sync(products[:-1], self.index, fake_embed), {'skipped': 48, 'embedded': 1, 'deleted': 1})
+        # Two lines appended, nothing rewritten
+        with open(self.path) as fh:
+            self.assertEqual(len(fh.read()[size:].splitlines()), 2)
+
+        reloaded = EmbeddingManifest(self.path)
+        self.assertEqual(reloaded.hashes, manifest.hashes)
+        self.assertEqual(reloaded.sync(products[:-1], self.index, fake_embed)['embedded'], 0)
+
+    def test_log_is_compacted(self):
+        manifest = EmbeddingManifest(self.path)
+        product = catalog(1)[0]
+        for quantity in range(manifest.COMPACT_MIN_LINES + 1):
+            manifest.apply([dict(product, inventory_quantity=quantity)], [], self.index, fake_embed)
+        self.assertLess(manifest.lines, 10)
+        self.assertEqual(EmbeddingManifest(self.path).hashes, manifest.hashes)
+
+    def test_torn_last_line_is_dropped(self):
+        manifest = EmbeddingManifest(self.path)
+        manifest.sync(catalog(5), self.index, fake_embed)
+        with open(self.path, 'a') as fh:
+            fh.write('4\tdeadbeef')
+        reloaded = EmbeddingManifest(self.path)
+        self.assertEqual(reloaded.hashes, manifest.hashes)
+        reloaded.apply([dict(catalog(5)[1], inventory_quantity=7)], [], self.index, fake_embed)
+        self.assertEqual(EmbeddingManifest(self.path).hashes, reloaded.hashes)
+
+    def test_legacy_npz_manifest_is_imported(self):
+        ids = ['1', '2']
+        np.savez(os.path.join(self.directory, 'manifest.npz'), ids=np.array(ids), hashes=np.array(['a', 'b']),
+                 vectors=np.zeros((2, VECTOR_DIMENSION), dtype=np.float32))
+        self.assertEqual(EmbeddingManifest(self.path).hashes, {'1': 'a', '2': 'b'})
+        self.assertTrue(os.path.exists(self.path))
+
+
+class LocalVectorStoreTests(TemporaryDirectoryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.directory, 'index')
+        self.rng = np.random.default_rng(0)
+
+    def store(self, **options):
+        return LocalVectorStore(self.path, dimension=8, **options)
+
+    def vectors(self, count, start=0):
+        return [{'id': str(i), 'values': self.rng.random(8), 'metadata': {'price': float(i), 'inventory_quantity': i % 4}}
+                for i in range(start, start + count)]
+
+    def assert_consistent(self, store, expected):
+        # Every id the metadata names sits on the row holding its vector, and nothing else is live
+        self.assertEqual(set(store.positions), set(expected))
+        for vector_id, values in expected.items():
+            row = store.positions[vector_id]
+            self.assertEqual(store.ids[row], vector_id)
+            np.testing.assert_allclose(store.matrix[row], values, rtol=1e-6)
+
+    def test_unflushed_changes_never_touch_committed_rows(self):
+        store = self.store()
+        vectors = self.vectors(20)
+        store.upsert(vectors)
+        store.flush()
+        committed = {vector['id']: vector['values'] for vector in vectors}
+
+        # Update, delete and insert, then "crash": the vectors reach the file, the metadata does not
+        added = self.vectors(5, start=100)
+        store.upsert([{'id': '3', 'values': np.ones(8)}] + added)
+        store.delete(['0', '7'])
+        store.matrix.flush()
+        self.assert_consistent(self.store(), committed)
+
+        store.flush()
+        current = dict(committed, **{'3': np.ones(8)}, **{vector['id']: vector['values'] for vector in added})
+        del current['0'], current['7']
+        self.assert_consistent(store, current)
+        self.assert_consistent(self.store(), current)
+
+    def test_freed_rows_are_reused_after_flush(self):
+        store = self.store()
+        store.upsert(self.vectors(10))
+        store.flush()
+        store.delete(['1', '2'])
+        store.upsert(self.vectors(1, start=50))
+        # The deleted rows are still referenced on disk, the new vector gets a fresh row
+        self.assertEqual(len(store.ids), 11)
+        store.flush()
+        store.upsert(self.vectors(2, start=60))
+        self.assertEqual(len(store.ids), 11)
+        self.assertEqual(len(store), 11)
+
+    def test_capacity_grows_and_survives_reopen(self):
+        store = self.store()
+        vectors = self.vectors(2500)
+        store.upsert(vectors)
+        store.flush()
+        self.assertGreaterEqual(store.matrix.shape[0], 2500)
+        self.assert_consistent(self.store(), {vector['id']: vector['values'] for vector in vectors})
+
+    def test_top_k_ordering_and_filters(self):
+        store = self.store(metric='cosine')
+        vectors = self.vectors(200)
+        store.upsert(vectors)
+        query = self.rng.random(8)
+        matrix = np.stack([vector['values'] for vector in vectors])
+        scores = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query))
+
+        matches = store.query(query, top_k=5)['matches']
+        self.assertEqual([match['id'] for match in matches], [str(i) for i in np.argsort(-scores)[:5]])
+
+        allowed = [i for i in range(200) if i % 4 == 2 and i >= 50]
+        matches = store.query(query, top_k=5, filter={'inventory_quantity': 2, 'price': {'$gte': 50}})['matches']
+        expected = sorted(allowed, key=lambda i: -scores[i])[:5]
+        self.assertEqual([match['id'] for match in matches], [str(i) for i in expected])
+        matches = store.query(query, top_k=3, filter={'price': {'$in': [4.0, 9.0]}})['matches']
+        self.assertEqual([match['id'] for match in matches], [str(i) for i in sorted((4, 9), key=lambda i: -scores[i])])
+
+        store.delete([str(i) for i in np.argsort(-scores)[:1]])
+        self.assertEqual(store.query(query, top_k=1)['matches'][0]['id'], str(np.argsort(-scores)[1]))
+
+    def test_euclidean_float16(self):
+        store = self.store(dtype='float16')
+        vectors = self.vectors(100)
+        store.upsert(vectors)
+        store.flush()
+        reopened = self.store(dtype='float16')
+        query = vectors[42]['values']
+        match = reopened.query(query, top_k=1)['matches'][0]
+        self.assertEqual(match['id'], '42')
+        self.assertAlmostEqual(match['score'], 0.0, places=2)
+        self.assertEqual(match['metadata'], {'price': 42.0, 'inventory_quantity': 2})
+        with self.assertRaises(ValueError):
+            self.store(dtype='float32')
+
+
+
+class InferenceServerTests(SimpleTestCase):
+
+    def test_qa_calls_never_overlap(self):
+        running = []
+        overlaps = []
+        guard = threading.Lock()
+
+        def fake_qa_batch(items):
+            with guard:
+                running.append(1)
+                if len(running) > 1:
+                    overlaps.append(len(running))
+            time.sleep(0.01)
+            with guard:
+                running.pop()
+            return [{'answer': question} for question, _ in items]
+
+        with mock.patch('ai.inference_server.run_qa_batch', fake_qa_batch), ThreadPoolExecutor(8) as pool:
+            server = InferenceServer('127.0.0.1:0', max_wait_ms=1)
+            calls = [pool.submit(server.handle, 'qa', {'question': str(i), 'context': ''}) if i % 2 else
+                     pool.submit(server.handle, 'qa_batch', {'items': [(str(i), '')]}) for i in range(16)]
+            results = [call.result() for call in calls]
+        self.assertEqual(overlaps, [])
+        self.assertEqual(results[1], {'answer': '1'})
+        self.assertEqual(results[2], [{'answer': '2'}])
+
+
+class RouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.snapshot = CatalogSnapshot([
+            {'id': 1, 'title': 'Blue Mug', 'price': 12.0, 'inventory_quantity': 3},
+            {'id': 2, 'title': 'Red Mug', 'price': 15.0, 'inventory_quantity': 0},
+            {'id': 3, 'title': 'Canvas Tote', 'price': 25.0, 'inventory_quantity': 40},
+            {'id': 4, 'title': 'Wool Scarf', 'price': 60.0, 'inventory_quantity': 8},
+        ])
+
+    def route(self, query, intent):
+        payload, routing = route(query, self.snapshot, sales=False)
+        self.assertEqual(routing['intent'], intent, query)
+        return payload
+
+    def titles(self, payload):
+        return [product['title'] for product in payload['products']]
+
+    def test_compare(self):
+        payload = self.route("compare blue mug and canvas tote", 'compare')
+        self.assertEqual(self.titles(payload), ['Blue Mug', 'Canvas Tote'])
+        self.assertIsNone(self.route("compare mug with tote", 'compare'))  # two mugs, ambiguous
+
+    def test_best_sellers_needs_the_sales_rollups(self):
+        self.assertIsNone(self.route("what are our best sellers", 'best_sellers'))
+        self.assertIsNone(self.route("which product sold the most", 'best_sellers'))
+
+    def test_how_many(self):
+        self.assertEqual(self.route("how many canvas tote are available", 'how_many')['units'], 40)
+        self.assertEqual(self.route("how many mugs are left", 'how_many')['units'], 3)
+        self.assertEqual(self.route("how many products are in stock", 'how_many')['total'], 3)
+        payload = self.route("how many products do we have", 'how_many')
+        self.assertEqual((payload['total'], payload['in_stock'], payload['units']), (4, 3, 51))
+
+    def test_price(self):
+        self.assertEqual(self.route("what is the price of the wool scarf", 'price')['message'], "The price of Wool Scarf is 60.0.")
+        self.assertEqual(self.titles(self.route("how much is the canvas tote", 'price')), ['Canvas Tote'])
+        self.assertIsNone(self.route("price of the velvet hat", 'price'))
+
+    def test_out_of_stock(self):
+        self.assertEqual(self.titles(self.route("which products are out of stock", 'out_of_stock')), ['Red Mug'])
+        self.assertEqual(self.route("is any scarf sold out", 'out_of_stock')['total'], 0)
+
+    def test_low_stock(self):
+        self.assertEqual(self.titles(self.route("what is low on stock", 'low_stock')), ['Blue Mug', 'Red Mug'])
+        self.assertEqual(self.titles(self.route("which mugs are low in stock", 'low_stock')), ['Blue Mug', 'Red Mug'])
+        payload = self.route("products with fewer than 10 units in stock", 'low_stock')
+        self.assertEqual(self.titles(payload), ['Blue Mug', 'Red Mug', 'Wool Scarf'])
+
+    def test_cheapest(self):
+        self.assertEqual(self.titles(self.route("what's the cheapest product", 'cheapest')), ['Blue Mug'])
+        self.assertEqual(self.titles(self.route("which product has the lowest price", 'cheapest')), ['Blue Mug'])
+        self.assertEqual(self.titles(self.route("least expensive tote", 'cheapest')), ['Canvas Tote'])
+
+    def test_most_expensive(self):
+        self.assertEqual(self.titles(self.route("which product has the highest price", 'most_expensive')), ['Wool Scarf'])
+        self.assertEqual(self.titles(self.route("most expensive mug", 'most_expensive')), ['Red Mug'])
+        self.assertIsNone(self.route("priciest velvet hat", 'most_expensive'))
+
+    def test_in_stock(self):
+        self.assertEqual(self.titles(self.route("which products are in stock", 'in_stock')), ['Blue Mug', 'Canvas Tote', 'Wool Scarf'])
+        self.assertEqual(self.titles(self.route("show mugs in stock", 'in_stock')), ['Blue Mug'])
+
+    def test_availability(self):
+        self.assertEqual(self.route("is the wool scarf available", 'availability')['message'],
+                         "Wool Scarf is in stock with 8 units available.")
+        self.assertEqual(self.titles(self.route("do we have blue mug in stock", 'availability')), ['Blue Mug'])
+        self.assertEqual(self.titles(self.route("red mug in stock?", 'availability')), ['Red Mug'])
+
+    def test_open_ended(self):
+        payload, routing = route("what material is the tote made of", self.snapshot, sales=False)
+        self.assertIsNone(payload)
+        self.assertEqual((routing['intent'], routing['routed']), ('open_ended', False))
@@ -1,7 +1,10 @@
 from django.urls import path
-from .views import get_insights
+from .views import get_insights, ready, cache_stats, inference_stats
 
 
 urlpatterns = [    
-    path('get_insights/', get_insights,name='get_insights')
+    path('get_insights/', get_insights,name='get_insights'),
+    path('ready/', ready, name='ready'),
+    path('cache_stats/', cache_stats, name='cache_stats'),
+    path('inference_stats/', inference_stats, name='inference_stats')
 ]
\ No newline at end of file
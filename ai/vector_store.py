@@ -0,0 +1,320 @@
+import json
+import os
+import threading
+
+import numpy as np
+from django.conf import settings
+
+# Metadata fields kept as NumPy columns so filters run vectorized
+FILTER_COLUMNS = ('inventory_quantity', 'price')
+
+_FILTER_OPERATORS = {
+    '$eq': np.equal,
+    '$ne': np.not_equal,
+    '$gt': np.greater,
+    '$gte': np.greater_equal,
+    '$lt': np.less,
+    '$lte': np.less_equal,
+}
+
+
+class VectorStore:
+    """
+    Interface shared by the vector index backends. ``query`` returns a dict with a
+    ``matches`` list of ``{'id', 'score', 'metadata'}`` entries, same shape as Pinecone.
+    """
+
+    def upsert(self, vectors):
+        raise NotImplementedError
+
+    def delete(self, ids):
+        raise NotImplementedError
+
+    def query(self, vector, top_k=10, include_metadata=True, filter=None):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def namespace(self, name):
+        """A store for ``name`` whose vectors never mix with this one's, e.g. one per Shopify store."""
+        raise NotImplementedError
+
+
+class PineconeVectorStore(VectorStore):
+
+    def __init__(self, api_key, index_name, dimension=768, metric='euclidean', index=None, namespace=None):
+        self.namespace_name = namespace
+        if index is not None:
+            self.index = index
+            return
+        from pinecone import Pinecone, ServerlessSpec
+
+        pc = Pinecone(api_key=api_key)
+        # Ensure the index exists, create it if not
+        if index_name not in pc.list_indexes().names():
+            pc.create_index(
+                name=index_name,
+                dimension=dimension,
+                metric=metric,
+                spec=ServerlessSpec(
+                    cloud='aws',
+                    region='us-east-1'
+                )
+            )
+        self.index = pc.Index(index_name)
+
+    def _namespaced(self, **kwargs):
+        if self.namespace_name:
+            kwargs['namespace'] = self.namespace_name
+        return kwargs
+
+    def upsert(self, vectors):
+        return self.index.upsert(**self._namespaced(vectors=vectors))
+
+    def delete(self, ids):
+        return self.index.delete(**self._namespaced(ids=ids))
+
+    def query(self, vector, top_k=10, include_metadata=True, filter=None):
+        return self.index.query(**self._namespaced(vector=vector, top_k=top_k, include_metadata=include_metadata, filter=filter))
+
+    def namespace(self, name):
+        # A Pinecone namespace of the same index, sharing its connection
+        return PineconeVectorStore(None, None, index=self.index, namespace=name)
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Exact search over a memory-mapped matrix stored in ``path``. Metadata (which id
+    lives in which row) is kept in a JSON file next to the matrix and written on
+    ``flush``, which is the commit point: rows the last written metadata refers to are
+    never overwritten before the next flush. Updates go to a free row and deletes leave
+    a hole, so after a crash the files on disk still agree with each other.
+    """
+
+    def __init__(self, path, dimension=768, metric='euclidean', dtype='float32'):
+        if metric not in ('euclidean', 'cosine'):
+            raise ValueError(f"Unsupported metric: {metric}")
+        self.path = str(path)
+        self.dimension = dimension
+        self.metric = metric
+        self.dtype = np.dtype(dtype)
+        self.matrix_path = os.path.join(self.path, 'vectors.npy')
+        self.meta_path = os.path.join(self.path, 'metadata.json')
+        self._lock = threading.RLock()
+        self._dirty = False
+        os.makedirs(self.path, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        # ids/metadata are per row, None marks a free row
+        self.ids = []
+        self.metadata = []
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as fh:
+                stored = json.load(fh)
+            self.ids = stored['ids']
+            self.metadata = stored['metadata']
+        self.positions = {vector_id: row for row, vector_id in enumerate(self.ids) if vector_id is not None}
+
+        if os.path.exists(self.matrix_path):
+            self.matrix = np.load(self.matrix_path, mmap_mode='r+')
+            if self.matrix.dtype != self.dtype or self.matrix.shape[1] != self.dimension:
+                raise ValueError(f"{self.matrix_path} holds {self.matrix.dtype} x {self.matrix.shape[1]}, expected {self.dtype} x {self.dimension}")
+        else:
+            self.matrix = np.lib.format.open_memmap(self.matrix_path, mode='w+', dtype=self.dtype, shape=(1024, self.dimension))
+
+        capacity = self.matrix.shape[0]
+        self.norms = np.zeros(capacity, dtype=np.float32)
+        self.live = np.zeros(capacity, dtype=bool)
+        self.columns = {name: np.zeros(capacity, dtype=np.float64) for name in FILTER_COLUMNS}
+        for row in self.positions.values():
+            self._index_row(row)
+        self._committed = set(self.positions.values())
+        self._free = [row for row, vector_id in enumerate(self.ids) if vector_id is None]
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _index_row(self, row):
+        self.live[row] = True
+        self.norms[row] = np.linalg.norm(self.matrix[row].astype(np.float32))
+        for name in FILTER_COLUMNS:
+            self.columns[name][row] = float(self.metadata[row].get(name, 0) or 0)
+
+    def _ensure_capacity(self, rows):
+        capacity = self.matrix.shape[0]
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, capacity * 2)
+        tmp_path = f"{self.matrix_path}.tmp"
+        grown = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=self.dtype, shape=(new_capacity, self.dimension))
+        grown[:len(self.ids)] = self.matrix[:len(self.ids)]
+        grown.flush()
+        del grown
+        self.matrix.flush()
+        del self.matrix
+        # Every row is copied, so the committed metadata stays valid for the replaced file
+        os.replace(tmp_path, self.matrix_path)
+        self.matrix = np.load(self.matrix_path, mmap_mode='r+')
+        self.norms = np.resize(self.norms, new_capacity)
+        self.live = np.resize(self.live, new_capacity)
+        self.live[capacity:] = False
+        for name in FILTER_COLUMNS:
+            self.columns[name] = np.resize(self.columns[name], new_capacity)
+
+    def _release(self, row):
+        self.ids[row] = None
+        self.metadata[row] = None
+        self.live[row] = False
+        # A row the metadata on disk still points at is only reused after the next flush
+        if row not in self._committed:
+            self._free.append(row)
+
+    def _allocate(self):
+        if self._free:
+            return self._free.pop()
+        self._ensure_capacity(len(self.ids) + 1)
+        self.ids.append(None)
+        self.metadata.append(None)
+        return len(self.ids) - 1
+
+    def upsert(self, vectors):
+        with self._lock:
+            for vector in vectors:
+                row = self.positions.get(vector['id'])
+                if row is None or row in self._committed:
+                    # New ids and committed rows get a fresh row, the old one is freed
+                    if row is not None:
+                        self._release(row)
+                    row = self._allocate()
+                    self.ids[row] = vector['id']
+                    self.positions[vector['id']] = row
+                self.matrix[row] = np.asarray(vector['values'], dtype=self.dtype)
+                self.metadata[row] = vector.get('metadata') or {}
+                self._index_row(row)
+            self._dirty = True
+            return {'upserted_count': len(vectors)}
+
+    def delete(self, ids):
+        with self._lock:
+            for vector_id in ids:
+                row = self.positions.pop(vector_id, None)
+                if row is not None:
+                    self._release(row)
+            self._dirty = True
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            # Vectors reach the disk before the metadata that refers to them
+            self.matrix.flush()
+            tmp_path = f"{self.meta_path}.tmp"
+            with open(tmp_path, 'w') as fh:
+                json.dump({'ids': self.ids, 'metadata': self.metadata}, fh)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp_path, self.meta_path)
+            self._committed = set(self.positions.values())
+            self._free = [row for row, vector_id in enumerate(self.ids) if vector_id is None]
+            self._dirty = False
+
+    def _filter_mask(self, filter, count):
+        mask = np.ones(count, dtype=bool)
+        for name, condition in (filter or {}).items():
+            if name not in self.columns:
+                raise ValueError(f"Filtering on '{name}' is not supported, use one of {', '.join(FILTER_COLUMNS)}")
+            column = self.columns[name][:count]
+            if not isinstance(condition, dict):
+                condition = {'$eq': condition}
+            for operator, value in condition.items():
+                if operator == '$in':
+                    mask &= np.isin(column, value)
+                elif operator == '$nin':
+                    mask &= ~np.isin(column, value)
+                elif operator in _FILTER_OPERATORS:
+                    mask &= _FILTER_OPERATORS[operator](column, value)
+                else:
+                    raise ValueError(f"Unsupported filter operator: {operator}")
+        return mask
+
+    def _dot(self, query, count):
+        if self.dtype == np.float32:
+            return self.matrix[:count] @ query
+        # float16 has no BLAS kernels, upcast in chunks to keep the temporary small
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, 8192):
+            end = min(start + 8192, count)
+            scores[start:end] = self.matrix[start:end].astype(np.float32) @ query
+        return scores
+
+    def query(self, vector, top_k=10, include_metadata=True, filter=None):
+        with self._lock:
+            count = len(self.ids)
+            if not self.positions or top_k <= 0:
+                return {'matches': []}
+            query = np.asarray(vector, dtype=np.float32)
+            dots = self._dot(query, count)
+            norms = self.norms[:count]
+
+            if self.metric == 'euclidean':
+                # Squared distance, lower is closer (same convention as Pinecone)
+                scores = norms ** 2 - 2 * dots + float(query @ query)
+                ranking = scores
+            else:
+                scores = dots / np.maximum(norms * np.linalg.norm(query), 1e-12)
+                ranking = -scores
+
+            live = self.live[:count]
+            candidates = np.flatnonzero(live & self._filter_mask(filter, count)) if filter else np.flatnonzero(live)
+            if candidates.size == 0:
+                return {'matches': []}
+            k = min(top_k, candidates.size)
+            candidate_ranking = ranking[candidates]
+            top = np.argpartition(candidate_ranking, k - 1)[:k]
+            top = top[np.argsort(candidate_ranking[top])]
+
+            matches = []
+            for row in candidates[top]:
+                match = {'id': self.ids[row], 'score': float(scores[row])}
+                if include_metadata:
+                    match['metadata'] = self.metadata[row]
+                matches.append(match)
+            return {'matches': matches}
+
+    def namespace(self, name):
+        # Its own matrix and metadata in a subdirectory, next to the files of the default index
+        return LocalVectorStore(os.path.join(self.path, 'namespaces', name), self.dimension, self.metric, self.dtype.name)
+
+
+def create_vector_store():
+    if settings.AI_VECTOR_STORE == 'local':
+        return LocalVectorStore(
+            settings.AI_LOCAL_INDEX_PATH,
+            metric=settings.AI_LOCAL_INDEX_METRIC,
+            dtype=settings.AI_LOCAL_INDEX_DTYPE
+        )
+    if settings.AI_VECTOR_STORE == 'pinecone':
+        return PineconeVectorStore(settings.PINECONE_API_KEY, settings.PINECONE_INDEX_NAME)
+    raise ValueError(f"Unknown AI_VECTOR_STORE backend: {settings.AI_VECTOR_STORE}")
+
+
+_namespaces = {}
+_namespaces_lock = threading.Lock()
+
+
+def get_vector_store(namespace=None):
+    """The vector index of ``namespace``, or the default one (registry's 'vector_store') for None."""
+    from .registry import registry
+
+    base = registry.get('vector_store')
+    if not namespace:
+        return base
+    with _namespaces_lock:
+        owner, store = _namespaces.get(namespace, (None, None))
+        # Rebuilt when the default store was replaced (benchmarks install their own)
+        if owner is not base:
+            store = base.namespace(namespace)
+            _namespaces[namespace] = (base, store)
+        return store
@@ -1,71 +1,56 @@
 import json
-import os
-import requests
-import pinecone
-import shopify
-from ecommerce.views import get_shopify_products, shopify_session
-from transformers import pipeline, AutoTokenizer, AutoModel
-from pinecone import Pinecone, ServerlessSpec
+from ecommerce.catalog import product_records
+from ecommerce.conditional import cached_records
+from ecommerce.stores import index_namespace
+from ecommerce.webhooks import pending_count
 from dotenv import load_dotenv
 from rest_framework.decorators import api_view
 from django.http import JsonResponse
-import torch
 
 from rest_framework.response import Response
 from django.conf import settings
-
-PINECONE_API_KEY = settings.PINECONE_API_KEY
+from ai_shopify_dashboard.timing import stage
+from .inference import answer_passages, answer_question, batching_metrics, embed_query, get_client, local_resources, remote_embed_products
+from .indexing import get_manifest
+from .catalog_snapshot import get_snapshot
+from .context import best_answer, concatenated_context, select_passages
+from .insights_cache import catalog_fingerprint, insights_cache
+from .intents import classify, route
+from .lexical import decisive, fuse, get_lexical_index
+from .pipeline import index_status, run_stage, submit, sync_index
+from .registry import registry
+from .vector_store import get_vector_store
 
 # Load environment variables from .env file
 load_dotenv()
-# Initialize Pinecone and Hugging Face pipeline
-qa_pipeline = pipeline('question-answering', model='deepset/roberta-base-squad2')
-# Load the Hugging Face model and tokenizer
-tokenizer = AutoTokenizer.from_pretrained('distilbert-base-uncased')
-model = AutoModel.from_pretrained('distilbert-base-uncased')
-
-def create_vector_from_product(product):
-    # Create a string to represent the product
-    product_text = f"{product.get('title', 'Unknown product')} priced at {product.get('price', '0.00')} with inventory {product.get('inventory_quantity', 0)}"
-    
-    # Tokenize and get embeddings
-    inputs = tokenizer(product_text, return_tensors='pt')
-    with torch.no_grad():
-        embeddings = model(**inputs).last_hidden_state.mean(dim=1).squeeze() # Average token embeddings to get a single vector
-        
-        # Convert embeddings to a Python list directly
-        embeddings = embeddings.detach().cpu().numpy()  # Detach tensor and convert to NumPy array        
-
-        # Convert NumPy array to list
-        embeddings_list = [float(i) for i in embeddings]  # Convert each element to a float to ensure it's a standard list
-        
-        return embeddings_list  # Return the Python list d
-        
-
-# Initialize Pinecone using the new method
-
-pc = Pinecone(api_key=PINECONE_API_KEY)
-
-
-# List existing indexes and their dimensions
-indexes = pc.list_indexes()
-
-
-
-# Ensure the index exists, create it if not
-index_name = 'ecommerce-data-768'
-if index_name not in pc.list_indexes().names():   
-    pc.create_index(
-        name=index_name, 
-        dimension=768,  # Check the dimensionality of your model output
-        metric='euclidean',
-        spec=ServerlessSpec(
-            cloud='aws',
-            region='us-east-1'
-        )
-    )
-# Access the index
-index = pc.Index(index_name)
+
+
+def strict_consistency(request):
+    # 'strict' answers only once the index reflects the fetched catalog, 'eventual' lets retrieval run against it while it syncs
+    return request.query_params.get('consistency', settings.AI_PIPELINE_CONSISTENCY) == 'strict'
+
+
+def deferred_index_stats(worker_indexing):
+    # Answers that need no retrieval leave the index sync to the next question that does
+    if worker_indexing:
+        return {"mode": "worker", "pending_events": pending_count()}
+    return {"status": "deferred"}
+
+
+def cached_response(query, namespace, catalog_version, payload):
+    # Remember the answer for this query until the store's catalog changes or the entry expires
+    if insights_cache is not None:
+        insights_cache.set(query, catalog_version, payload, namespace)
+    response = Response(payload)
+    response['X-Insights-Cache'] = 'miss'
+    return response
+
+def insights_records(source=None, page_size=None, stats=None):
+    # Catalog records with numeric prices, as retrieval and the routed answers compare them
+    for record in product_records(source, page_size, stats=stats):
+        record['price'] = float(record['price'])
+        yield record
+
 
 @api_view(['GET'])
 def get_insights(request):
@@ -73,46 +58,44 @@ def get_insights(request):
 
     if query:
         try:
-            # Shopify session and product fetching
-            shopify_session()  # Establish the session with Shopify
-            products = shopify.Product.find()
-            product_list = []
-
-            for product in products:
-                product_list.append({
-                    "id": product.id,
-                    "title": product.title,
-                    "inventory_quantity": product.variants[0].inventory_quantity,
-                    "price": float(product.variants[0].price)
-                })
-            # Prepare a list for exact matches
-            exact_matches = []
-
-            # Find all exact matches in product list
-            for product in product_list:
-                if (product['title'].lower() == query.lower() and
-                        product['inventory_quantity'] == 0):  # Change this condition as needed for inventory quantity
-                    exact_matches.append(product)
-
-            # Prepare vectors for Pinecone indexing
-            vectors = []
-            for product in product_list:
-                if isinstance(product, dict):
-                    vector_value = create_vector_from_product(product)
-                    assert len(vector_value) == 768  # Ensure this matches your index
-                    vectors.append({
-                        'id': str(product['id']),
-                        'values': vector_value,
-                        'metadata': {
-                            'text': f"{product.get('title', 'Unknown product')} with inventory quantity {product.get('inventory_quantity', 0)}",
-                            'inventory_quantity': product.get('inventory_quantity', 0),
-                            'price': product.get('price', 0)
-                        }
-                    })
-
-            # Upsert the vectors into Pinecone
-            if vectors:
-                upsert_response = index.upsert(vectors)
+            # Models and the vector index load on first use, see ai/registry.py. Each store has its own index
+            namespace = index_namespace()
+            index = get_vector_store(namespace)
+            strict = strict_consistency(request)
+
+            lexical_index = get_lexical_index(namespace) if settings.AI_RETRIEVAL == 'hybrid' else None
+
+            # Every page of the live catalog, or the local mirror when CATALOG_SOURCE/source=mirror. Fetched
+            # again only when the cheap change check of the list endpoints says the catalog changed
+            # (ecommerce/conditional.py), otherwise the previous list and its fingerprint are reused
+            product_list, catalog_version, _ = cached_records('products', insights_records, request.query_params.get('source'),
+                                                              derive=catalog_fingerprint)
+
+            # Same question against an unchanged catalog: skip indexing, retrieval and QA entirely
+            with stage('cache_lookup'):
+                cached = insights_cache.get(query, catalog_version, namespace) if insights_cache is not None else None
+            if cached is not None:
+                response = Response(cached)
+                response['X-Insights-Cache'] = 'hit'
+                return response
+
+            # The query embedding only depends on the query, compute it while the catalog is indexed.
+            # Started after the cache lookup so hits never pay for it. Not for structured questions, those
+            # are normally answered from the catalog without it, nor for name lookups the lexical index
+            # (as of the previous request) already answers
+            query_vector_future = None
+            if not classify(query) and not (lexical_index is not None and decisive(lexical_index.search(query, settings.AI_QA_TOP_K))):
+                query_vector_future = submit(run_stage, 'query_embedding', embed_query, query)
+
+            # Columnar view of the catalog with price/stock orderings and a title index, reused until the catalog changes
+            with stage('snapshot'):
+                snapshot = get_snapshot(product_list, catalog_version, namespace)
+
+                # Find all exact matches in product list
+                exact_matches = [product for product in snapshot.with_title(query, case_sensitive=False)
+                                 if product['inventory_quantity'] == 0]  # Change this condition as needed for inventory quantity
+
+            worker_indexing = settings.AI_INDEXING_MODE == 'worker' and namespace is None
 
             # If there are exact matches, respond immediately
             if exact_matches:
@@ -125,19 +108,69 @@ def get_insights(request):
                         "inventory_quantity": match['inventory_quantity'],
                         "price": match['price']
                     })
-                return Response({
+                return cached_response(query, namespace, catalog_version, {
                     "message": "Exact matches found.",
-                    "matches": response_data
+                    "matches": response_data,
+                    "index_stats": deferred_index_stats(worker_indexing),
+                    "routing": {"intent": "exact_title", "routed": True}
                 })
 
-            # Search the Pinecone index using the query if no direct match was found
-            pinecone_response = index.query(vector=create_vector_from_product({'title': query, 'price': '0.00', 'inventory_quantity': 0}), top_k=10, include_metadata=True)
-            
-            context = " ".join([match['metadata']['text'] for match in pinecone_response['matches']]) if pinecone_response['matches'] else "No relevant data found"
+            # Structured questions (cheapest, price of X, how many X available, ...) are answered from the
+            # snapshot; sales questions from the order rollups, which only cover the default store
+            routed, routing = route(query, snapshot, sales=namespace is None)
+            if routed is not None:
+                routed.update(index_stats=deferred_index_stats(worker_indexing), routing=routing)
+                if routing['intent'] == 'best_sellers':
+                    # Not cached: the answer changes with new orders, not with the catalog
+                    return Response(routed)
+                return cached_response(query, namespace, catalog_version, routed)
+
+            # Titles and product types, re-indexed only where the catalog changed. A decisive hit (a product
+            # name or SKU) is answered from it without embedding the query or searching the vector index
+            lexical_hits = []
+            if lexical_index is not None:
+                with stage('lexical'):
+                    lexical_index.sync(product_list, catalog_version)
+                    lexical_hits = lexical_index.search(query, settings.AI_QA_TOP_K)
+            lexical_only = decisive(lexical_hits)
+
+            if worker_indexing:
+                # run_index_worker keeps the index fresh from product webhooks, queries only retrieve
+                index_stats = {"mode": "worker", "pending_events": pending_count()}
+            else:
+                # Re-embed only new or changed products and drop deleted ones from the index, in the background.
+                # Strict waits for the sync; otherwise stats are only reported if it already finished
+                sync_future = sync_index(get_manifest(namespace), product_list, (namespace, catalog_version), index, remote_embed_products)
+                index_stats = index_status(sync_future, wait=strict and not lexical_only)
 
+            # Search the Pinecone index using the query if no direct match was found
+            if lexical_only:
+                matches = lexical_index.matches(lexical_hits)
+                retrieval = {"mode": "lexical", "lexical_hits": len(lexical_hits)}
+            else:
+                if query_vector_future is None:
+                    query_vector_future = submit(run_stage, 'query_embedding', embed_query, query)
+                with stage('query_embedding_wait'):
+                    query_vector = query_vector_future.result()
+                with stage('retrieval'):
+                    matches = index.query(vector=query_vector, top_k=settings.AI_QA_TOP_K, include_metadata=True)['matches']
+                    if lexical_index is not None:
+                        # Reciprocal rank fusion with the lexical ranking
+                        matches = fuse(matches, lexical_index.matches(lexical_hits), settings.AI_QA_TOP_K)
+                retrieval = {"mode": "hybrid" if lexical_index is not None else "vector", "lexical_hits": len(lexical_hits)}
 
             # Generate AI-powered response using Hugging Face's QA pipeline
-            response = qa_pipeline(question=query, context=context)
+            if settings.AI_QA_CONTEXT == 'passages' and matches:
+                # Only the passages relevant to the question, each read separately in one batch
+                with stage('context'):
+                    passages, context_stats = select_passages(query, matches)
+                with stage('qa'):
+                    response = best_answer(answer_passages(query, passages))
+            else:
+                context = concatenated_context(matches)
+                context_stats = {"retrieved": len(matches), "passages": 1}
+                with stage('qa'):
+                    response = answer_question(query, context)  # micro-batched with concurrent requests when AI_MICRO_BATCHING is on
 
             # Determine confidence level
             score = response.get("score", 0)
@@ -149,148 +182,151 @@ def get_insights(request):
 
             # Fallback handling for low confidence
             if confidence == "Low Confidence":
-                fallback_response = {
-                    "message": "We couldn't find an exact match, but here are some related products:",
-                    "related_products": []
-                }
-                # Check if pipeline response has a valid answer
-                if response.get('answer') and response['score'] > 0:
-                    # Return the pipeline answer if available and the score is acceptable
-                    final_response = {
-                        "message": "AI answer with low confidence level",
-                        "answer": response['answer']
-                    }                
-                    # Return the final response
-                    fallback_response["related_products"].append(final_response)
+                with stage('fallback'):
+                    fallback_response = {
+                        "message": "We couldn't find an exact match, but here are some related products:",
+                        "related_products": []
+                    }
+                    # Check if pipeline response has a valid answer
+                    if response.get('answer') and response['score'] > 0:
+                        # Return the pipeline answer if available and the score is acceptable
+                        final_response = {
+                            "message": "AI answer with low confidence level",
+                            "answer": response['answer']
+                        }                
+                        # Return the final response
+                        fallback_response["related_products"].append(final_response)
                 
-                # Dynamic handling based on the query context
-                if "out of stock" in query.lower() or "currently out of stock" in query.lower():
-                    # Only add products that are out of stock
-                    for match in pinecone_response['matches']:
-                        if match['metadata'].get('inventory_quantity', 0) == 0:
-                            fallback_response["related_products"].append(match['metadata']['text'])
-
-                elif "low stock" in query.lower():
-                    # Add products that have low stock (for example, below a threshold of 5)
-                    low_stock_threshold = 5
-                    for match in pinecone_response['matches']:
-                        if match['metadata'].get('inventory_quantity', 0) < low_stock_threshold:
-                            fallback_response["related_products"].append(match['metadata']['text'])
-
-                elif "in stock" in query.lower():
-                    # Only add products that are in stock
-                    for match in pinecone_response['matches']:
-                        if match['metadata'].get('inventory_quantity', 0) > 0:
-                            fallback_response["related_products"].append(match['metadata']['text'])
-
-                elif "available" in query.lower():
-                    product_name = query.split("available")[0].strip()  # Extract product name
-                    matching_products = [p for p in product_list if product_name.lower() in p['title'].lower()]
+                    # Dynamic handling based on the query context
+                    if "out of stock" in query.lower() or "currently out of stock" in query.lower():
+                        # Only add products that are out of stock
+                        for match in matches:
+                            if match['metadata'].get('inventory_quantity', 0) == 0:
+                                fallback_response["related_products"].append(match['metadata']['text'])
+
+                    elif "low stock" in query.lower():
+                        # Add products that have low stock (for example, below a threshold of 5)
+                        low_stock_threshold = 5
+                        for match in matches:
+                            if match['metadata'].get('inventory_quantity', 0) < low_stock_threshold:
+                                fallback_response["related_products"].append(match['metadata']['text'])
+
+                    elif "in stock" in query.lower():
+                        # Only add products that are in stock
+                        for match in matches:
+                            if match['metadata'].get('inventory_quantity', 0) > 0:
+                                fallback_response["related_products"].append(match['metadata']['text'])
+
+                    elif "available" in query.lower():
+                        product_name = query.split("available")[0].strip()  # Extract product name
+                        matching_products = snapshot.matching(product_name)
                     
-                    if matching_products:
-                        for product in matching_products:
-                            availability = 'in stock' if product['inventory_quantity'] > 0 else 'out of stock'
-                            fallback_response["related_products"].append(f"{product['title']} is {availability} with {product['inventory_quantity']} units available.")
-                    else:
-                        # Extract product names from the query
-                        product_names = [word for word in query.split() if word.lower() not in ["available", "is", "the", "in", "stock"]]
+                        if matching_products:
+                            for product in matching_products:
+                                availability = 'in stock' if product['inventory_quantity'] > 0 else 'out of stock'
+                                fallback_response["related_products"].append(f"{product['title']} is {availability} with {product['inventory_quantity']} units available.")
+                        else:
+                            # Extract product names from the query
+                            product_names = [word for word in query.split() if word.lower() not in ["available", "is", "the", "in", "stock"]]
                         
-                        if product_names:
-                            # Look for products that match the names found in the query
-                            available_products = []
-                            for product in product_list:
-                                if any(name.lower() in product['title'].lower() for name in product_names):
+                            if product_names:
+                                # Look for products that match the names found in the query
+                                available_products = []
+                                for product in snapshot.matching_any(product_names):
                                     # Add the product details if it's available
                                     available_products.append(f"{product['title']} is {'in stock' if product['inventory_quantity'] > 0 else 'out of stock'} with inventory quantity {product['inventory_quantity']}.")
 
-                            # If available products were found, add them to the response
-                            if available_products:
-                                fallback_response["related_products"].extend(available_products)
+                                # If available products were found, add them to the response
+                                if available_products:
+                                    fallback_response["related_products"].extend(available_products)
+                                else:
+                                    fallback_response["related_products"].append("No products found matching your query.")
                             else:
-                                fallback_response["related_products"].append("No products found matching your query.")
-                        else:
-                            fallback_response["related_products"].append("No specific product mentioned in the query.")
+                                fallback_response["related_products"].append("No specific product mentioned in the query.")
                             
                 
-                elif "how many" in query.lower() and "available" in query.lower():
-                    product_name = query.split("how many")[1].strip()  # Extract product name
-                    matching_products = [p for p in product_list if product_name.lower() in p['title'].lower()]
+                    elif "how many" in query.lower() and "available" in query.lower():
+                        product_name = query.split("how many")[1].strip()  # Extract product name
+                        matching_products = snapshot.matching(product_name)
                     
-                    if matching_products:
-                        for product in matching_products:
-                            fallback_response["related_products"].append(f"There are {product['inventory_quantity']} units of {product['title']} available.")
-                    else:
-                        fallback_response["related_products"].append("No products found matching your query.")
-
-
-
-                elif "most expensive" in query.lower():
-                    # Identify the most expensive product
-                    most_expensive_product = max(product_list, key=lambda x: x['price'], default=None)
-                    if most_expensive_product:
-                        fallback_response["related_products"].append(f"{most_expensive_product['title']} priced at {most_expensive_product['price']}")
-
-                elif "cheapest" in query.lower():
-                    # Identify the cheapest product
-                    cheapest_product = min(product_list, key=lambda x: x['price'], default=None)
-                    if cheapest_product:
-                        fallback_response["related_products"].append(f"{cheapest_product['title']} priced at {cheapest_product['price']}")
-
-                # Handling "best" query
-                elif "best" in query.lower():
-                    # Logic for determining the best product based on stock, price, or other criteria
-                    best_products = []
-
-                    # Option 1: If the best is defined by the highest price (luxury items or premium quality)
-                    best_by_price = max(product_list, key=lambda x: x['price'], default=None)
-                    if best_by_price:
-                        best_products.append(f"{best_by_price['title']} is priced at {best_by_price['price']} and has {best_by_price['inventory_quantity']} units in stock.")
-
-                    # Option 2: If the best is defined by high stock (high demand, well-supplied items)
-                    best_by_stock = max(product_list, key=lambda x: x['inventory_quantity'], default=None)
-                    if best_by_stock:
-                        best_products.append(f"{best_by_stock['title']} has the highest stock of {best_by_stock['inventory_quantity']} units and is priced at {best_by_stock['price']}.")
-
-                    # Option 3: You can also add a condition to combine price and stock if needed
-                    if best_by_price and best_by_stock and best_by_price['id'] != best_by_stock['id']:
-                        best_products.append(f"For a balance of price and stock: {best_by_stock['title']} is priced at {best_by_stock['price']} and has {best_by_stock['inventory_quantity']} units in stock.")
-
-                    # Option 4: Alternatively, filter for products that have a balance of both criteria.
-                    for product in product_list:
-                        if product['price'] > 0 and product['inventory_quantity'] > 0:
-                            best_products.append(f"{product['title']} is priced at {product['price']} and has {product['inventory_quantity']} units available.")
+                        if matching_products:
+                            for product in matching_products:
+                                fallback_response["related_products"].append(f"There are {product['inventory_quantity']} units of {product['title']} available.")
+                        else:
+                            fallback_response["related_products"].append("No products found matching your query.")
 
-                    if not best_products:
-                        best_products.append("We couldn't find a product that matches the criteria for 'best'.")
 
-                    fallback_response["related_products"].append(best_products)
 
-                
-                elif "price" in query.lower():
-                    product_name = query.split("price")[1].strip()  # Extract product name
-                    matching_products = [p for p in product_list if product_name.lower() in p['title'].lower()]
-                    
-                    if matching_products:
-                        for product in matching_products:
-                            fallback_response["related_products"].append(f"The price of {product['title']} is {product['price']}.")
-                    else:                       
-                        # Extract the product name and find its price
-                        for match in pinecone_response['matches']:
-                            if match['metadata']['text'].lower().startswith(query.split(" ")[-1].lower()):
-                                fallback_response["related_products"].append(f"{match['metadata']['text']} priced at {match['metadata']['price']}")
+                    elif "most expensive" in query.lower():
+                        # Identify the most expensive product
+                        most_expensive_product = snapshot.most_expensive()
+                        if most_expensive_product:
+                            fallback_response["related_products"].append(f"{most_expensive_product['title']} priced at {most_expensive_product['price']}")
+
+                    elif "cheapest" in query.lower():
+                        # Identify the cheapest product
+                        cheapest_product = snapshot.cheapest()
+                        if cheapest_product:
+                            fallback_response["related_products"].append(f"{cheapest_product['title']} priced at {cheapest_product['price']}")
+
+                    # Handling "best" query
+                    elif "best" in query.lower():
+                        # Logic for determining the best product based on stock, price, or other criteria
+                        best_products = []
 
-                elif "compare" in query.lower():
-                    # Handle product comparison logic
-                    product_names = [word for word in query.split() if word.lower() not in ["compare", "the", "and", "which"]]
-                    products_to_compare = [prod for prod in product_list if prod['title'] in product_names]
+                        # Option 1: If the best is defined by the highest price (luxury items or premium quality)
+                        best_by_price = snapshot.most_expensive()
+                        if best_by_price:
+                            best_products.append(f"{best_by_price['title']} is priced at {best_by_price['price']} and has {best_by_price['inventory_quantity']} units in stock.")
 
-                    if len(products_to_compare) == 2:
-                        comparison_result = f"{products_to_compare[0]['title']} has {products_to_compare[0]['inventory_quantity']} in stock, priced at {products_to_compare[0]['price']}. " \
-                                            f"{products_to_compare[1]['title']} has {products_to_compare[1]['inventory_quantity']} in stock, priced at {products_to_compare[1]['price']}."
-                        fallback_response["related_products"].append(comparison_result)
+                        # Option 2: If the best is defined by high stock (high demand, well-supplied items)
+                        best_by_stock = snapshot.highest_stock()
+                        if best_by_stock:
+                            best_products.append(f"{best_by_stock['title']} has the highest stock of {best_by_stock['inventory_quantity']} units and is priced at {best_by_stock['price']}.")
 
+                        # Option 3: You can also add a condition to combine price and stock if needed
+                        if best_by_price and best_by_stock and best_by_price['id'] != best_by_stock['id']:
+                            best_products.append(f"For a balance of price and stock: {best_by_stock['title']} is priced at {best_by_stock['price']} and has {best_by_stock['inventory_quantity']} units in stock.")
+
+                        # Option 4: Alternatively, filter for products that have a balance of both criteria.
+                        for product in snapshot.in_stock_priced():
+                            best_products.append(f"{product['title']} is priced at {product['price']} and has {product['inventory_quantity']} units available.")
 
-                return Response(fallback_response)
+                        if not best_products:
+                            best_products.append("We couldn't find a product that matches the criteria for 'best'.")
+
+                        fallback_response["related_products"].append(best_products)
+
+                
+                    elif "price" in query.lower():
+                        product_name = query.split("price")[1].strip()  # Extract product name
+                        matching_products = snapshot.matching(product_name)
+                    
+                        if matching_products:
+                            for product in matching_products:
+                                fallback_response["related_products"].append(f"The price of {product['title']} is {product['price']}.")
+                        else:                       
+                            # Extract the product name and find its price
+                            for match in matches:
+                                if match['metadata']['text'].lower().startswith(query.split(" ")[-1].lower()):
+                                    fallback_response["related_products"].append(f"{match['metadata']['text']} priced at {match['metadata']['price']}")
+
+                    elif "compare" in query.lower():
+                        # Handle product comparison logic
+                        product_names = [word for word in query.split() if word.lower() not in ["compare", "the", "and", "which"]]
+                        products_to_compare = snapshot.with_any_title(product_names)
+
+                        if len(products_to_compare) == 2:
+                            comparison_result = f"{products_to_compare[0]['title']} has {products_to_compare[0]['inventory_quantity']} in stock, priced at {products_to_compare[0]['price']}. " \
+                                                f"{products_to_compare[1]['title']} has {products_to_compare[1]['inventory_quantity']} in stock, priced at {products_to_compare[1]['price']}."
+                            fallback_response["related_products"].append(comparison_result)
+
+
+                    fallback_response["index_stats"] = index_stats
+                    fallback_response["routing"] = routing
+                    fallback_response["qa_context"] = context_stats
+                    fallback_response["retrieval"] = retrieval
+                    return cached_response(query, namespace, catalog_version, fallback_response)
 
             # If confidence is high or moderate, format the output as usual
             formatted_response = {
@@ -298,11 +334,50 @@ def get_insights(request):
                     "answer": response.get("answer", "I couldn't find an answer."),
                     "score": score,
                     "confidence": confidence
-                }
+                },
+                "index_stats": index_stats,
+                "routing": routing,
+                "qa_context": context_stats,
+                "retrieval": retrieval
             }
-            return Response(formatted_response)
+            return cached_response(query, namespace, catalog_version, formatted_response)
 
         except Exception as general_exception:
             return JsonResponse({'error': str(general_exception)}, status=400)
 
-    return JsonResponse({'success': True})
\ No newline at end of file
+    return JsonResponse({'success': True})
+
+@api_view(['GET'])
+def ready(request):
+    # Readiness probe: 200 once every model/client is loaded, 503 while still warming up
+    status = {name: resource for name, resource in registry.status().items() if name in local_resources()}
+    is_ready = all(resource['loaded'] for resource in status.values())
+    payload = {
+        "ready": is_ready,
+        "warming_up": registry.warming_up,
+        "inference_mode": settings.AI_INFERENCE_MODE,
+        "resources": status
+    }
+    if settings.AI_INFERENCE_MODE == 'server':
+        # The models are loaded by the shared inference server, not by this worker
+        try:
+            payload["inference_server"] = get_client().status()['resources']
+            is_ready = is_ready and all(resource['loaded'] for resource in payload["inference_server"].values())
+        except Exception as e:
+            payload["inference_server"] = {"error": str(e)}
+            is_ready = False
+        payload["ready"] = is_ready
+    return Response(payload, status=200 if is_ready else 503)
+
+
+@api_view(['GET'])
+def cache_stats(request):
+    if insights_cache is None:
+        return Response({"enabled": False})
+    return Response(dict(insights_cache.stats(), enabled=True))
+
+
+@api_view(['GET'])
+def inference_stats(request):
+    # Queue depth, batch sizes and queue wait of the QA / query-embedding micro-batchers
+    return Response(batching_metrics())
@@ -0,0 +1,99 @@
+import cProfile
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .timing import collect, observe_request
+
+# cProfile can only run one profile at a time, concurrent requests simply go unprofiled
+_profile_lock = threading.Lock()
+
+
+def endpoint_name(request):
+    # The URL name rather than the path, so ids in URLs or 404 probes do not create new series
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else 'unmatched'
+
+
+def start_profile():
+    if not settings.TIMING_PROFILE_RATE or random.random() >= settings.TIMING_PROFILE_RATE:
+        return None
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler (a debugger, an outer cProfile run) is already active
+        _profile_lock.release()
+        return None
+    return profiler
+
+
+def finish_profile(profiler, request, seconds):
+    profiler.disable()
+    _profile_lock.release()
+    if seconds * 1000 < settings.TIMING_PROFILE_THRESHOLD_MS:
+        return
+    os.makedirs(settings.TIMING_PROFILE_DIR, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+    name = endpoint_name(request).replace(':', '-')
+    path = os.path.join(settings.TIMING_PROFILE_DIR, f"{stamp}-{name}-{int(seconds * 1000)}ms.prof")
+    profiler.dump_stats(path)
+    print(f"Slow request {request.method} {request.path} took {seconds:.2f}s, profile written to {path}")
+
+
+class TimingMiddleware:
+    """
+    Collects the stage timings of every request, reports them in a ``Server-Timing``
+    header and feeds the per-endpoint histograms served at /metrics/. A sampled
+    fraction of sync requests also runs under cProfile; the profile is kept when the
+    request turns out slower than TIMING_PROFILE_THRESHOLD_MS.
+
+    For streaming responses the timings stop when the headers are sent.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = settings.TIMING_ENABLED
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        profiler = start_profile()
+        with collect() as timer:
+            start = time.perf_counter()
+            try:
+                response = self.get_response(request)
+            finally:
+                seconds = time.perf_counter() - start
+                if profiler is not None:
+                    finish_profile(profiler, request, seconds)
+        return self.finish(request, response, timer, seconds)
+
+    async def __acall__(self, request):
+        # Async views hand their work to threads, which a profiler on the event loop would not see
+        if not self.enabled:
+            return await self.get_response(request)
+        with collect() as timer:
+            start = time.perf_counter()
+            response = await self.get_response(request)
+            seconds = time.perf_counter() - start
+        return self.finish(request, response, timer, seconds)
+
+    def finish(self, request, response, timer, seconds):
+        observe_request(endpoint_name(request), request.method, response.status_code, seconds, timer)
+        if settings.TIMING_SERVER_TIMING:
+            response['Server-Timing'] = timer.server_timing(seconds)
+        return response
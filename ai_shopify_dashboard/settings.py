@@ -48,10 +48,13 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     'rest_framework',
-    'ecommerce'
+    'ecommerce',
+    'ai.apps.AiConfig'
 ]
 
 MIDDLEWARE = [
+    "ai_shopify_dashboard.middleware.TimingMiddleware",
+    "ecommerce.middleware.ShopMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -151,6 +154,116 @@ SHOPIFY_PASSWORD = os.getenv('SHOPIFY_PASSWORD')
 SHOPIFY_API_SECRET = os.getenv('SHOPIFY_API_SECRET')
 SHOPIFY_ACCESS_TOKEN = os.getenv('SHOPIFY_ACCESS_TOKEN')
 SHOP_NAME = os.getenv('SHOP_NAME')
-
-
-PINECONE_API_KEY = os.getenv('PINECONE_API_KEY')
\ No newline at end of file
+SHOPIFY_API_VERSION = os.getenv('SHOPIFY_API_VERSION', '2023-04')
+# More stores served by the same process, picked per request with ?shop= or an X-Shop-Domain header. JSON:
+# {"other.myshopify.com": {"access_token": "...", "base_url": "...", "bucket_size": 80, "leak_rate": 4}},
+# every key but the credentials optional. Requests naming no store use SHOP_NAME
+SHOPIFY_STORES = os.getenv('SHOPIFY_STORES', '{}')
+# Overrides https://{SHOP_NAME}.myshopify.com/admin/api/{SHOPIFY_API_VERSION}, e.g. for the fake Shopify server
+SHOPIFY_BASE_URL = os.getenv('SHOPIFY_BASE_URL')
+SHOPIFY_PAGE_SIZE = int(os.getenv('SHOPIFY_PAGE_SIZE', 250))  # Shopify allows at most 250 per page
+SHOPIFY_TIMEOUT = float(os.getenv('SHOPIFY_TIMEOUT', 30))
+SHOPIFY_POOL_SIZE = int(os.getenv('SHOPIFY_POOL_SIZE', 10))  # keep-alive connections per host
+# REST leaky bucket: 40 calls refilling at 2/s on standard plans (80 and 4/s on Plus)
+SHOPIFY_BUCKET_SIZE = int(os.getenv('SHOPIFY_BUCKET_SIZE', 40))
+SHOPIFY_LEAK_RATE = float(os.getenv('SHOPIFY_LEAK_RATE', 2))
+SHOPIFY_MAX_RETRIES = int(os.getenv('SHOPIFY_MAX_RETRIES', 5))
+# Variants fetched along with each product by the GraphQL catalog reader, products with more
+# get the rest in follow-up queries. Higher means fewer products per page (query cost grows with it)
+SHOPIFY_GRAPHQL_VARIANTS_PER_PRODUCT = int(os.getenv('SHOPIFY_GRAPHQL_VARIANTS_PER_PRODUCT', 10))
+# Upper bound for each resource fetched by the aggregated get_dashboard endpoint
+DASHBOARD_RESOURCE_TIMEOUT = float(os.getenv('DASHBOARD_RESOURCE_TIMEOUT', 15))
+# get_shopify_products/orders/customers keep their serialized body and ETag. Within REVALIDATE seconds a poll
+# is answered without asking Shopify; after that a count + updated_at_min check decides, and after MAX_AGE the
+# list is fetched again (stock changes do not always move a product's updated_at)
+LIST_REVALIDATE_SECONDS = float(os.getenv('LIST_REVALIDATE_SECONDS', 5))
+LIST_MAX_AGE_SECONDS = float(os.getenv('LIST_MAX_AGE_SECONDS', 300))
+# 'shopify' reads the live API on every request, 'mirror' reads the local copy kept by `manage.py sync_shopify`.
+# 'graphql' reads products from the live GraphQL Admin API (only the fields the app uses), orders and customers from REST
+CATALOG_SOURCE = os.getenv('CATALOG_SOURCE', 'shopify')
+
+
+PINECONE_API_KEY = os.getenv('PINECONE_API_KEY')
+
+PINECONE_INDEX_NAME = os.getenv('PINECONE_INDEX_NAME', 'ecommerce-data-768')
+
+# Vector index backend: 'pinecone' or 'local' (exact search over a memory-mapped matrix, no network)
+AI_VECTOR_STORE = os.getenv('AI_VECTOR_STORE', 'pinecone')
+AI_LOCAL_INDEX_PATH = os.getenv('AI_LOCAL_INDEX_PATH', str(BASE_DIR / 'data' / 'vector_index'))
+AI_LOCAL_INDEX_METRIC = os.getenv('AI_LOCAL_INDEX_METRIC', 'euclidean')  # or 'cosine'
+AI_LOCAL_INDEX_DTYPE = os.getenv('AI_LOCAL_INDEX_DTYPE', 'float32')  # or 'float16' to halve memory
+
+# Product id -> content hash of everything already upserted to the vector index, an append-only log
+# (an existing .npz manifest of the same name is imported). One manifest per backend so switching
+# backends re-populates the new index.
+AI_EMBEDDING_MANIFEST_PATH = os.getenv('AI_EMBEDDING_MANIFEST_PATH', str(BASE_DIR / 'data' / f'embedding_manifest-{AI_VECTOR_STORE}.tsv'))
+
+# Number of product texts tokenized and run through the embedding model per forward pass
+AI_EMBEDDING_BATCH_SIZE = int(os.getenv('AI_EMBEDDING_BATCH_SIZE', 32))
+
+# 'request' syncs the index with the catalog inside get_insights. 'worker' leaves that to
+# `manage.py run_index_worker`, fed by Shopify product webhooks (POST /webhooks/products/,
+# signed with SHOPIFY_API_SECRET); pair it with CATALOG_SOURCE=mirror, which the worker also updates.
+AI_INDEXING_MODE = os.getenv('AI_INDEXING_MODE', 'request')
+
+# Threads running independent get_insights stages side by side (query embedding during the catalog
+# fetch, index sync during retrieval and QA); 1 runs every stage in the request thread, one after another
+AI_PIPELINE_CONCURRENCY = int(os.getenv('AI_PIPELINE_CONCURRENCY', 4))
+# 'eventual' retrieves while the index sync is still running, so products changed since the last sync may be
+# missed by that one request; 'strict' waits for the sync first. Per request with ?consistency=
+AI_PIPELINE_CONSISTENCY = os.getenv('AI_PIPELINE_CONSISTENCY', 'eventual')
+
+# Load the models and vector index in a background thread as soon as a worker starts,
+# instead of on the first get_insights request
+AI_WARMUP_ON_START = os.getenv('AI_WARMUP_ON_START', 'false').lower() in ('1', 'true', 'yes')
+
+# get_insights answer cache keyed by normalized query + catalog version: 'local' (per-process LRU),
+# 'django' (the CACHES alias below, shared between workers with e.g. Redis/Memcached) or 'none'
+AI_INSIGHTS_CACHE_BACKEND = os.getenv('AI_INSIGHTS_CACHE_BACKEND', 'local')
+AI_INSIGHTS_CACHE_ALIAS = os.getenv('AI_INSIGHTS_CACHE_ALIAS', 'default')
+AI_INSIGHTS_CACHE_SIZE = int(os.getenv('AI_INSIGHTS_CACHE_SIZE', 256))
+AI_INSIGHTS_CACHE_TTL = int(os.getenv('AI_INSIGHTS_CACHE_TTL', 300))  # seconds
+
+# Group concurrent QA and query-embedding calls into one forward pass. Pays off with threaded
+# (gthread) or ASGI workers serving several questions at once; adds up to MAX_WAIT_MS otherwise.
+AI_MICRO_BATCHING = os.getenv('AI_MICRO_BATCHING', 'false').lower() in ('1', 'true', 'yes')
+AI_BATCH_MAX_SIZE = int(os.getenv('AI_BATCH_MAX_SIZE', 16))
+AI_BATCH_MAX_WAIT_MS = float(os.getenv('AI_BATCH_MAX_WAIT_MS', 5))
+
+# 'local' runs the models inside every web worker. 'server' sends embedding/QA calls to the single
+# process started with `manage.py run_inference_server`, so workers stay at plain Django memory.
+AI_INFERENCE_MODE = os.getenv('AI_INFERENCE_MODE', 'local')
+AI_INFERENCE_ADDRESS = os.getenv('AI_INFERENCE_ADDRESS', 'unix:' + str(BASE_DIR / 'data' / 'inference.sock'))  # or 'host:port'
+AI_INFERENCE_AUTHKEY = os.getenv('AI_INFERENCE_AUTHKEY')  # defaults to SECRET_KEY
+AI_INFERENCE_TIMEOUT = float(os.getenv('AI_INFERENCE_TIMEOUT', 60))
+# Load the models in-process when the inference server is unreachable instead of failing the request
+AI_INFERENCE_FALLBACK = os.getenv('AI_INFERENCE_FALLBACK', 'false').lower() in ('1', 'true', 'yes')
+
+# CPU inference tuning: dynamic int8 quantization of the Linear layers, torch threads per worker
+# process (leave unset for torch's default of one per core) and a cap on tokens per sequence
+AI_QUANTIZE = os.getenv('AI_QUANTIZE', 'false').lower() in ('1', 'true', 'yes')
+AI_TORCH_THREADS = int(os.getenv('AI_TORCH_THREADS', 0)) or None
+AI_TORCH_INTEROP_THREADS = int(os.getenv('AI_TORCH_INTEROP_THREADS', 0)) or None
+AI_MAX_SEQ_LENGTH = int(os.getenv('AI_MAX_SEQ_LENGTH', 0)) or None
+
+# Matches retrieved per get_insights question, and how QA reads them: 'passages' keeps the ones
+# sharing words with the question up to AI_QA_CONTEXT_TOKENS (estimated) and answers over each in
+# one batch, 'concat' joins every match into one context
+AI_QA_TOP_K = int(os.getenv('AI_QA_TOP_K', 10))
+AI_QA_CONTEXT = os.getenv('AI_QA_CONTEXT', 'passages')
+AI_QA_CONTEXT_TOKENS = int(os.getenv('AI_QA_CONTEXT_TOKENS', 96))
+
+# 'hybrid' searches a BM25 index of product titles and types next to the vector index and fuses both
+# rankings; when the best lexical hit has every query word and outscores the next one by
+# AI_LEXICAL_DECISIVE_MARGIN the query is not embedded at all. 'vector' only uses the vector index
+AI_RETRIEVAL = os.getenv('AI_RETRIEVAL', 'hybrid')
+AI_LEXICAL_DECISIVE_MARGIN = float(os.getenv('AI_LEXICAL_DECISIVE_MARGIN', 1.5))
+
+# Per-request stage timings: Server-Timing response headers and histograms served at /metrics/.
+# TIMING_PROFILE_RATE runs that fraction of requests under cProfile and keeps the profile of the
+# ones slower than TIMING_PROFILE_THRESHOLD_MS (0 disables profiling).
+TIMING_ENABLED = os.getenv('TIMING_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+TIMING_SERVER_TIMING = os.getenv('TIMING_SERVER_TIMING', 'true').lower() in ('1', 'true', 'yes')
+TIMING_PROFILE_RATE = float(os.getenv('TIMING_PROFILE_RATE', 0))
+TIMING_PROFILE_THRESHOLD_MS = float(os.getenv('TIMING_PROFILE_THRESHOLD_MS', 5000))
+TIMING_PROFILE_DIR = os.getenv('TIMING_PROFILE_DIR', str(BASE_DIR / 'data' / 'profiles'))
@@ -0,0 +1,179 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Stage timings for the unit of work in the current context (a request, a benchmark run).
+# stage() is a no-op unless collect() is active, so instrumented code costs nothing otherwise.
+# A context variable rather than a thread local, so work handed to sync_to_async threads or
+# asyncio tasks is still counted against the request that started it.
+_timer = contextvars.ContextVar('stage_timer', default=None)
+
+# Seconds; the upper buckets cover cold requests that embed the whole catalog
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class StageTimer:
+
+    def __init__(self):
+        self.seconds = {}
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def totals(self):
+        with self._lock:
+            return dict(self.seconds)
+
+    def as_dict(self):
+        # name -> milliseconds, in the order the stages first ran
+        return {name: round(seconds * 1000, 3) for name, seconds in self.totals().items()}
+
+    def server_timing(self, total_seconds=None):
+        entries = [f"{name};dur={ms:.1f}" for name, ms in self.as_dict().items()]
+        if total_seconds is not None:
+            entries.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ", ".join(entries)
+
+
+def current_timer():
+    return _timer.get()
+
+
+@contextmanager
+def collect():
+    timer = StageTimer()
+    token = _timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _timer.reset(token)
+
+
+@contextmanager
+def stage(name):
+    timer = _timer.get()
+    if timer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - start)
+
+
+def record(name, seconds):
+    # For time measured elsewhere, e.g. a rate limiter reporting how long it slept
+    timer = _timer.get()
+    if timer is not None:
+        timer.add(name, seconds)
+
+
+def timed(name):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Cumulative Prometheus histogram, one series per combination of label values."""
+
+    def __init__(self, name, documentation, labels, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, seconds):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series['counts'][i] += 1
+                    break
+            series['sum'] += seconds
+            series['count'] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: dict(value, counts=list(value['counts'])) for key, value in self._series.items()}
+        for label_values, data in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, data['counts']):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, label_values, le)} {data['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, label_values)} {data['sum']:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, label_values)} {data['count']}")
+        return lines
+
+
+class Counter:
+
+    def __init__(self, name, documentation, labels):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+# Per process: with several workers, scrape each one or aggregate in Prometheus
+request_seconds = Histogram('http_request_duration_seconds', "Time spent handling a request.", ('endpoint', 'method'))
+stage_seconds = Histogram('stage_duration_seconds', "Time spent in a named stage of a request.", ('endpoint', 'stage'))
+responses_total = Counter('http_responses_total', "Responses sent, by status code.", ('endpoint', 'method', 'status'))
+
+
+def observe_request(endpoint, method, status, seconds, timer=None):
+    request_seconds.observe((endpoint, method), seconds)
+    responses_total.inc((endpoint, method, str(status)))
+    if timer is not None:
+        for name, stage_total in timer.totals().items():
+            stage_seconds.observe((endpoint, name), stage_total)
+
+
+def render_metrics():
+    lines = []
+    for metric in (request_seconds, stage_seconds, responses_total):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
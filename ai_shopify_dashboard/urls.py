@@ -17,8 +17,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path
 
+from .views import metrics
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path('',include(('ecommerce.urls','ecommerce'),namespace='ecommerce')),
-    path('ai/',include(('ai.urls','ai'),namespace='ai'))
+    path('ai/',include(('ai.urls','ai'),namespace='ai')),
+    path('metrics/', metrics, name='metrics'),
 ]
@@ -0,0 +1,8 @@
+from django.http import HttpResponse
+
+from .timing import render_metrics
+
+
+def metrics(request):
+    # Prometheus text exposition format, for this worker process only
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,3 +1,7 @@
 from django.contrib import admin
 
+from .models import (Customer, CustomerDailySales, LineItem, Order, Product, ProductDailySales, SyncState, Variant,
+                     WebhookEvent)
+
 # Register your models here.
+admin.site.register([Product, Variant, Customer, Order, LineItem, SyncState, WebhookEvent, ProductDailySales, CustomerDailySales])
@@ -0,0 +1,277 @@
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Max, Sum
+from django.db.models.functions import TruncDate
+
+from .models import CustomerDailySales, LineItem, Order, ProductDailySales, SyncState
+
+# Sales rollups: line items and order totals aggregated per product / customer and day in
+# the database, maintained incrementally by the order sync, and loaded into NumPy columns
+# so top-N, time series and period comparisons over a year of orders are a few bincounts.
+
+ROLLUP_STATE = 'sales_rollups'  # SyncState row whose synced_at changes on every rebuild
+METRICS = ('revenue', 'units', 'orders')
+INTERVALS = ('day', 'week', 'month')
+
+
+def order_days(shopify_ids):
+    return set(
+        Order.objects.filter(shopify_id__in=shopify_ids, created_at__isnull=False)
+        .annotate(day=TruncDate('created_at')).values_list('day', flat=True).distinct()
+    )
+
+
+def _aggregate(line_items, orders):
+    product_rows = (
+        line_items.annotate(day=TruncDate('order__created_at'))
+        .values('day', 'product_shopify_id')
+        .annotate(
+            revenue=Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2)),
+            units=Sum('quantity'),
+            orders=Count('order_id', distinct=True),
+            title=Max('title'),
+        )
+    )
+    ProductDailySales.objects.bulk_create([
+        ProductDailySales(day=row['day'], product_shopify_id=row['product_shopify_id'], title=row['title'] or '',
+                          revenue=row['revenue'] or 0, units=row['units'] or 0, orders=row['orders'])
+        for row in product_rows
+    ], batch_size=2000)
+
+    customer_rows = (
+        orders.annotate(day=TruncDate('created_at'))
+        .values('day', 'customer_shopify_id')
+        .annotate(revenue=Sum('total_price'), orders=Count('id'))
+    )
+    CustomerDailySales.objects.bulk_create([
+        CustomerDailySales(day=row['day'], customer_shopify_id=row['customer_shopify_id'],
+                           revenue=row['revenue'] or 0, orders=row['orders'])
+        for row in customer_rows
+    ], batch_size=2000)
+    SyncState.objects.update_or_create(resource=ROLLUP_STATE)
+
+
+@transaction.atomic
+def rebuild_days(days):
+    """Recompute the rollup rows of the given order days from the mirrored orders."""
+    days = sorted(day for day in days if day)
+    if not days:
+        return 0
+    ProductDailySales.objects.filter(day__in=days).delete()
+    CustomerDailySales.objects.filter(day__in=days).delete()
+    _aggregate(
+        LineItem.objects.filter(order__created_at__date__in=days),
+        Order.objects.filter(created_at__date__in=days),
+    )
+    return len(days)
+
+
+@transaction.atomic
+def rebuild_all():
+    ProductDailySales.objects.all().delete()
+    CustomerDailySales.objects.all().delete()
+    _aggregate(LineItem.objects.filter(order__created_at__isnull=False), Order.objects.filter(created_at__isnull=False))
+
+
+def _percent_change(current, previous):
+    return round((current - previous) / previous * 100, 2) if previous else None
+
+
+class SalesRollup:
+    """
+    Columnar, read-only copy of the rollup tables. Days are stored as proleptic
+    ordinals, products and customers as positions into ``product_ids`` /
+    ``customer_ids``.
+    """
+
+    def __init__(self, product_rows, customer_rows):
+        product_rows = list(product_rows)
+        customer_rows = list(customer_rows)
+
+        self.product_ids = []
+        self.titles = []
+        positions = {}
+        product_index = np.empty(len(product_rows), dtype=np.int64)
+        for i, (_, product_id, title, _, _, _) in enumerate(product_rows):
+            if product_id not in positions:
+                positions[product_id] = len(self.product_ids)
+                self.product_ids.append(product_id)
+                self.titles.append(title)
+            position = positions[product_id]
+            if title:
+                self.titles[position] = title
+            product_index[i] = position
+        self.product_positions = positions
+        self.product_index = product_index
+        self.product_day = np.array([row[0].toordinal() for row in product_rows], dtype=np.int64)
+        self.product_revenue = np.array([float(row[3]) for row in product_rows], dtype=np.float64)
+        self.product_units = np.array([row[4] for row in product_rows], dtype=np.int64)
+        self.product_orders = np.array([row[5] for row in product_rows], dtype=np.int64)
+
+        self.customer_ids = []
+        positions = {}
+        customer_index = np.empty(len(customer_rows), dtype=np.int64)
+        for i, (_, customer_id, _, _) in enumerate(customer_rows):
+            if customer_id not in positions:
+                positions[customer_id] = len(self.customer_ids)
+                self.customer_ids.append(customer_id)
+            customer_index[i] = positions[customer_id]
+        self.customer_positions = positions
+        self.customer_index = customer_index
+        self.customer_day = np.array([row[0].toordinal() for row in customer_rows], dtype=np.int64)
+        self.customer_revenue = np.array([float(row[2]) for row in customer_rows], dtype=np.float64)
+        self.customer_orders = np.array([row[3] for row in customer_rows], dtype=np.int64)
+
+        days = np.concatenate([self.product_day, self.customer_day])
+        self.first_day = date.fromordinal(int(days.min())) if len(days) else None
+        self.last_day = date.fromordinal(int(days.max())) if len(days) else None
+
+    @classmethod
+    def from_database(cls):
+        return cls(
+            ProductDailySales.objects.order_by('day', 'id').values_list('day', 'product_shopify_id', 'title', 'revenue', 'units', 'orders'),
+            CustomerDailySales.objects.order_by('day', 'id').values_list('day', 'customer_shopify_id', 'revenue', 'orders'),
+        )
+
+    def is_empty(self):
+        return self.last_day is None
+
+    def default_period(self, days=30):
+        # The last ``days`` days that have orders, so the answer does not depend on when it is asked
+        end = self.last_day or date.today()
+        return end - timedelta(days=days - 1), end
+
+    @staticmethod
+    def _mask(day_column, start, end):
+        return (day_column >= start.toordinal()) & (day_column <= end.toordinal())
+
+    def _product_column(self, metric):
+        return {'revenue': self.product_revenue, 'units': self.product_units, 'orders': self.product_orders}[metric]
+
+    def _product_totals(self, start, end, metric):
+        mask = self._mask(self.product_day, start, end)
+        return np.bincount(self.product_index[mask], weights=self._product_column(metric)[mask], minlength=len(self.product_ids))
+
+    def top_products(self, start, end, limit=10, metric='revenue'):
+        mask = self._mask(self.product_day, start, end)
+        revenue = np.bincount(self.product_index[mask], weights=self.product_revenue[mask], minlength=len(self.product_ids))
+        units = np.bincount(self.product_index[mask], weights=self.product_units[mask], minlength=len(self.product_ids))
+        ranked = revenue if metric == 'revenue' else units
+        return [
+            {
+                'product_id': self.product_ids[i],
+                'title': self.titles[i],
+                'revenue': round(float(revenue[i]), 2),
+                'units': int(units[i]),
+            }
+            for i in self._top(ranked, limit)
+        ]
+
+    def top_customers(self, start, end, limit=10):
+        mask = self._mask(self.customer_day, start, end)
+        revenue = np.bincount(self.customer_index[mask], weights=self.customer_revenue[mask], minlength=len(self.customer_ids))
+        orders = np.bincount(self.customer_index[mask], weights=self.customer_orders[mask], minlength=len(self.customer_ids))
+        return [
+            {'customer_id': self.customer_ids[i], 'revenue': round(float(revenue[i]), 2), 'orders': int(orders[i])}
+            for i in self._top(revenue, limit)
+        ]
+
+    @staticmethod
+    def _top(values, limit):
+        # argpartition keeps this O(n) in the number of products, only the top ``limit`` get sorted
+        candidates = np.flatnonzero(values > 0)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-values[candidates], limit - 1)[:limit]]
+        return candidates[np.argsort(-values[candidates], kind='stable')].tolist()
+
+    def product_units_total(self):
+        return np.bincount(self.product_index, weights=self.product_units, minlength=len(self.product_ids)).astype(np.int64).tolist()
+
+    def totals(self, start, end):
+        customer_mask = self._mask(self.customer_day, start, end)
+        product_mask = self._mask(self.product_day, start, end)
+        return {
+            'revenue': round(float(self.customer_revenue[customer_mask].sum()), 2),
+            'orders': int(self.customer_orders[customer_mask].sum()),
+            'units': int(self.product_units[product_mask].sum()),
+        }
+
+    def time_series(self, start, end, metric='revenue', interval='day', product_id=None, customer_id=None):
+        """
+        ``metric`` per ``interval`` between ``start`` and ``end``, for the whole store or
+        one product or customer. Revenue is order totals for the store and customers,
+        line item revenue for a product.
+        """
+        if customer_id is not None:
+            if metric == 'units':
+                raise ValueError("Units are not tracked per customer")
+            day, values = self.customer_day, self.customer_revenue if metric == 'revenue' else self.customer_orders
+            selected = self.customer_index == self.customer_positions.get(customer_id, -1)
+        elif product_id is not None or metric == 'units':
+            day, values = self.product_day, self._product_column(metric)
+            selected = self.product_index == self.product_positions.get(product_id, -1) if product_id is not None else True
+        else:
+            day, values = self.customer_day, self.customer_revenue if metric == 'revenue' else self.customer_orders
+            selected = True
+
+        length = (end - start).days + 1
+        mask = self._mask(day, start, end) & selected
+        per_day = np.bincount(day[mask] - start.toordinal(), weights=values[mask], minlength=length)
+
+        dates = np.datetime64(start.isoformat(), 'D') + np.arange(length)
+        if interval == 'week':
+            labels = dates[::7]
+            buckets = np.arange(length) // 7
+        elif interval == 'month':
+            months = dates.astype('datetime64[M]')
+            labels, buckets = np.unique(months, return_inverse=True)
+        else:
+            labels, buckets = dates, np.arange(length)
+        sums = np.bincount(buckets, weights=per_day, minlength=len(labels))
+        return [
+            {'period': str(label.astype('datetime64[D]')), metric: round(float(value), 2) if metric == 'revenue' else int(value)}
+            for label, value in zip(labels, sums)
+        ]
+
+    def compare(self, start, end, previous_start=None, previous_end=None, limit=5):
+        """Totals of a period against the previous one (by default the same number of days right before it)."""
+        if previous_start is None or previous_end is None:
+            previous_end = start - timedelta(days=1)
+            previous_start = previous_end - (end - start)
+        current, previous = self.totals(start, end), self.totals(previous_start, previous_end)
+
+        delta = self._product_totals(start, end, 'revenue') - self._product_totals(previous_start, previous_end, 'revenue')
+        order = np.argsort(delta, kind='stable')
+
+        def movers(positions):
+            return [
+                {'product_id': self.product_ids[i], 'title': self.titles[i], 'revenue_change': round(float(delta[i]), 2)}
+                for i in positions
+            ]
+
+        return {
+            'period': {'start': start.isoformat(), 'end': end.isoformat(), **current},
+            'previous_period': {'start': previous_start.isoformat(), 'end': previous_end.isoformat(), **previous},
+            'change_percent': {metric: _percent_change(current[metric], previous[metric]) for metric in METRICS},
+            'top_gainers': movers([i for i in order[::-1][:limit] if delta[i] > 0]),
+            'top_decliners': movers([i for i in order[:limit] if delta[i] < 0]),
+        }
+
+
+_rollup = None
+_rollup_version = None
+_rollup_lock = threading.Lock()
+
+
+def get_rollup():
+    # Reloaded only when a sync rebuilt some days since the last load
+    global _rollup, _rollup_version
+    version = SyncState.objects.filter(resource=ROLLUP_STATE).values_list('synced_at', flat=True).first()
+    with _rollup_lock:
+        if _rollup is None or version != _rollup_version:
+            _rollup = SalesRollup.from_database()
+            _rollup_version = version
+        return _rollup
@@ -0,0 +1,291 @@
+import json
+import time
+
+import requests
+from django.conf import settings
+
+from .models import SyncState
+from .shopify_client import get_client
+from .sync import UPSERTS, _datetime, prune
+
+# Full resyncs through Shopify's GraphQL Bulk Operations: one query runs server side, the
+# result is a JSONL file where nested connections (variants, line items) are flattened into
+# their own lines pointing at the parent via __parentId. The file is streamed and parents are
+# reassembled one at a time, so memory stays flat however large the store is.
+
+BULK_QUERIES = {
+    'products': """
+{
+  products {
+    edges {
+      node {
+        id
+        title
+        productType
+        updatedAt
+        variants {
+          edges {
+            node { id title sku price inventoryQuantity position updatedAt }
+          }
+        }
+      }
+    }
+  }
+}""",
+    'orders': """
+{
+  orders {
+    edges {
+      node {
+        id
+        email
+        createdAt
+        updatedAt
+        totalPriceSet { shopMoney { amount } }
+        customer { id }
+        lineItems {
+          edges {
+            node {
+              id
+              title
+              quantity
+              variant { id }
+              product { id }
+              originalUnitPriceSet { shopMoney { amount } }
+            }
+          }
+        }
+      }
+    }
+  }
+}""",
+    'customers': """
+{
+  customers {
+    edges {
+      node { id email firstName lastName ordersCount updatedAt }
+    }
+  }
+}""",
+}
+
+RUN_MUTATION = """
+mutation bulkOperationRunQuery($query: String!) {
+  bulkOperationRunQuery(query: $query) {
+    bulkOperation { id status }
+    userErrors { field message }
+  }
+}"""
+
+STATUS_QUERY = "{ currentBulkOperation { id status errorCode objectCount url partialDataUrl } }"
+
+FINISHED = ('COMPLETED', 'FAILED', 'CANCELED', 'EXPIRED')
+
+
+class BulkOperationError(Exception):
+    pass
+
+
+def legacy_id(gid):
+    # 'gid://shopify/ProductVariant/123' -> 123, the numeric ids the REST API and the mirror use
+    return int(gid.rsplit('/', 1)[-1]) if gid else None
+
+
+def _money(value):
+    return ((value or {}).get('shopMoney') or {}).get('amount', '0.00')
+
+
+def product_from_node(node):
+    return {
+        'id': legacy_id(node['id']),
+        'title': node.get('title'),
+        'product_type': node.get('productType'),
+        'updated_at': node.get('updatedAt'),
+        'variants': []
+    }
+
+
+def variant_from_node(node):
+    return {
+        'id': legacy_id(node['id']),
+        'title': node.get('title'),
+        'sku': node.get('sku'),
+        'price': node.get('price'),
+        'inventory_quantity': node.get('inventoryQuantity') or 0,
+        'position': node.get('position'),
+        'updated_at': node.get('updatedAt')
+    }
+
+
+def order_from_node(node):
+    customer = node.get('customer')
+    return {
+        'id': legacy_id(node['id']),
+        'email': node.get('email'),
+        'created_at': node.get('createdAt'),
+        'updated_at': node.get('updatedAt'),
+        'total_price': _money(node.get('totalPriceSet')),
+        'customer': {'id': legacy_id(customer['id'])} if customer else None,
+        'line_items': []
+    }
+
+
+def line_item_from_node(node):
+    return {
+        'id': legacy_id(node['id']),
+        'title': node.get('title'),
+        'quantity': node.get('quantity') or 0,
+        'variant_id': legacy_id((node.get('variant') or {}).get('id')),
+        'product_id': legacy_id((node.get('product') or {}).get('id')),
+        'price': _money(node.get('originalUnitPriceSet'))
+    }
+
+
+def customer_from_node(node):
+    return {
+        'id': legacy_id(node['id']),
+        'email': node.get('email'),
+        'first_name': node.get('firstName'),
+        'last_name': node.get('lastName'),
+        'orders_count': int(node.get('ordersCount') or 0),
+        'updated_at': node.get('updatedAt')
+    }
+
+
+# resource -> (parent converter, {child gid type: (converter, list key on the parent)})
+SHAPES = {
+    'products': (product_from_node, {'ProductVariant': (variant_from_node, 'variants')}),
+    'orders': (order_from_node, {'LineItem': (line_item_from_node, 'line_items')}),
+    'customers': (customer_from_node, {}),
+}
+
+
+def iter_bulk_records(lines, resource, stats=None):
+    """
+    Turn the lines of a bulk operation result into REST-shaped records (the shape
+    ecommerce.sync and the catalog code already consume). Shopify writes every child
+    line after its parent, so a parent is complete as soon as the next parent starts;
+    only that one record is held in memory.
+    """
+    to_parent, children = SHAPES[resource]
+    stats = stats if stats is not None else {}
+    stats.setdefault('lines', 0)
+    stats.setdefault('orphans', 0)
+    current, current_gid = None, None
+    for line in lines:
+        if not line:
+            continue
+        stats['lines'] += 1
+        node = json.loads(line)
+        parent_gid = node.pop('__parentId', None)
+        if parent_gid is None:
+            if current is not None:
+                yield current
+            current, current_gid = to_parent(node), node['id']
+            continue
+        if parent_gid != current_gid:
+            # Would mean the file is not in parent-then-children order, which Shopify guarantees
+            stats['orphans'] += 1
+            continue
+        to_child, key = children.get(node['id'].split('/')[-2], (None, None))
+        if to_child is not None:
+            current[key].append(to_child(node))
+    if current is not None:
+        yield current
+
+
+class BulkOperation:
+
+    def __init__(self, client=None, poll_interval=2.0, timeout=3600):
+        self.client = client or get_client()
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+    def graphql(self, query, variables=None):
+        # Status queries may be retried, the mutation starting an operation must not be sent twice
+        idempotent = not query.lstrip().startswith('mutation')
+        response = self.client.post('graphql.json', idempotent=idempotent, json={'query': query, 'variables': variables or {}})
+        response.raise_for_status()
+        payload = response.json()
+        if payload.get('errors'):
+            raise BulkOperationError(f"GraphQL errors: {payload['errors']}")
+        return payload['data']
+
+    def current(self):
+        return self.graphql(STATUS_QUERY)['currentBulkOperation']
+
+    def submit(self, query):
+        # Only one bulk query can run per shop at a time
+        current = self.current()
+        if current and current['status'] in ('CREATED', 'RUNNING'):
+            raise BulkOperationError(f"Bulk operation {current['id']} is still {current['status'].lower()}")
+        result = self.graphql(RUN_MUTATION, {'query': query})['bulkOperationRunQuery']
+        if result['userErrors']:
+            raise BulkOperationError(f"Bulk query rejected: {result['userErrors']}")
+        return result['bulkOperation']['id']
+
+    def wait(self, operation_id):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            current = self.current()
+            if current is None or current['id'] != operation_id:
+                raise BulkOperationError(f"Bulk operation {operation_id} is no longer the current one")
+            if current['status'] in FINISHED:
+                if current['status'] != 'COMPLETED':
+                    raise BulkOperationError(f"Bulk operation {operation_id} {current['status'].lower()}: {current.get('errorCode')}")
+                return current
+            if time.monotonic() > deadline:
+                raise BulkOperationError(f"Bulk operation {operation_id} did not finish within {self.timeout}s")
+            time.sleep(self.poll_interval)
+
+    def lines(self, url):
+        # A signed storage URL: no Shopify credentials and no call limit, streamed in chunks
+        if not url:
+            return
+        with requests.get(url, stream=True, timeout=settings.SHOPIFY_TIMEOUT) as response:
+            response.raise_for_status()
+            yield from response.iter_lines(chunk_size=1 << 16)
+
+    def records(self, resource, stats=None):
+        operation = self.wait(self.submit(BULK_QUERIES[resource]))
+        if stats is not None:
+            stats['object_count'] = int(operation.get('objectCount') or 0)
+        return iter_bulk_records(self.lines(operation.get('url')), resource, stats)
+
+
+def _batches(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bulk_sync_resource(resource, records=None, batch_size=500, operation=None):
+    """
+    Full resync of ``resource`` into the mirror from a bulk operation (or from already
+    parsed ``records``, e.g. a downloaded file). Local rows missing from the result are
+    deleted once it has been read to the end. Advances the same watermark as
+    sync_resource, so later incremental REST syncs continue from here.
+    """
+    stats = {}
+    if records is None:
+        records = (operation or BulkOperation()).records(resource, stats)
+    state, _ = SyncState.objects.get_or_create(resource=resource)
+    watermark = state.watermark
+    synced = 0
+    seen = set()
+    for batch in _batches(records, batch_size):
+        synced += UPSERTS[resource](batch)
+        for record in batch:
+            seen.add(record['id'])
+            updated_at = _datetime(record.get('updated_at'))
+            if updated_at and (watermark is None or updated_at > watermark):
+                watermark = updated_at
+    deleted = prune(resource, seen)
+    state.watermark = watermark
+    state.save()
+    return dict(stats, synced=synced, deleted=deleted)
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+
+from .graphql import iter_products
+from .models import Customer, Order, Product
+from .pagination import customer_record, iter_records, order_record, product_record
+from .stores import current_shop, is_default_shop
+
+# Where the endpoints and get_insights read from: 'shopify' (live REST API), 'graphql' (live GraphQL
+# API for products, REST for the rest) or 'mirror' (local database)
+SOURCES = ('shopify', 'graphql', 'mirror')
+
+
+def resolve_source(source=None):
+    source = source or settings.CATALOG_SOURCE
+    if source not in SOURCES:
+        raise ValueError(f"Unknown catalog source '{source}', use one of {', '.join(SOURCES)}")
+    if source == 'mirror' and not is_default_shop():
+        raise ValueError(f"The local mirror only holds the default store, read {current_shop()} with source=shopify or graphql")
+    return source
+
+
+def _watermarked(rows, stats):
+    # Live rows as they are, noting the newest updated_at in ``stats`` (the list endpoints' change check starts there)
+    for row in rows:
+        if stats is not None:
+            updated_at = parse_datetime(row.get('updated_at') or '')
+            if updated_at and (stats.get('updated_at') is None or updated_at > stats['updated_at']):
+                stats['updated_at'] = updated_at
+        yield row
+
+
+def product_records(source=None, page_size=None, stats=None):
+    source = resolve_source(source)
+    if source == 'mirror':
+        return (product.to_record() for product in Product.objects.prefetch_related('variants').order_by('id').iterator(chunk_size=2000))
+    if source == 'graphql':
+        return iter_products(page_size=page_size, stats=stats)
+    return (product_record(product) for product in _watermarked(iter_records('products', page_size=page_size), stats))
+
+
+def order_records(source=None, page_size=None, stats=None):
+    if resolve_source(source) == 'mirror':
+        return (order.to_record() for order in Order.objects.prefetch_related('line_items').order_by('id').iterator(chunk_size=2000))
+    return (order_record(order) for order in _watermarked(iter_records('orders', page_size=page_size), stats))
+
+
+def customer_records(source=None, page_size=None, stats=None):
+    if resolve_source(source) == 'mirror':
+        return (customer.to_record() for customer in Customer.objects.order_by('id').iterator(chunk_size=2000))
+    return (customer_record(customer) for customer in _watermarked(iter_records('customers', page_size=page_size), stats))
@@ -0,0 +1,164 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, quote_etag
+from rest_framework.renderers import JSONRenderer
+
+from ai_shopify_dashboard.timing import stage
+from .catalog import resolve_source
+from .models import Customer, Order, Product, SyncState, WebhookEvent
+from .shopify_client import get_client
+from .stores import current_shop
+
+# Serialized list endpoint bodies per store, resource and source, with the ETag clients
+# poll with. A poll is answered from here while the collection is known to be unchanged:
+# without asking anyone for LIST_REVALIDATE_SECONDS, then as long as a cheap check says
+# so (a count and an updated_at_min query against Shopify, a few aggregates on the mirror).
+# Shopify does not touch a product's updated_at for every stock change, so live bodies
+# are fully re-fetched after LIST_MAX_AGE_SECONDS regardless; an unchanged body keeps
+# its ETag and clients still get a 304.
+
+MODELS = {'products': Product, 'orders': Order, 'customers': Customer}
+FETCH_STAGES = {'products': 'catalog_fetch', 'orders': 'orders_fetch', 'customers': 'customers_fetch'}
+CHECK_PAGE_SIZE = 250
+
+_entries = {}
+_entries_lock = threading.Lock()
+# The same for record lists read in-process (get_insights), see cached_records
+_records = {}
+
+
+def mirror_version(resource):
+    # Changes with every insert, delete and sync of the resource (and product webhook processed by the worker)
+    version = MODELS[resource].objects.aggregate(count=Count('id'), updated_at=Max('updated_at'))
+    version['synced_at'] = SyncState.objects.filter(resource=resource).values_list('synced_at', flat=True).first()
+    if resource == 'products':
+        version['webhooks'] = WebhookEvent.objects.aggregate(processed_at=Max('processed_at'))['processed_at']
+    return version
+
+
+def live_unchanged(resource, entry):
+    """
+    True when Shopify still has as many ``resource`` as the cached body and none of them
+    was updated after the newest ``updated_at`` the body was built from.
+    """
+    if entry['updated_at'] is None:
+        return False
+    client = get_client()
+    response = client.get(f"{resource}/count.json")
+    response.raise_for_status()
+    if response.json()['count'] != entry['count']:
+        return False
+    response = client.get(f"{resource}.json", params={
+        'updated_at_min': entry['updated_at'].isoformat(), 'limit': CHECK_PAGE_SIZE, 'fields': 'id,updated_at'
+    })
+    response.raise_for_status()
+    rows = response.json()[resource]
+    # updated_at_min is inclusive, the rows last seen come back too. A full page of them proves nothing
+    return len(rows) < CHECK_PAGE_SIZE and all(
+        parse_datetime(row.get('updated_at') or '') == entry['updated_at'] for row in rows)
+
+
+def invalidate(resource, shop=None):
+    # Drop the cached bodies of ``resource`` for the store (every source), the next poll re-fetches
+    shop = shop or current_shop()
+    with _entries_lock:
+        for entries in (_entries, _records):
+            for key in [key for key in entries if key[0] == shop and key[1] == resource]:
+                del entries[key]
+
+
+def _unchanged(resource, source, entry):
+    with stage(f"{resource}_check"):
+        if source == 'mirror':
+            return mirror_version(resource) == entry['version']
+        if time.monotonic() - entry['fetched'] >= settings.LIST_MAX_AGE_SECONDS:
+            return False
+        return live_unchanged(resource, entry)
+
+
+def _load(resource, records, source, page_size):
+    # Every record, with what the change check needs to tell later whether they are still current
+    version = mirror_version(resource) if source == 'mirror' else None
+    stats = {}
+    with stage(FETCH_STAGES[resource]):
+        record_list = list(records(source, page_size, stats=stats))
+    now = time.monotonic()
+    return record_list, {
+        'count': len(record_list),
+        'updated_at': stats.get('updated_at'),
+        'version': version,
+        'fetched': now,
+        'checked': now
+    }
+
+
+def _fetch(resource, records, source, page_size, previous):
+    record_list, entry = _load(resource, records, source, page_size)
+    body = JSONRenderer().render({resource: record_list})
+    etag = quote_etag(hashlib.sha1(body).hexdigest())
+    return dict(
+        entry,
+        body=body,
+        etag=etag,
+        # When this body first appeared; an identical re-fetch keeps the old date
+        last_modified=previous['last_modified'] if previous and previous['etag'] == etag else int(time.time())
+    )
+
+
+def _current(entries, key, resource, source, fetch):
+    # (entry, 'hit' | 'revalidated' | 'miss'), re-fetched with ``fetch(previous entry)`` when the collection changed
+    with _entries_lock:
+        entry = entries.get(key)
+    if entry is not None and time.monotonic() - entry['checked'] < settings.LIST_REVALIDATE_SECONDS:
+        return entry, 'hit'
+    if entry is not None and _unchanged(resource, source, entry):
+        entry['checked'] = time.monotonic()
+        return entry, 'revalidated'
+    entry = fetch(entry)
+    with _entries_lock:
+        entries[key] = entry
+    return entry, 'miss'
+
+
+def cached_records(resource, records, source=None, page_size=None, derive=None):
+    """
+    ``(record list, derived value, cache status)`` of ``resource`` for code that reads
+    the records in-process, re-fetched under the same rules as the list endpoints.
+    ``derive(record list)`` runs once per fetch, e.g. to fingerprint the records; the
+    list is shared between callers and must not be modified.
+    """
+    source = resolve_source(source)
+
+    def fetch(previous):
+        record_list, entry = _load(resource, records, source, page_size)
+        return dict(entry, records=record_list, derived=derive(record_list) if derive else None)
+
+    entry, cache_status = _current(_records, (current_shop(), resource, source), resource, source, fetch)
+    return entry['records'], entry['derived'], cache_status
+
+
+def collection_response(request, resource, records, page_size=None):
+    """
+    The ``{resource: [...]}`` list for ``request``, or 304 Not Modified when the client's
+    If-None-Match / If-Modified-Since still matches. ``records`` is the catalog function
+    (source, page_size, stats) producing the records.
+    """
+    source = resolve_source(request.query_params.get('source'))
+    entry, cache_status = _current(_entries, (current_shop(), resource, source), resource, source,
+                                   lambda previous: _fetch(resource, records, source, page_size, previous))
+
+    response = HttpResponse(entry['body'], content_type='application/json')
+    response['ETag'] = entry['etag']
+    response['Last-Modified'] = http_date(entry['last_modified'])
+    # Clients may keep the body but have to revalidate it on every use
+    response['Cache-Control'] = 'private, no-cache'
+    response['X-List-Cache'] = cache_status
+    patch_vary_headers(response, ['X-Shop-Domain'])  # The store can come from this header, see ShopMiddleware
+    return get_conditional_response(request, etag=entry['etag'], last_modified=entry['last_modified'], response=response)
@@ -0,0 +1,475 @@
+import base64
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+# Local stand-in for the Shopify Admin REST API, serving generated fixtures with
+# page_info cursor pagination, plus the GraphQL queries the app sends (catalog reads
+# with cost limiting, bulk operations). Used for development and benchmarks via SHOPIFY_BASE_URL.
+
+API_PREFIX = '/admin/api/2023-04'
+MAX_QUERY_COST = 1000
+
+
+def generate_fixtures(products=100, orders=100, customers=50, seed=0):
+    rng = random.Random(seed)
+    adjectives = ['Classic', 'Organic', 'Wireless', 'Vintage', 'Premium', 'Compact', 'Leather', 'Cotton']
+    nouns = ['Shirt', 'Headphones', 'Backpack', 'Mug', 'Sneakers', 'Lamp', 'Notebook', 'Watch']
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    product_rows = []
+    for i in range(1, products + 1):
+        updated_at = (start + timedelta(minutes=i)).isoformat()
+        title = f"{rng.choice(adjectives)} {rng.choice(nouns)} {i}"
+        product_rows.append({
+            'id': i,
+            'title': title,
+            'product_type': rng.choice(nouns),
+            'updated_at': updated_at,
+            'variants': [
+                {
+                    'id': i * 10 + v,
+                    'product_id': i,
+                    'title': f"Variant {v + 1}",
+                    'sku': f"SKU-{i}-{v}",
+                    'price': f"{rng.uniform(1, 500):.2f}",
+                    'inventory_quantity': rng.randint(0, 200),
+                    'updated_at': updated_at
+                }
+                for v in range(rng.randint(1, 3))
+            ]
+        })
+        # The rest of a REST product payload, which the app never reads (not drawn from rng,
+        # so the fields above stay the same for a given seed)
+        product_rows[-1].update(_rest_only_fields(product_rows[-1]))
+
+    customer_rows = [
+        {
+            'id': i,
+            'email': f"customer{i}@example.com",
+            'first_name': f"First{i}",
+            'last_name': f"Last{i}",
+            'orders_count': 0,
+            'updated_at': (start + timedelta(minutes=i)).isoformat()
+        }
+        for i in range(1, customers + 1)
+    ]
+
+    order_rows = []
+    for i in range(1, orders + 1):
+        customer = rng.choice(customer_rows) if customer_rows else None
+        line_items = []
+        for n in range(rng.randint(1, 3)):
+            product = rng.choice(product_rows) if product_rows else None
+            variant = rng.choice(product['variants']) if product else {}
+            line_items.append({
+                'id': i * 10 + n,
+                'product_id': product['id'] if product else None,
+                'variant_id': variant.get('id'),
+                'title': product['title'] if product else 'Custom item',
+                'quantity': rng.randint(1, 4),
+                'price': variant.get('price', '10.00')
+            })
+        if customer:
+            customer['orders_count'] += 1
+        created_at = (start + timedelta(hours=i)).isoformat()
+        order_rows.append({
+            'id': i,
+            'email': customer['email'] if customer else None,
+            'customer': {'id': customer['id']} if customer else None,
+            'total_price': f"{sum(float(item['price']) * item['quantity'] for item in line_items):.2f}",
+            'created_at': created_at,
+            'updated_at': created_at,
+            'line_items': line_items
+        })
+
+    return {'products': product_rows, 'orders': order_rows, 'customers': customer_rows}
+
+
+def _rest_only_fields(product):
+    handle = product['title'].lower().replace(' ', '-')
+    for position, variant in enumerate(product['variants'], start=1):
+        variant.update({
+            'position': position, 'compare_at_price': None, 'barcode': f"0{variant['id']:012d}", 'grams': 500,
+            'weight': 0.5, 'weight_unit': 'kg', 'option1': variant['title'], 'option2': None, 'option3': None,
+            'inventory_item_id': variant['id'] * 7, 'inventory_management': 'shopify', 'inventory_policy': 'deny',
+            'fulfillment_service': 'manual', 'requires_shipping': True, 'taxable': True, 'created_at': product['updated_at'],
+            'admin_graphql_api_id': _gid('ProductVariant', variant['id'])
+        })
+    return {
+        'handle': handle,
+        'body_html': f"<p>The {product['title']} is part of our {product['product_type'].lower()} range. "
+                     f"Carefully made from quality materials and built to last, it ships within two business days.</p>",
+        'vendor': 'Example Store', 'status': 'active', 'tags': f"{product['product_type'].lower()}, new",
+        'created_at': product['updated_at'], 'published_at': product['updated_at'], 'published_scope': 'web',
+        'template_suffix': None, 'admin_graphql_api_id': _gid('Product', product['id']),
+        'options': [{'id': product['id'] * 3, 'product_id': product['id'], 'name': 'Title', 'position': 1,
+                     'values': [variant['title'] for variant in product['variants']]}],
+        'images': [{'id': product['id'] * 5, 'product_id': product['id'], 'position': 1, 'alt': product['title'],
+                    'width': 1024, 'height': 1024, 'src': f"https://cdn.example.com/products/{handle}.jpg",
+                    'variant_ids': [], 'created_at': product['updated_at'], 'updated_at': product['updated_at']}],
+    }
+
+
+def _gid(kind, legacy_id):
+    return f"gid://shopify/{kind}/{legacy_id}" if legacy_id is not None else None
+
+
+def _money(amount):
+    return {'shopMoney': {'amount': amount}}
+
+
+def bulk_lines(resource, rows):
+    """REST-shaped fixture rows as the JSONL lines of a bulk operation result, children after their parent."""
+    for row in rows:
+        if resource == 'products':
+            parent = _gid('Product', row['id'])
+            yield json.dumps({'id': parent, 'title': row['title'], 'productType': row.get('product_type'), 'updatedAt': row.get('updated_at')})
+            for position, variant in enumerate(row.get('variants', []), start=1):
+                yield json.dumps({
+                    'id': _gid('ProductVariant', variant['id']), 'title': variant.get('title'), 'sku': variant.get('sku'),
+                    'price': variant.get('price'), 'inventoryQuantity': variant.get('inventory_quantity'),
+                    'position': position, 'updatedAt': variant.get('updated_at'), '__parentId': parent
+                })
+        elif resource == 'orders':
+            parent = _gid('Order', row['id'])
+            customer = row.get('customer')
+            yield json.dumps({
+                'id': parent, 'email': row.get('email'), 'createdAt': row.get('created_at'), 'updatedAt': row.get('updated_at'),
+                'totalPriceSet': _money(row.get('total_price')), 'customer': {'id': _gid('Customer', customer['id'])} if customer else None
+            })
+            for item in row.get('line_items', []):
+                yield json.dumps({
+                    'id': _gid('LineItem', item['id']), 'title': item.get('title'), 'quantity': item.get('quantity'),
+                    'variant': {'id': _gid('ProductVariant', item['variant_id'])} if item.get('variant_id') else None,
+                    'product': {'id': _gid('Product', item['product_id'])} if item.get('product_id') else None,
+                    'originalUnitPriceSet': _money(item.get('price')), '__parentId': parent
+                })
+        else:
+            yield json.dumps({
+                'id': _gid('Customer', row['id']), 'email': row.get('email'), 'firstName': row.get('first_name'),
+                'lastName': row.get('last_name'), 'ordersCount': str(row.get('orders_count', 0)), 'updatedAt': row.get('updated_at')
+            })
+
+
+def write_bulk_jsonl(path, resource, rows):
+    # Streams ``rows`` (any iterable, e.g. a generator of millions of products) to ``path``
+    lines = 0
+    with open(path, 'w') as fh:
+        for line in bulk_lines(resource, rows):
+            fh.write(line + '\n')
+            lines += 1
+    return lines
+
+
+def _encode_cursor(cursor):
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+
+
+def _decode_cursor(page_info):
+    return json.loads(base64.urlsafe_b64decode(page_info.encode()))
+
+
+class FakeShopifyHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def take_call(self):
+        # Enforce a leaky bucket like Shopify: reject with 429 once it is full
+        server = self.server
+        if server.bucket_size is None:
+            return {}
+        with server.bucket_lock:
+            now = time.monotonic()
+            server.bucket_fill = max(0.0, server.bucket_fill - (now - server.bucket_updated) * server.leak_rate)
+            server.bucket_updated = now
+            if server.bucket_fill + 1 > server.bucket_size:
+                server.rejected += 1
+                self.send_json({'errors': 'Exceeded 2 calls per second for api client. Reduce request rates to resume uninterrupted service.'},
+                               status=429, headers={'Retry-After': '1.0'})
+                return None
+            server.bucket_fill += 1
+            return {'X-Shopify-Shop-Api-Call-Limit': f"{int(round(server.bucket_fill))}/{server.bucket_size}"}
+
+    def take_failure(self):
+        # Answer with the next queued failure instead of serving the call, see FakeShopifyServer.failures
+        server = self.server
+        with server.bucket_lock:
+            if not server.failures:
+                return False
+            status, headers = server.failures.pop(0)
+        self.send_json({'errors': 'Injected failure'}, status=status, headers=headers)
+        return True
+
+    def do_POST(self):
+        if self.take_failure():
+            return
+        parsed = urlparse(self.path)
+        if parsed.path != f"{API_PREFIX}/graphql.json":
+            self.send_json({'errors': 'Not Found'}, status=404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        query, variables = body.get('query', ''), body.get('variables') or {}
+        if 'bulkOperationRunQuery' in query:
+            self.send_json({'data': {'bulkOperationRunQuery': self.server.run_bulk_operation(variables.get('query', ''))}})
+        elif 'currentBulkOperation' in query:
+            self.send_json({'data': {'currentBulkOperation': self.server.current_bulk_operation(self.headers['Host'])}})
+        elif 'query CatalogProducts' in query:
+            self.send_costed(*self.server.products_page(variables))
+        elif 'query ProductVariants' in query:
+            self.send_costed(*self.server.product_variants(variables))
+        else:
+            self.send_json({'errors': [{'message': 'Query not supported by the fake server'}]})
+
+    def send_costed(self, requested, resolve):
+        # Cost limited like Shopify's GraphQL API: the requested cost must be available up front,
+        # the difference to the actual cost of what was returned is refunded afterwards
+        server = self.server
+        if requested > MAX_QUERY_COST:
+            self.send_json({'errors': [{'message': f"Query cost is {requested}, which exceeds the single query max cost limit ({MAX_QUERY_COST}).",
+                                        'extensions': {'code': 'MAX_COST_EXCEEDED'}}]})
+            return
+        if not server.take_cost(requested):
+            self.send_json({'errors': [{'message': 'Throttled', 'extensions': {'code': 'THROTTLED'}}],
+                            'extensions': {'cost': server.query_cost(requested, None)}})
+            return
+        data, actual = resolve()
+        server.refund_cost(requested - actual)
+        self.send_json({'data': data, 'extensions': {'cost': server.query_cost(requested, actual)}})
+
+    def send_bulk_file(self, path):
+        with open(path, 'rb') as fh:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/jsonl')
+            self.send_header('Content-Length', str(os.fstat(fh.fileno()).st_size))
+            self.end_headers()
+            while chunk := fh.read(1 << 16):
+                self.wfile.write(chunk)
+
+    def do_GET(self):
+        if self.path.startswith('/bulk/'):
+            path = self.server.bulk_results.get(self.path.rsplit('/', 1)[-1])
+            if path is None:
+                self.send_json({'errors': 'Not Found'}, status=404)
+            else:
+                self.send_bulk_file(path)
+            return
+        if self.take_failure():
+            return
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        bucket_headers = self.take_call()
+        if bucket_headers is None:
+            return
+        parsed = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        resource = parsed.path.rsplit('/', 1)[-1].removesuffix('.json')
+        counting = resource == 'count'
+        if counting:
+            resource = parsed.path.rsplit('/', 2)[-2]
+        rows = self.server.fixtures.get(resource)
+        if rows is None or not parsed.path.startswith(API_PREFIX):
+            self.send_json({'errors': 'Not Found'}, status=404)
+            return
+        if counting:
+            self.send_json({'count': len(rows)}, headers=bucket_headers)
+            return
+
+        limit = min(int(params.get('limit', 50)), 250)
+        # Like Shopify's opaque page_info, the cursor remembers the filters of the first request
+        if 'page_info' in params:
+            cursor = _decode_cursor(params['page_info'])
+        else:
+            cursor = {'offset': 0, 'updated_at_min': params.get('updated_at_min'), 'fields': params.get('fields')}
+        if cursor['updated_at_min']:
+            rows = sorted((row for row in rows if row['updated_at'] >= cursor['updated_at_min']), key=lambda row: (row['updated_at'], row['id']))
+
+        offset = cursor['offset']
+        page = rows[offset:offset + limit]
+        if cursor.get('fields'):
+            fields = cursor['fields'].split(',')
+            page = [{field: row[field] for field in fields if field in row} for row in page]
+        headers = dict(bucket_headers)
+        if offset + limit < len(rows):
+            next_cursor = _encode_cursor(dict(cursor, offset=offset + limit))
+            next_url = f"http://{self.headers['Host']}{parsed.path}?{urlencode({'limit': limit, 'page_info': next_cursor})}"
+            headers['Link'] = f'<{next_url}>; rel="next"'
+        self.send_json({resource: page}, headers=headers)
+
+
+class FakeShopifyServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), fixtures=None, bucket_size=None, leak_rate=2.0):
+        super().__init__(address, FakeShopifyHandler)
+        self.fixtures = fixtures if fixtures is not None else generate_fixtures()
+        # bucket_size=None disables call limiting
+        self.bucket_size = bucket_size
+        self.leak_rate = leak_rate
+        self.bucket_fill = 0.0
+        self.bucket_updated = time.monotonic()
+        self.bucket_lock = threading.Lock()
+        self.rejected = 0
+        # (status, headers) responses returned, in order, to the next API calls, e.g. [(503, {})]
+        self.failures = []
+        self.latency = 0.0  # Seconds added to every REST call
+        # GraphQL cost bucket (Shopify's standard plan numbers), restore_rate=None disables it
+        self.graphql_max_available = 1000.0
+        self.graphql_restore_rate = 100.0
+        self.graphql_available = self.graphql_max_available
+        self.graphql_updated = time.monotonic()
+        self.graphql_throttled = 0
+        # Bulk operations: resource -> pre-generated JSONL file to serve instead of the fixtures
+        self.bulk_files = {}
+        self.bulk_delay = 0.5
+        self.bulk_operation = None
+        self.bulk_results = {}
+        self.bulk_lock = threading.Lock()
+        self._bulk_dir = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def take_cost(self, requested):
+        if self.graphql_restore_rate is None:
+            return True
+        with self.bucket_lock:
+            now = time.monotonic()
+            self.graphql_available = min(self.graphql_max_available,
+                                         self.graphql_available + (now - self.graphql_updated) * self.graphql_restore_rate)
+            self.graphql_updated = now
+            if requested > self.graphql_available:
+                self.graphql_throttled += 1
+                return False
+            self.graphql_available -= requested
+            return True
+
+    def refund_cost(self, amount):
+        if self.graphql_restore_rate is None:
+            return
+        with self.bucket_lock:
+            self.graphql_available = min(self.graphql_max_available, self.graphql_available + amount)
+
+    def query_cost(self, requested, actual):
+        return {
+            'requestedQueryCost': requested,
+            'actualQueryCost': actual,
+            'throttleStatus': {
+                'maximumAvailable': self.graphql_max_available,
+                'currentlyAvailable': int(self.graphql_available) if self.graphql_restore_rate is not None else self.graphql_max_available,
+                'restoreRate': self.graphql_restore_rate or self.graphql_max_available
+            }
+        }
+
+    @staticmethod
+    def _variants_connection(variants, offset, first):
+        page = variants[offset:offset + first]
+        return {
+            'pageInfo': {'hasNextPage': offset + first < len(variants), 'endCursor': _encode_cursor({'offset': offset + len(page)})},
+            'edges': [{'node': {'id': _gid('ProductVariant', variant['id']), 'price': variant.get('price'),
+                                'inventoryQuantity': variant.get('inventory_quantity')}} for variant in page]
+        }
+
+    def products_page(self, variables):
+        # Costs as Shopify computes them: a connection is 2 plus 'first' times its nodes, an object is 1
+        first, variants = int(variables['first']), int(variables['variants'])
+        offset = _decode_cursor(variables['after'])['offset'] if variables.get('after') else 0
+        requested = 2 + first * (3 + variants)
+
+        def resolve():
+            rows = self.fixtures.get('products', [])
+            page = rows[offset:offset + first]
+            edges = [
+                {'node': {'id': _gid('Product', row['id']), 'title': row['title'], 'productType': row.get('product_type'),
+                          'updatedAt': row.get('updated_at'), 'variants': self._variants_connection(row.get('variants', []), 0, variants)}}
+                for row in page
+            ]
+            actual = 2 + sum(3 + len(edge['node']['variants']['edges']) for edge in edges)
+            return {'products': {
+                'pageInfo': {'hasNextPage': offset + first < len(rows), 'endCursor': _encode_cursor({'offset': offset + len(page)})},
+                'edges': edges
+            }}, actual
+
+        return requested, resolve
+
+    def product_variants(self, variables):
+        first = int(variables['first'])
+        offset = _decode_cursor(variables['after'])['offset'] if variables.get('after') else 0
+        product_id = int(variables['id'].rsplit('/', 1)[-1])
+
+        def resolve():
+            row = next((row for row in self.fixtures.get('products', []) if row['id'] == product_id), None)
+            if row is None:
+                return {'product': None}, 1
+            connection = self._variants_connection(row.get('variants', []), offset, first)
+            return {'product': {'variants': connection}}, 3 + len(connection['edges'])
+
+        return 3 + first, resolve
+
+    def run_bulk_operation(self, query):
+        match = re.search(r'{\s*(\w+)', query)
+        resource = match.group(1) if match else None
+        with self.bulk_lock:
+            if resource not in self.fixtures:
+                return {'bulkOperation': None, 'userErrors': [{'field': ['query'], 'message': f"Unsupported bulk query root: {resource}"}]}
+            if self.bulk_operation and self.bulk_operation['status'] == 'RUNNING':
+                return {'bulkOperation': None, 'userErrors': [{'field': None, 'message': 'A bulk query operation for this app and shop is already in progress'}]}
+            operation_id = _gid('BulkOperation', len(self.bulk_results) + 1)
+            self.bulk_operation = {'id': operation_id, 'status': 'RUNNING', 'resource': resource,
+                                   'ready_at': time.monotonic() + self.bulk_delay}
+            return {'bulkOperation': {'id': operation_id, 'status': 'CREATED'}, 'userErrors': []}
+
+    def current_bulk_operation(self, host):
+        with self.bulk_lock:
+            operation = self.bulk_operation
+            if operation is None:
+                return None
+            if operation['status'] == 'RUNNING' and time.monotonic() >= operation['ready_at']:
+                name = f"{operation['id'].rsplit('/', 1)[-1]}.jsonl"
+                path = self.bulk_files.get(operation['resource'])
+                if path is None:
+                    if self._bulk_dir is None:
+                        self._bulk_dir = tempfile.mkdtemp(prefix='fake-shopify-bulk-')
+                    path = os.path.join(self._bulk_dir, name)
+                    write_bulk_jsonl(path, operation['resource'], self.fixtures[operation['resource']])
+                with open(path, 'rb') as fh:
+                    operation['object_count'] = sum(1 for _ in fh)
+                self.bulk_results[name] = path
+                operation.update(status='COMPLETED', url=f"http://{host}/bulk/{name}")
+            return {
+                'id': operation['id'], 'status': operation['status'], 'errorCode': None,
+                'objectCount': str(operation.get('object_count', 0)), 'url': operation.get('url'), 'partialDataUrl': None
+            }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-shopify', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._bulk_dir is not None:
+            shutil.rmtree(self._bulk_dir, ignore_errors=True)
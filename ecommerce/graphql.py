@@ -0,0 +1,206 @@
+import threading
+import time
+import weakref
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+
+from ai_shopify_dashboard.timing import record
+from .bulk import legacy_id
+from .pagination import product_record
+from .shopify_client import get_client
+
+# Catalog reads through the GraphQL Admin API. The query projects exactly what the
+# dashboard and get_insights use (id, title, product type, price and stock of every
+# variant) instead of the full REST product with descriptions, images and options,
+# and pages are sized and paced from the query cost Shopify reports back.
+
+PRODUCTS_QUERY = """
+query CatalogProducts($first: Int!, $after: String, $variants: Int!) {
+  products(first: $first, after: $after, sortKey: ID) {
+    pageInfo { hasNextPage endCursor }
+    edges {
+      node {
+        id
+        title
+        productType
+        updatedAt
+        variants(first: $variants) {
+          pageInfo { hasNextPage endCursor }
+          edges { node { id price inventoryQuantity } }
+        }
+      }
+    }
+  }
+}"""
+
+# Rest of the variants of a product with more than fit in the products page
+VARIANTS_QUERY = """
+query ProductVariants($id: ID!, $first: Int!, $after: String) {
+  product(id: $id) {
+    variants(first: $first, after: $after) {
+      pageInfo { hasNextPage endCursor }
+      edges { node { id price inventoryQuantity } }
+    }
+  }
+}"""
+
+MAX_PAGE_SIZE = 250
+MAX_QUERY_COST = 1000  # Shopify rejects any single query whose requested cost is higher
+
+
+class GraphQLError(Exception):
+    pass
+
+
+def products_query_cost(first, variants):
+    # Shopify's static estimate: a connection costs 2 plus ``first`` times what each node costs,
+    # an object costs 1. Node = product (1) + variants connection (2 + variants)
+    return 2 + first * (3 + variants)
+
+
+def variants_query_cost(first):
+    return 1 + 2 + first
+
+
+class CostBudget:
+    """
+    Client-side estimate of the GraphQL cost bucket, refreshed from the
+    ``throttleStatus`` of every response. ``acquire`` waits until the requested
+    cost of the next query is available, so queries are not rejected as THROTTLED.
+    """
+
+    def __init__(self, maximum=1000.0, restore_rate=100.0):
+        self.maximum = maximum
+        self.restore_rate = restore_rate
+        self.available = maximum
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _level(self, now):
+        return min(self.maximum, self.available + (now - self.updated) * self.restore_rate)
+
+    def acquire(self, cost):
+        with self._lock:
+            now = time.monotonic()
+            level = self._level(now)
+            wait = max(0.0, (min(cost, self.maximum) - level) / self.restore_rate)
+            # Reserve the cost for concurrent callers, the next response corrects the estimate
+            self.available = level + wait * self.restore_rate - cost
+            self.updated = now + wait
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def update(self, cost):
+        status = (cost or {}).get('throttleStatus')
+        if not status:
+            return
+        with self._lock:
+            self.maximum = float(status['maximumAvailable'])
+            self.restore_rate = float(status['restoreRate']) or self.restore_rate
+            self.available = float(status['currentlyAvailable'])
+            self.updated = time.monotonic()
+
+
+_budgets = weakref.WeakKeyDictionary()
+_budgets_lock = threading.Lock()
+
+
+def budget_for(client):
+    # Shopify's cost bucket is per store, so every reader of a store shares its estimate
+    with _budgets_lock:
+        budget = _budgets.get(client)
+        if budget is None:
+            budget = _budgets[client] = CostBudget()
+        return budget
+
+
+class GraphQLClient:
+
+    def __init__(self, client=None, budget=None, max_retries=5):
+        self.client = client or get_client()
+        self.budget = budget or budget_for(self.client)
+        self.max_retries = max_retries
+        self.last_cost = None
+
+    def execute(self, query, variables=None, cost=0):
+        for attempt in range(self.max_retries + 1):
+            throttle_wait = self.budget.acquire(cost)
+            if throttle_wait:
+                record('shopify_throttle', throttle_wait)
+            # Read queries only, retrying them on a 5xx is safe
+            response = self.client.post('graphql.json', paced=False, idempotent=True, json={'query': query, 'variables': variables or {}})
+            response.raise_for_status()
+            payload = response.json()
+            self.last_cost = (payload.get('extensions') or {}).get('cost')
+            self.budget.update(self.last_cost)
+            errors = payload.get('errors')
+            if not errors:
+                return payload['data']
+            throttled = any((error.get('extensions') or {}).get('code') == 'THROTTLED' for error in errors)
+            if not throttled or attempt >= self.max_retries:
+                raise GraphQLError(f"GraphQL errors: {errors}")
+        raise GraphQLError("GraphQL query kept being throttled")
+
+
+def _variants(connection):
+    return [
+        {'id': legacy_id(edge['node']['id']), 'price': edge['node']['price'], 'inventory_quantity': edge['node']['inventoryQuantity']}
+        for edge in connection['edges']
+    ]
+
+
+def iter_products(client=None, page_size=None, variants_per_product=None, stats=None):
+    """
+    Yield every product as a compact record (the shape of pagination.product_record),
+    stock summed over all of its variants; ``stats`` gets the newest ``updated_at``. The page size is the largest whose requested
+    cost stays under both the per query limit and the bucket size; products with more
+    variants than the page asks for get the rest in follow-up queries.
+    """
+    # Bound to the current store right away, iteration may happen after the request is done
+    api = client if isinstance(client, GraphQLClient) else GraphQLClient(client)
+    return _products(api, page_size, variants_per_product or settings.SHOPIFY_GRAPHQL_VARIANTS_PER_PRODUCT,
+                     stats if stats is not None else {})
+
+
+def _products(api, page_size, variants, stats):
+    stats.setdefault('queries', 0)
+    stats.setdefault('requested_cost', 0)
+    stats.setdefault('actual_cost', 0)
+
+    def execute(query, variables, cost):
+        data = api.execute(query, variables, cost)
+        stats['queries'] += 1
+        stats['requested_cost'] += (api.last_cost or {}).get('requestedQueryCost', cost)
+        stats['actual_cost'] += (api.last_cost or {}).get('actualQueryCost', cost)
+        return data
+
+    after = None
+    while True:
+        limit = min(MAX_QUERY_COST, api.budget.maximum)
+        first = min(page_size or settings.SHOPIFY_PAGE_SIZE, MAX_PAGE_SIZE)
+        first = max(1, min(first, int((limit - 2) // (3 + variants))))
+        products = execute(PRODUCTS_QUERY, {'first': first, 'after': after, 'variants': variants},
+                           products_query_cost(first, variants))['products']
+        for edge in products['edges']:
+            node = edge['node']
+            connection = node['variants']
+            product_variants = _variants(connection)
+            while connection['pageInfo']['hasNextPage']:
+                more = min(MAX_PAGE_SIZE, int(limit) - 3)
+                connection = execute(VARIANTS_QUERY, {'id': node['id'], 'first': more, 'after': connection['pageInfo']['endCursor']},
+                                     variants_query_cost(more))['product']['variants']
+                product_variants.extend(_variants(connection))
+            updated_at = parse_datetime(node.get('updatedAt') or '')
+            if updated_at and (stats.get('updated_at') is None or updated_at > stats['updated_at']):
+                stats['updated_at'] = updated_at
+            yield product_record({
+                'id': legacy_id(node['id']),
+                'title': node['title'],
+                'product_type': node['productType'],
+                'variants': product_variants
+            })
+        if not products['pageInfo']['hasNextPage']:
+            return
+        after = products['pageInfo']['endCursor']
@@ -0,0 +1,84 @@
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from ecommerce.bulk import BulkOperation, iter_bulk_records
+from ecommerce.fake_shopify import FakeShopifyServer, write_bulk_jsonl
+from ecommerce.shopify_client import ShopifyClient
+
+
+def synthetic_products(count, seed=0):
+    # Generated lazily so even multi-million product files never sit in memory
+    rng = random.Random(seed)
+    adjectives = ['Classic', 'Organic', 'Wireless', 'Vintage', 'Premium', 'Compact', 'Leather', 'Cotton']
+    nouns = ['Shirt', 'Headphones', 'Backpack', 'Mug', 'Sneakers', 'Lamp', 'Notebook', 'Watch']
+    for i in range(1, count + 1):
+        yield {
+            'id': i,
+            'title': f"{rng.choice(adjectives)} {rng.choice(nouns)} {i}",
+            'product_type': rng.choice(nouns),
+            'updated_at': '2024-01-01T00:00:00+00:00',
+            'variants': [
+                {'id': i * 10 + v, 'title': f"Variant {v + 1}", 'sku': f"SKU-{i}-{v}", 'price': f"{rng.uniform(1, 500):.2f}",
+                 'inventory_quantity': rng.randint(0, 200), 'updated_at': '2024-01-01T00:00:00+00:00'}
+                for v in range(rng.randint(1, 3))
+            ]
+        }
+
+
+def consume(records):
+    products = variants = 0
+    for record in records:
+        products += 1
+        variants += len(record['variants'])
+    return products, variants
+
+
+class Command(BaseCommand):
+    help = ("Parse throughput and peak memory of the bulk JSONL reader on generated product files, "
+            "read from disk and downloaded from the fake Shopify bulk endpoint.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,300000', help="Comma separated product counts.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        server = FakeShopifyServer(fixtures={'products': []}).start()
+        server.bulk_delay = 0
+        client = ShopifyClient(server.base_url, leak_rate=1000)
+        self.stdout.write(f"{'products':>10} {'variants':>10} {'file MB':>9} {'source':>9} {'seconds':>9} {'records/s':>11} {'MB/s':>8} {'peak MB':>9}")
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                for size in sizes:
+                    path = os.path.join(directory, f"products-{size}.jsonl")
+                    write_bulk_jsonl(path, 'products', synthetic_products(size, options['seed']))
+                    megabytes = os.path.getsize(path) / 2 ** 20
+                    server.bulk_files['products'] = path
+
+                    def from_file():
+                        with open(path, 'rb') as fh:
+                            return consume(iter_bulk_records(fh, 'products'))
+
+                    def from_server():
+                        return consume(BulkOperation(client, poll_interval=0.05).records('products'))
+
+                    for source, run in (('file', from_file), ('download', from_server)):
+                        start = time.perf_counter()
+                        products, variants = run()
+                        seconds = time.perf_counter() - start
+                        # Peak traced allocations, in a second pass since tracing slows parsing down a lot.
+                        # Flat across sizes when nothing but the current record is kept.
+                        tracemalloc.start()
+                        run()
+                        _, peak = tracemalloc.get_traced_memory()
+                        tracemalloc.stop()
+                        self.stdout.write(f"{products:>10} {variants:>10} {megabytes:9.1f} {source:>9} {seconds:9.2f} "
+                                          f"{products / seconds:11.0f} {megabytes / seconds:8.1f} {peak / 2 ** 20:9.2f}")
+                    os.remove(path)
+        finally:
+            server.stop()
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ecommerce.fake_shopify import FakeShopifyServer, generate_fixtures
+from ecommerce.graphql import GraphQLClient, CostBudget, iter_products
+from ecommerce.pagination import iter_records, product_record
+from ecommerce.shopify_client import ShopifyClient
+
+
+class Command(BaseCommand):
+    help = ("Fetch the product catalog from the fake Shopify server through REST and through the projected "
+            "GraphQL query, and compare bytes received, requests, time and the resulting records.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000', help="Comma separated product counts.")
+        parser.add_argument('--variants-per-product', type=int, default=None,
+                            help="Variants fetched with each product by GraphQL (default SHOPIFY_GRAPHQL_VARIANTS_PER_PRODUCT).")
+        parser.add_argument('--restore-rate', type=float, default=100.0,
+                            help="GraphQL cost points restored per second by the fake server (Shopify standard: 100).")
+        parser.add_argument('--leak-rate', type=float, default=2.0, help="REST calls per second (Shopify standard: 2).")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        self.stdout.write(f"{'products':>9} {'api':>8} {'requests':>9} {'KB':>9} {'B/product':>10} {'seconds':>8} {'cost':>7} {'records':>8}")
+        for size in sizes:
+            fixtures = generate_fixtures(products=size, orders=0, customers=0, seed=options['seed'])
+            server = FakeShopifyServer(fixtures=fixtures).start()
+            server.graphql_restore_rate = options['restore_rate']
+            try:
+                rest_client = ShopifyClient(server.base_url, leak_rate=options['leak_rate'])
+                start = time.perf_counter()
+                rest = [product_record(product) for product in iter_records('products', client=rest_client)]
+                self.report(size, 'rest', rest_client, time.perf_counter() - start, '-', rest)
+
+                graphql_client = ShopifyClient(server.base_url)
+                budget = CostBudget(server.graphql_max_available, options['restore_rate'])
+                stats = {}
+                start = time.perf_counter()
+                graphql = list(iter_products(GraphQLClient(graphql_client, budget), variants_per_product=options['variants_per_product'], stats=stats))
+                self.report(size, 'graphql', graphql_client, time.perf_counter() - start, stats['actual_cost'], graphql)
+            finally:
+                server.stop()
+
+            # Same records either way, stock summed over every variant
+            if graphql != rest:
+                self.stderr.write(f"  records differ between REST and GraphQL for {size} products")
+            multi = sum(1 for record in graphql if len(record['variants']) > 1)
+            self.stdout.write(f"  records identical: {graphql == rest}, multi-variant products: {multi}, "
+                              f"throttled GraphQL queries: {server.graphql_throttled}")
+
+    def report(self, size, api, client, seconds, cost, records):
+        metrics = client.metrics()
+        kilobytes = metrics['bytes_received'] / 1024
+        self.stdout.write(f"{size:>9} {api:>8} {metrics['requests']:>9} {kilobytes:9.0f} {metrics['bytes_received'] / max(len(records), 1):10.0f} "
+                          f"{seconds:8.2f} {cost:>7} {len(records):>8}")
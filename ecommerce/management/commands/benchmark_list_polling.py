@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from ecommerce import conditional, shopify_client
+from ecommerce.fake_shopify import FakeShopifyServer, generate_fixtures
+from ecommerce.shopify_client import get_client
+
+RESOURCES = ('products', 'orders', 'customers')
+
+
+class Command(BaseCommand):
+    help = ("Poll the list endpoints like the dashboard does, against the fake Shopify server, and report upstream "
+            "requests, upstream bytes, response bytes and latency per poll with and without conditional GET.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--polls', type=int, default=20, help="Polls per resource after the first request.")
+        parser.add_argument('--interval', type=float, default=0.05, help="Seconds between polls.")
+        parser.add_argument('--revalidate', type=float, default=0.5, help="LIST_REVALIDATE_SECONDS for the conditional run.")
+        parser.add_argument('--source', default='shopify')
+
+    def handle(self, *args, **options):
+        fixtures = generate_fixtures(products=options['products'], orders=options['products'] // 2, customers=options['products'] // 4)
+        server = FakeShopifyServer(fixtures=fixtures).start()
+        try:
+            runs = {
+                # Every poll re-fetches and re-serializes the list, and the client never sends its ETag
+                'unconditional': ({'LIST_REVALIDATE_SECONDS': 0, 'LIST_MAX_AGE_SECONDS': 0}, False),
+                'conditional': ({'LIST_REVALIDATE_SECONDS': options['revalidate']}, True),
+            }
+            self.stdout.write(f"{'resource':>10} {'mode':>14} {'upstream req/poll':>18} {'upstream KB/poll':>17} "
+                              f"{'response KB/poll':>17} {'304 %':>6} {'ms/poll':>8}")
+            for mode, (overrides, send_etag) in runs.items():
+                with override_settings(ALLOWED_HOSTS=['testserver'], SHOPIFY_BASE_URL=server.base_url, SHOPIFY_LEAK_RATE=1000, **overrides):
+                    shopify_client._clients.clear()
+                    conditional._entries.clear()
+                    for resource in RESOURCES:
+                        self.poll(resource, mode, send_etag, options)
+        finally:
+            server.stop()
+
+    def poll(self, resource, mode, send_etag, options):
+        client = Client()
+        path = f"/get_shopify_{resource}/"
+        etag = client.get(path, {'source': options['source']}).get('ETag')
+        before = get_client().metrics()
+        response_bytes = not_modified = 0
+        elapsed = 0.0
+        for _ in range(options['polls']):
+            time.sleep(options['interval'])
+            headers = {'HTTP_IF_NONE_MATCH': etag} if send_etag and etag else {}
+            start = time.perf_counter()
+            response = client.get(path, {'source': options['source']}, **headers)
+            elapsed += time.perf_counter() - start
+            response_bytes += len(response.content)
+            not_modified += response.status_code == 304
+            etag = response.get('ETag', etag)
+        after = get_client().metrics()
+        polls = options['polls']
+        self.stdout.write(f"{resource:>10} {mode:>14} {(after['requests'] - before['requests']) / polls:18.2f} "
+                          f"{(after['bytes_received'] - before['bytes_received']) / 1024 / polls:17.1f} "
+                          f"{response_bytes / 1024 / polls:17.1f} {not_modified / polls * 100:6.0f} {elapsed / polls * 1000:8.2f}")
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from ecommerce.analytics import SalesRollup, rebuild_all
+
+
+class Command(BaseCommand):
+    help = "Recompute the sales rollups from every mirrored order (sync_shopify keeps them up to date afterwards)."
+
+    def handle(self, *args, **options):
+        rebuild_all()
+        rollup = SalesRollup.from_database()
+        self.stdout.write(f"Rolled up {len(rollup.product_day)} product-days and {len(rollup.customer_day)} customer-days "
+                          f"({rollup.first_day} to {rollup.last_day})")
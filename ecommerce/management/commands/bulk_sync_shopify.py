@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ecommerce.bulk import BULK_QUERIES, BulkOperation, BulkOperationError, bulk_sync_resource, iter_bulk_records
+
+
+class Command(BaseCommand):
+    help = ("Full resync of the local mirror through GraphQL Bulk Operations instead of REST paging. "
+            "Rebuild the vector index from it afterwards with `run_index_worker --bootstrap --source mirror`.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--resource', action='append', choices=list(BULK_QUERIES), help="Resource to sync (repeatable, default all).")
+        parser.add_argument('--file', default=None, help="Load an already downloaded bulk JSONL file for a single --resource.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Records upserted per transaction.")
+        parser.add_argument('--poll-interval', type=float, default=2.0)
+        parser.add_argument('--timeout', type=float, default=3600, help="Seconds to wait for Shopify to finish each bulk query.")
+
+    def handle(self, *args, **options):
+        resources = options['resource'] or list(BULK_QUERIES)
+        if options['file']:
+            if len(resources) != 1:
+                raise CommandError("--file needs exactly one --resource")
+            stats = {}
+            with open(options['file'], 'rb') as fh:
+                result = bulk_sync_resource(resources[0], iter_bulk_records(fh, resources[0], stats), options['batch_size'])
+            self.report(resources[0], dict(stats, **result))
+            return
+
+        operation = BulkOperation(poll_interval=options['poll_interval'], timeout=options['timeout'])
+        for resource in resources:
+            try:
+                self.report(resource, bulk_sync_resource(resource, batch_size=options['batch_size'], operation=operation))
+            except BulkOperationError as e:
+                raise CommandError(str(e))
+
+    def report(self, resource, stats):
+        line = f"{resource}: {stats['synced']} synced, {stats['deleted']} deleted"
+        if stats.get('orphans'):
+            line += f", {stats['orphans']} child lines without their parent skipped"
+        self.stdout.write(line)
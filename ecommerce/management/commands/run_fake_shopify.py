@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from ecommerce.fake_shopify import FakeShopifyServer, generate_fixtures
+
+
+class Command(BaseCommand):
+    help = "Serve generated products, orders and customers through a local fake of the Shopify Admin REST API."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument('--customers', type=int, default=200)
+        parser.add_argument('--bucket-size', type=int, default=None, help="Enforce a leaky bucket of this size (429 when full).")
+        parser.add_argument('--leak-rate', type=float, default=2.0)
+
+    def handle(self, *args, **options):
+        fixtures = generate_fixtures(options['products'], options['orders'], options['customers'])
+        server = FakeShopifyServer(('127.0.0.1', options['port']), fixtures, bucket_size=options['bucket_size'], leak_rate=options['leak_rate'])
+        self.stdout.write(f"Fake Shopify listening, run the app with SHOPIFY_BASE_URL={server.base_url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from ecommerce.sync import RESOURCES, sync_all
+
+
+class Command(BaseCommand):
+    help = "Pull products, customers and orders changed since the last sync into the local mirror."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Ignore the stored watermarks and re-fetch everything.")
+        parser.add_argument('--resource', action='append', choices=RESOURCES, help="Only sync this resource (repeatable).")
+        parser.add_argument('--page-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        counts = sync_all(full=options['full'], resources=options['resource'] or RESOURCES, page_size=options['page_size'])
+        for resource, count in counts.items():
+            self.stdout.write(f"{resource}: {count} synced")
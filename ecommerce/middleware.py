@@ -0,0 +1,42 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import JsonResponse
+
+from .stores import UnknownShop, resolve_shop, use_shop
+
+
+def requested_shop(request):
+    return request.GET.get('shop') or request.headers.get('X-Shop-Domain')
+
+
+class ShopMiddleware:
+    """
+    Runs each request for the store it names (``?shop=`` or an ``X-Shop-Domain``
+    header, the default store otherwise). Shopify clients, catalog reads and the
+    get_insights index all follow the store of the current request, so one process
+    can serve several stores from many threads or coroutines at once.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        try:
+            shop = resolve_shop(requested_shop(request))
+        except UnknownShop as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        with use_shop(shop):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        try:
+            shop = resolve_shop(requested_shop(request))
+        except UnknownShop as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        with use_shop(shop):
+            return await self.get_response(request)
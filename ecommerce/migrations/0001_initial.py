@@ -0,0 +1,90 @@
+# Generated by Django 5.1.2 on 2026-10-18 00:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Customer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shopify_id', models.BigIntegerField(unique=True)),
+                ('email', models.CharField(blank=True, max_length=255, null=True)),
+                ('first_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('last_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('orders_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(db_index=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shopify_id', models.BigIntegerField(unique=True)),
+                ('email', models.CharField(blank=True, max_length=255, null=True)),
+                ('customer_shopify_id', models.BigIntegerField(db_index=True, null=True)),
+                ('total_price', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('created_at', models.DateTimeField(db_index=True, null=True)),
+                ('updated_at', models.DateTimeField(db_index=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shopify_id', models.BigIntegerField(unique=True)),
+                ('title', models.CharField(max_length=255)),
+                ('product_type', models.CharField(blank=True, default='', max_length=255)),
+                ('updated_at', models.DateTimeField(db_index=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(max_length=32, unique=True)),
+                ('watermark', models.DateTimeField(null=True)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LineItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shopify_id', models.BigIntegerField(unique=True)),
+                ('product_shopify_id', models.BigIntegerField(db_index=True, null=True)),
+                ('variant_shopify_id', models.BigIntegerField(null=True)),
+                ('title', models.CharField(blank=True, default='', max_length=255)),
+                ('quantity', models.IntegerField(default=0)),
+                ('price', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='line_items', to='ecommerce.order')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Variant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shopify_id', models.BigIntegerField(unique=True)),
+                ('position', models.IntegerField(default=1)),
+                ('title', models.CharField(blank=True, default='', max_length=255)),
+                ('sku', models.CharField(blank=True, default='', max_length=255)),
+                ('price', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('inventory_quantity', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='ecommerce.product')),
+            ],
+            options={
+                'ordering': ['position', 'id'],
+            },
+        ),
+    ]
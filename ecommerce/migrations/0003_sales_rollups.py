@@ -0,0 +1,41 @@
+# Generated by Django 5.1.2 on 2026-10-18 00:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecommerce', '0002_webhookevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(db_index=True)),
+                ('customer_shopify_id', models.BigIntegerField(null=True)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('orders', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('day', 'customer_shopify_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(db_index=True)),
+                ('product_shopify_id', models.BigIntegerField(null=True)),
+                ('title', models.CharField(blank=True, default='', max_length=255)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('units', models.IntegerField(default=0)),
+                ('orders', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('day', 'product_shopify_id')},
+            },
+        ),
+    ]
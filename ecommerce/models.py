@@ -1,3 +1,139 @@
 from django.db import models
 
-# Create your models here.
+from .pagination import product_record
+
+# Local mirror of the Shopify catalog, kept up to date by ecommerce/sync.py
+
+
+class Product(models.Model):
+    shopify_id = models.BigIntegerField(unique=True)
+    title = models.CharField(max_length=255)
+    product_type = models.CharField(max_length=255, blank=True, default='')
+    updated_at = models.DateTimeField(null=True, db_index=True)
+
+    def to_record(self):
+        # Same shape as the live API records, built by the same function
+        return product_record({
+            "id": self.shopify_id,
+            "title": self.title,
+            "product_type": self.product_type,
+            "variants": [
+                {"id": variant.shopify_id, "price": str(variant.price), "inventory_quantity": variant.inventory_quantity}
+                for variant in self.variants.all()
+            ]
+        })
+
+
+class Variant(models.Model):
+    shopify_id = models.BigIntegerField(unique=True)
+    product = models.ForeignKey(Product, related_name='variants', on_delete=models.CASCADE)
+    position = models.IntegerField(default=1)
+    title = models.CharField(max_length=255, blank=True, default='')
+    sku = models.CharField(max_length=255, blank=True, default='')
+    price = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    inventory_quantity = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['position', 'id']
+
+
+class Customer(models.Model):
+    shopify_id = models.BigIntegerField(unique=True)
+    email = models.CharField(max_length=255, null=True, blank=True)
+    first_name = models.CharField(max_length=255, null=True, blank=True)
+    last_name = models.CharField(max_length=255, null=True, blank=True)
+    orders_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(null=True, db_index=True)
+
+    def to_record(self):
+        return {
+            "id": self.shopify_id,
+            "email": self.email,
+            "first_name": self.first_name,
+            "last_name": self.last_name,
+            "orders_count": self.orders_count
+        }
+
+
+class Order(models.Model):
+    shopify_id = models.BigIntegerField(unique=True)
+    email = models.CharField(max_length=255, null=True, blank=True)
+    customer_shopify_id = models.BigIntegerField(null=True, db_index=True)
+    total_price = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    created_at = models.DateTimeField(null=True, db_index=True)
+    updated_at = models.DateTimeField(null=True, db_index=True)
+
+    def to_record(self):
+        return {
+            "id": self.shopify_id,
+            "total_price": str(self.total_price),
+            "customer_email": self.email,
+            "line_items": [
+                {
+                    "product_title": item.title,
+                    "quantity": item.quantity,
+                    "price": str(item.price)
+                }
+                for item in self.line_items.all()
+            ]
+        }
+
+
+class LineItem(models.Model):
+    shopify_id = models.BigIntegerField(unique=True)
+    order = models.ForeignKey(Order, related_name='line_items', on_delete=models.CASCADE)
+    product_shopify_id = models.BigIntegerField(null=True, db_index=True)
+    variant_shopify_id = models.BigIntegerField(null=True)
+    title = models.CharField(max_length=255, blank=True, default='')
+    quantity = models.IntegerField(default=0)
+    price = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['id']
+
+
+class SyncState(models.Model):
+    # Highest updated_at seen per resource, the next sync asks Shopify for updated_at_min=watermark
+    resource = models.CharField(max_length=32, unique=True)
+    watermark = models.DateTimeField(null=True)
+    synced_at = models.DateTimeField(auto_now=True)
+
+
+class WebhookEvent(models.Model):
+    # Durable queue of verified Shopify webhooks, drained by `manage.py run_index_worker`
+    webhook_id = models.CharField(max_length=64, unique=True, null=True, blank=True)  # X-Shopify-Webhook-Id, deliveries are retried
+    topic = models.CharField(max_length=64)
+    shop_domain = models.CharField(max_length=255, blank=True, default='')
+    shopify_id = models.BigIntegerField(db_index=True)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, db_index=True)
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+
+    class Meta:
+        ordering = ['id']
+
+
+class ProductDailySales(models.Model):
+    # Line items rolled up per product and order day, see ecommerce/analytics.py
+    day = models.DateField(db_index=True)
+    product_shopify_id = models.BigIntegerField(null=True)  # null for custom items without a product
+    title = models.CharField(max_length=255, blank=True, default='')
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    units = models.IntegerField(default=0)
+    orders = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = [('day', 'product_shopify_id')]
+
+
+class CustomerDailySales(models.Model):
+    # Order totals rolled up per customer and order day
+    day = models.DateField(db_index=True)
+    customer_shopify_id = models.BigIntegerField(null=True)  # null for guest checkouts
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    orders = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = [('day', 'customer_shopify_id')]
@@ -0,0 +1,86 @@
+import itertools
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+
+from .shopify_client import get_client
+
+
+def iter_pages(resource, page_size=None, client=None, **params):
+    """
+    Lazily walk a Shopify REST collection (``products``, ``orders``, ``customers``)
+    page by page, following the ``page_info`` cursor in the ``Link`` header.
+    """
+    # The store's client is picked now, in the caller's context: a streamed response
+    # only iterates once the view (and the request's store) is gone
+    return _pages(client or get_client(), resource, page_size, params)
+
+
+def _pages(client, resource, page_size, params):
+    url = f"{resource}.json"
+    params['limit'] = page_size or settings.SHOPIFY_PAGE_SIZE
+    while url:
+        response = client.get(url, params=params)
+        response.raise_for_status()
+        yield response.json()[resource]
+        # The next link already carries page_info and limit, other filters are not allowed with it
+        url = response.links.get('next', {}).get('url')
+        params = None
+
+
+def iter_records(resource, page_size=None, client=None, **params):
+    return itertools.chain.from_iterable(iter_pages(resource, page_size=page_size, client=client, **params))
+
+
+def _price_key(variant):
+    try:
+        return Decimal(variant['price'])
+    except (InvalidOperation, TypeError):
+        return Decimal(0)
+
+
+def product_record(product):
+    # Stock is summed over every variant and the price is the lowest one (the "from" price);
+    # the variants themselves are kept for per-variant answers
+    variants = [
+        {
+            "id": variant.get('id'),
+            "price": variant.get('price') or '0.00',
+            "inventory_quantity": variant.get('inventory_quantity') or 0
+        }
+        for variant in product.get('variants') or []
+    ]
+    return {
+        "id": product['id'],
+        "title": product.get('title'),
+        "product_type": product.get('product_type') or '',
+        "inventory_quantity": sum(variant['inventory_quantity'] for variant in variants),
+        "price": min(variants, key=_price_key)['price'] if variants else '0.00',
+        "variants": variants
+    }
+
+
+def order_record(order):
+    return {
+        "id": order['id'],
+        "total_price": order.get('total_price'),
+        "customer_email": order.get('email'),
+        "line_items": [
+            {
+                "product_title": item.get('title'),
+                "quantity": item.get('quantity'),
+                "price": item.get('price')
+            }
+            for item in order.get('line_items', [])
+        ]
+    }
+
+
+def customer_record(customer):
+    return {
+        "id": customer['id'],
+        "email": customer.get('email', 'N/A'),
+        "first_name": customer.get('first_name', 'N/A'),
+        "last_name": customer.get('last_name', 'N/A'),
+        "orders_count": customer.get('orders_count', 0)
+    }
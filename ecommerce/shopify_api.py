@@ -1,26 +1,17 @@
-import shopify
-from django.conf import settings
+from .analytics import get_rollup
+from .pagination import iter_records, product_record
 
-SHOP_NAME = settings.SHOPIFY_STORE_NAME
-API_KEY = settings.SHOPIFY_API_KEY
-PASSWORD = settings.SHOPIFY_PASSWORD
-SHOPIFY_STORE_URL = f"https://{API_KEY}:{PASSWORD}@{SHOP_NAME}/admin/api/2023-04"
-
-# Initialize Shopify Session
-shopify.ShopifyResource.set_site(f"{SHOPIFY_STORE_URL}/api/2023-07")
-session = shopify.Session(SHOPIFY_STORE_URL, "2023-07", PASSWORD)
-shopify.ShopifyResource.activate_session(session)
 
 def fetch_shopify_data():
-    products = shopify.Product.find()
-    orders = shopify.Order.find()
-
-    # Extract relevant product and order data
+    # Goes through the shared, rate-limit aware client like every other Shopify call
+    rollup = get_rollup()
+    units_sold = dict(zip(rollup.product_ids, rollup.product_units_total())) if not rollup.is_empty() else {}
     data = []
-    for product in products:
+    for product in map(product_record, iter_records('products')):
         data.append({
-            "product": product.title,
-            "sales": product.variants[0].inventory_quantity,  # Example sales data
-            "category": product.product_type
+            "product": product['title'],
+            "sales": units_sold.get(product['id'], 0),  # Units sold, from the mirrored orders
+            "inventory": product['inventory_quantity'],  # All variants
+            "category": product['product_type']
         })
     return data
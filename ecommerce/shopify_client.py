@@ -0,0 +1,233 @@
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+from urllib3.exceptions import NewConnectionError
+from django.conf import settings
+
+from ai_shopify_dashboard.timing import record, stage
+from .stores import current_shop, is_default_shop, store_settings
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Safe to send twice. Anything else (GraphQL mutations such as bulkOperationRunQuery are POSTs)
+# is only retried when Shopify cannot have acted on it: a 429, or a connection never made
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+
+def never_sent(error):
+    # The connection could not be opened, so the request did not reach Shopify
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def shopify_base_url(shop=None):
+    # SHOPIFY_BASE_URL points the client at another host (e.g. the fake Shopify server)
+    config = store_settings().get(shop, {}) if shop else {}
+    if config.get('base_url'):
+        return config['base_url'].rstrip('/')
+    if shop and not is_default_shop(shop):
+        return f"https://{shop}/admin/api/{settings.SHOPIFY_API_VERSION}"
+    if settings.SHOPIFY_BASE_URL:
+        return settings.SHOPIFY_BASE_URL.rstrip('/')
+    return f"https://{settings.SHOP_NAME}.myshopify.com/admin/api/{settings.SHOPIFY_API_VERSION}"
+
+
+def shopify_auth_kwargs(shop=None):
+    # Private app credentials as before, or an Admin API access token when only that is configured.
+    # Stores from SHOPIFY_STORES bring their own
+    if shop and not is_default_shop(shop):
+        config = store_settings().get(shop, {})
+        if config.get('access_token'):
+            return {'headers': {'X-Shopify-Access-Token': config['access_token']}}
+        return {'auth': HTTPBasicAuth(config.get('api_key'), config.get('password'))}
+    if settings.SHOPIFY_PASSWORD or not settings.SHOPIFY_ACCESS_TOKEN:
+        return {'auth': HTTPBasicAuth(settings.SHOPIFY_API_KEY, settings.SHOPIFY_PASSWORD)}
+    return {'headers': {'X-Shopify-Access-Token': settings.SHOPIFY_ACCESS_TOKEN}}
+
+
+class LeakyBucket:
+    """
+    Client-side estimate of Shopify's REST leaky bucket. The fill level comes from
+    the ``X-Shopify-Shop-Api-Call-Limit`` header and drains at ``leak_rate`` calls per
+    second; ``acquire`` waits until a call fits below ``size - headroom``.
+    """
+
+    def __init__(self, size, leak_rate, headroom):
+        self.size = size
+        self.leak_rate = leak_rate
+        self.headroom = headroom
+        self.fill = 0.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _level(self, now):
+        return max(0.0, self.fill - (now - self.updated) * self.leak_rate)
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            level = self._level(now)
+            wait = max(0.0, (level + 1 - (self.size - self.headroom)) / self.leak_rate)
+            # Reserve the slot before sleeping so concurrent callers queue up behind it
+            self.fill = level + 1
+            self.updated = now
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def update(self, header):
+        try:
+            used, size = (int(part) for part in header.split('/'))
+        except (AttributeError, ValueError):
+            return
+        with self._lock:
+            now = time.monotonic()
+            self.size = size
+            # Keep the higher estimate, calls reserved by other threads may not be counted by Shopify yet
+            self.fill = max(float(used), self._level(now))
+            self.updated = now
+
+
+class ShopifyClient:
+    """
+    Pooled keep-alive HTTP client for the Shopify Admin API. Paces calls to stay
+    under the leaky bucket and retries 429/5xx with jittered exponential backoff,
+    honouring ``Retry-After``. POSTs are not retried on 5xx or once sent, see
+    IDEMPOTENT_METHODS.
+    """
+
+    def __init__(self, base_url, auth_kwargs=None, pool_size=10, bucket_size=40, leak_rate=2.0, headroom=2,
+                 max_retries=5, backoff_base=0.5, backoff_max=30.0, timeout=30.0):
+        self.base_url = base_url.rstrip('/')
+        self.auth_kwargs = auth_kwargs or {}
+        self.bucket = LeakyBucket(bucket_size, leak_rate, headroom)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        auth = self.auth_kwargs.get('auth')
+        if auth is not None:
+            self.session.auth = auth
+        self.session.headers.update(self.auth_kwargs.get('headers', {}))
+
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            'requests': 0,
+            'retries': 0,
+            'throttled_responses': 0,
+            'server_errors': 0,
+            'connection_errors': 0,
+            'throttle_wait_seconds': 0.0,
+            'backoff_wait_seconds': 0.0,
+            'bytes_received': 0,
+        }
+
+    def url(self, path):
+        if path.startswith('http://') or path.startswith('https://'):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def _count(self, name, amount=1):
+        with self._metrics_lock:
+            self._metrics[name] += amount
+
+    def _backoff(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        # Full jitter keeps retrying workers from hitting Shopify in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def request(self, method, path, paced=True, idempotent=None, **kwargs):
+        # paced=False skips the REST bucket, e.g. for GraphQL calls which Shopify limits by query cost instead.
+        # idempotent=True marks a POST that only reads (a GraphQL query) as safe to retry
+        kwargs.setdefault('timeout', self.timeout)
+        url = self.url(path)
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            if paced:
+                throttle_wait = self.bucket.acquire()
+                self._count('throttle_wait_seconds', throttle_wait)
+                if throttle_wait:
+                    record('shopify_throttle', throttle_wait)
+            self._count('requests')
+            try:
+                with stage('shopify_request'):
+                    response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._count('connection_errors')
+                if attempt >= self.max_retries or not (idempotent or never_sent(e)):
+                    raise
+                response = None
+            else:
+                self._count('bytes_received', len(response.content))
+                self.bucket.update(response.headers.get('X-Shopify-Shop-Api-Call-Limit'))
+                retry = response.status_code == 429 or (idempotent and response.status_code in RETRY_STATUSES)
+                if not retry or attempt >= self.max_retries:
+                    return response
+                self._count('throttled_responses' if response.status_code == 429 else 'server_errors')
+
+            wait = self._backoff(attempt, response)
+            self._count('retries')
+            self._count('backoff_wait_seconds', wait)
+            record('shopify_backoff', wait)
+            time.sleep(wait)
+            attempt += 1
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def metrics(self):
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics['throttle_wait_seconds'] = round(metrics['throttle_wait_seconds'], 3)
+        metrics['backoff_wait_seconds'] = round(metrics['backoff_wait_seconds'], 3)
+        metrics['bucket_fill'] = round(self.bucket._level(time.monotonic()), 2)
+        metrics['bucket_size'] = self.bucket.size
+        return metrics
+
+
+_clients = {}
+_client_lock = threading.Lock()
+
+
+def get_client(shop=None):
+    """
+    The client of ``shop`` (by default the store of the current request). One per
+    store and process, shared by all threads and coroutines: each store has its own
+    connection pool and its own call limit, so stores never slow each other down.
+    """
+    shop = shop or current_shop()
+    with _client_lock:
+        client = _clients.get(shop)
+        if client is None:
+            config = store_settings().get(shop, {}) if shop else {}
+            client = ShopifyClient(
+                shopify_base_url(shop),
+                shopify_auth_kwargs(shop),
+                pool_size=settings.SHOPIFY_POOL_SIZE,
+                bucket_size=config.get('bucket_size', settings.SHOPIFY_BUCKET_SIZE),
+                leak_rate=config.get('leak_rate', settings.SHOPIFY_LEAK_RATE),
+                max_retries=settings.SHOPIFY_MAX_RETRIES,
+                timeout=settings.SHOPIFY_TIMEOUT
+            )
+            _clients[shop] = client
+        return client
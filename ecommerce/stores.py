@@ -0,0 +1,70 @@
+import contextvars
+import json
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# The Shopify store a unit of work is for. A context variable, so it follows the request
+# into sync_to_async threads, asyncio tasks and the get_insights stage pool, and two
+# concurrent requests for different stores never see each other's store.
+_shop = contextvars.ContextVar('shopify_shop', default=None)
+
+
+class UnknownShop(ValueError):
+    pass
+
+
+def normalize_shop(shop):
+    # 'example', 'example.myshopify.com' and 'https://example.myshopify.com/' are the same store
+    shop = (shop or '').strip().lower().removeprefix('https://').removeprefix('http://').split('/', 1)[0]
+    if shop and '.' not in shop:
+        shop = f"{shop}.myshopify.com"
+    return shop or None
+
+
+def default_shop():
+    return normalize_shop(settings.SHOP_NAME)
+
+
+def store_settings():
+    """
+    shop domain -> credentials of every store this process serves: the default store
+    from SHOP_NAME and the SHOPIFY_* settings, plus SHOPIFY_STORES.
+    """
+    stores = {normalize_shop(shop): dict(config) for shop, config in json.loads(settings.SHOPIFY_STORES or '{}').items()}
+    shop = default_shop()
+    if shop is not None:
+        stores.setdefault(shop, {})
+    return stores
+
+
+def current_shop():
+    return _shop.get() or default_shop()
+
+
+def is_default_shop(shop=None):
+    shop = shop or current_shop()
+    return shop is None or shop == default_shop()
+
+
+@contextmanager
+def use_shop(shop):
+    token = _shop.set(normalize_shop(shop))
+    try:
+        yield
+    finally:
+        _shop.reset(token)
+
+
+def resolve_shop(shop):
+    shop = normalize_shop(shop)
+    if shop is None or shop == default_shop():
+        return default_shop()
+    if shop not in store_settings():
+        raise UnknownShop(f"Unknown shop '{shop}'")
+    return shop
+
+
+def index_namespace():
+    # The default store keeps the un-namespaced index built before there were several stores
+    return None if is_default_shop() else current_shop()
@@ -0,0 +1,180 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from .analytics import order_days, rebuild_days
+from .models import Customer, LineItem, Order, Product, SyncState, Variant
+from .pagination import iter_pages
+
+RESOURCES = ('products', 'customers', 'orders')
+
+
+def _datetime(value):
+    return parse_datetime(value) if value else None
+
+
+def _decimal(value):
+    return Decimal(str(value)) if value not in (None, '') else Decimal('0')
+
+
+def _bulk_upsert(model, objects, update_fields):
+    if objects:
+        model.objects.bulk_create(objects, update_conflicts=True, unique_fields=['shopify_id'], update_fields=update_fields)
+
+
+def _replace_children(child_model, parent_field, parent_ids, objects, update_fields):
+    # Children that disappeared upstream (e.g. a deleted variant) are removed, the rest upserted
+    keep = [obj.shopify_id for obj in objects]
+    child_model.objects.filter(**{f'{parent_field}__in': parent_ids}).exclude(shopify_id__in=keep).delete()
+    _bulk_upsert(child_model, objects, update_fields)
+
+
+@transaction.atomic
+def upsert_products(products):
+    """Upsert Shopify product payloads (REST shape, with ``variants``) into the mirror."""
+    _bulk_upsert(Product, [
+        Product(
+            shopify_id=product['id'],
+            title=product.get('title') or '',
+            product_type=product.get('product_type') or '',
+            updated_at=_datetime(product.get('updated_at'))
+        )
+        for product in products
+    ], ['title', 'product_type', 'updated_at'])
+
+    pks = dict(Product.objects.filter(shopify_id__in=[p['id'] for p in products]).values_list('shopify_id', 'id'))
+    variants = [
+        Variant(
+            shopify_id=variant['id'],
+            product_id=pks[product['id']],
+            position=variant.get('position') or position,
+            title=variant.get('title') or '',
+            sku=variant.get('sku') or '',
+            price=_decimal(variant.get('price')),
+            inventory_quantity=variant.get('inventory_quantity') or 0
+        )
+        for product in products
+        for position, variant in enumerate(product.get('variants', []), start=1)
+    ]
+    _replace_children(Variant, 'product_id', list(pks.values()), variants, ['product', 'position', 'title', 'sku', 'price', 'inventory_quantity'])
+    return len(products)
+
+
+@transaction.atomic
+def upsert_customers(customers):
+    _bulk_upsert(Customer, [
+        Customer(
+            shopify_id=customer['id'],
+            email=customer.get('email'),
+            first_name=customer.get('first_name'),
+            last_name=customer.get('last_name'),
+            orders_count=customer.get('orders_count') or 0,
+            updated_at=_datetime(customer.get('updated_at'))
+        )
+        for customer in customers
+    ], ['email', 'first_name', 'last_name', 'orders_count', 'updated_at'])
+    return len(customers)
+
+
+@transaction.atomic
+def upsert_orders(orders):
+    # Days the orders were on before this sync, an edited order may have moved
+    touched_days = order_days([o['id'] for o in orders])
+    _bulk_upsert(Order, [
+        Order(
+            shopify_id=order['id'],
+            email=order.get('email'),
+            customer_shopify_id=(order.get('customer') or {}).get('id'),
+            total_price=_decimal(order.get('total_price')),
+            created_at=_datetime(order.get('created_at')),
+            updated_at=_datetime(order.get('updated_at'))
+        )
+        for order in orders
+    ], ['email', 'customer_shopify_id', 'total_price', 'created_at', 'updated_at'])
+
+    pks = dict(Order.objects.filter(shopify_id__in=[o['id'] for o in orders]).values_list('shopify_id', 'id'))
+    line_items = [
+        LineItem(
+            shopify_id=item['id'],
+            order_id=pks[order['id']],
+            product_shopify_id=item.get('product_id'),
+            variant_shopify_id=item.get('variant_id'),
+            title=item.get('title') or '',
+            quantity=item.get('quantity') or 0,
+            price=_decimal(item.get('price'))
+        )
+        for order in orders
+        for item in order.get('line_items', [])
+    ]
+    _replace_children(LineItem, 'order_id', list(pks.values()), line_items, ['order', 'product_shopify_id', 'variant_shopify_id', 'title', 'quantity', 'price'])
+    # Only the sales rollup days these orders fall on are recomputed
+    rebuild_days(touched_days | order_days(list(pks)))
+    return len(orders)
+
+
+UPSERTS = {
+    'products': upsert_products,
+    'customers': upsert_customers,
+    'orders': upsert_orders,
+}
+
+MODELS = {'products': Product, 'customers': Customer, 'orders': Order}
+PRUNE_CHUNK = 500  # Ids per DELETE, below SQLite's limit on query parameters
+
+
+@transaction.atomic
+def prune(resource, keep):
+    """
+    Delete mirrored ``resource`` rows (and their variants or line items) whose Shopify
+    id is not in ``keep``, the ids a full sync got back. Returns the number deleted.
+    """
+    model = MODELS[resource]
+    stale = [shopify_id for shopify_id in model.objects.values_list('shopify_id', flat=True).iterator(chunk_size=2000)
+             if shopify_id not in keep]
+    touched_days = set()
+    for start in range(0, len(stale), PRUNE_CHUNK):
+        chunk = stale[start:start + PRUNE_CHUNK]
+        if resource == 'orders':
+            touched_days |= order_days(chunk)
+        model.objects.filter(shopify_id__in=chunk).delete()
+    rebuild_days(touched_days)
+    return len(stale)
+
+
+def sync_resource(resource, full=False, page_size=None):
+    """
+    Pull records of ``resource`` changed since the stored watermark (everything when
+    ``full``) and bulk-upsert them page by page. Returns the number of records synced.
+
+    An incremental sync cannot see deletions; a full sync removes the local rows
+    Shopify no longer returned (product deletions also arrive through the webhook).
+    """
+    state, _ = SyncState.objects.get_or_create(resource=resource)
+    params = {}
+    if state.watermark and not full:
+        params['updated_at_min'] = state.watermark.isoformat()
+    if resource == 'orders':
+        params['status'] = 'any'  # Closed and cancelled orders too, not only open ones
+
+    synced = 0
+    seen = set()
+    watermark = state.watermark
+    for page in iter_pages(resource, page_size=page_size, **params):
+        synced += UPSERTS[resource](page)
+        for record in page:
+            seen.add(record['id'])
+            updated_at = _datetime(record.get('updated_at'))
+            if updated_at and (watermark is None or updated_at > watermark):
+                watermark = updated_at
+
+    if full:
+        prune(resource, seen)
+    # Only advance the watermark once every page made it into the mirror
+    state.watermark = watermark
+    state.save()
+    return synced
+
+
+def sync_all(full=False, resources=RESOURCES, page_size=None):
+    return {resource: sync_resource(resource, full=full, page_size=page_size) for resource in resources}
@@ -1,3 +1,476 @@
-from django.test import TestCase
+import base64
+import hashlib
+import hmac
+import json
+import os
+import socket
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+import requests
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from . import conditional, shopify_client
+from .analytics import SalesRollup
+from .bulk import BulkOperation, bulk_sync_resource
+from .catalog import product_records
+from .fake_shopify import FakeShopifyServer, generate_fixtures, write_bulk_jsonl
+from .management.commands.benchmark_bulk_ingest import consume, synthetic_products
+from .models import LineItem, Order, Product, Variant, WebhookEvent
+from .pagination import iter_pages, iter_records
+from .shopify_client import ShopifyClient
+from .sync import sync_resource, upsert_products
+from .webhooks import apply_to_mirror, coalesce, pending_events
+
+
+class FakeShopifyTestCase(TestCase):
+    """Runs each test against a fresh fake Shopify server, with the app's clients pointed at it."""
+    products = 23
+    server_options = {}
+
+    def setUp(self):
+        self.fixtures = generate_fixtures(products=self.products, orders=12, customers=6)
+        self.server = FakeShopifyServer(fixtures=self.fixtures, **self.server_options).start()
+        self.addCleanup(self.server.stop)
+        settings = override_settings(ALLOWED_HOSTS=['testserver'], SHOPIFY_BASE_URL=self.server.base_url, CATALOG_SOURCE='shopify')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        shopify_client._clients.clear()
+        conditional._entries.clear()
+        self.addCleanup(shopify_client._clients.clear)
+        self.addCleanup(conditional._entries.clear)
+
+    def client_for_server(self, **options):
+        return ShopifyClient(self.server.base_url, **options)
+
+
+class PaginationTests(FakeShopifyTestCase):
+
+    def test_iter_pages_follows_page_info_across_pages(self):
+        client = self.client_for_server()
+        pages = list(iter_pages('products', page_size=5, client=client))
+        self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 3])
+        self.assertEqual([row['id'] for page in pages for row in page], [row['id'] for row in self.fixtures['products']])
+        self.assertEqual(client.metrics()['requests'], 5)
+
+    def test_page_info_keeps_the_filters_of_the_first_request(self):
+        rows = sorted(self.fixtures['orders'], key=lambda row: (row['updated_at'], row['id']))
+        since = rows[4]['updated_at']
+        client = self.client_for_server()
+        records = list(iter_records('orders', page_size=3, client=client, updated_at_min=since, fields='id,updated_at'))
+        self.assertEqual([record['id'] for record in records], [row['id'] for row in rows if row['updated_at'] >= since])
+        self.assertEqual(set(records[0]), {'id', 'updated_at'})
+
+    def test_iter_pages_is_lazy(self):
+        client = self.client_for_server()
+        pages = iter_pages('products', page_size=5, client=client)
+        self.assertEqual(client.metrics()['requests'], 0)
+        next(pages)
+        self.assertEqual(client.metrics()['requests'], 1)
+
+    def test_ndjson_endpoint_streams_every_record(self):
+        response = self.client.get('/get_shopify_customers/stream/', {'page_size': 4})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        chunks = iter(response.streaming_content)
+        first = json.loads(next(chunks))
+        # The first row is out after one page, before the others are fetched
+        self.assertEqual(shopify_client.get_client().metrics()['requests'], 1)
+        records = [first] + [json.loads(chunk) for chunk in chunks]
+        self.assertEqual([record['id'] for record in records], [row['id'] for row in self.fixtures['customers']])
+        self.assertEqual(shopify_client.get_client().metrics()['requests'], 2)
+
+
+class RetryTests(FakeShopifyTestCase):
+
+    def test_429_is_retried_after_retry_after(self):
+        self.server.failures = [(429, {'Retry-After': '0.2'}), (429, {'Retry-After': '0.2'})]
+        client = self.client_for_server()
+        start = time.monotonic()
+        response = client.get('products.json')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(time.monotonic() - start, 0.4)
+        metrics = client.metrics()
+        self.assertEqual(metrics['requests'], 3)
+        self.assertEqual(metrics['retries'], 2)
+        self.assertEqual(metrics['throttled_responses'], 2)
+        self.assertAlmostEqual(metrics['backoff_wait_seconds'], 0.4, places=2)
+
+    def test_gives_up_after_max_retries(self):
+        self.server.failures = [(429, {'Retry-After': '0'})] * 3
+        client = self.client_for_server(max_retries=2)
+        response = client.get('products.json')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(client.metrics()['requests'], 3)
+
+    def test_server_errors_are_retried_with_backoff(self):
+        self.server.failures = [(503, {}), (500, {})]
+        client = self.client_for_server(backoff_base=0.01)
+        self.assertEqual(client.get('customers.json').status_code, 200)
+        self.assertEqual(client.metrics()['server_errors'], 2)
+
+
+class ClientTests(FakeShopifyTestCase):
+
+    def test_list_endpoint_goes_through_the_shared_client(self):
+        self.server.failures = [(429, {'Retry-After': '0.05'}), (503, {})]
+        response = self.client.get('/get_shopify_products/', {'page_size': 10})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['id'] for p in response.json()['products']], [p['id'] for p in self.fixtures['products']])
+        metrics = self.client.get('/shopify_client_metrics/').json()
+        # Three pages plus the two failed attempts, all on the one pooled client
+        self.assertEqual(metrics['requests'], 5)
+        self.assertEqual(metrics['retries'], 2)
+        self.assertEqual(metrics['throttled_responses'], 1)
+        self.assertEqual(metrics['server_errors'], 1)
+
+    def test_graphql_reads_are_retried(self):
+        self.server.failures = [(502, {})]
+        response = self.client.get('/get_shopify_products/', {'source': 'graphql', 'page_size': 10})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['products']), 23)
+        self.assertEqual(shopify_client.get_client().metrics()['server_errors'], 1)
+
+    def test_post_is_not_retried_on_server_errors(self):
+        self.server.failures = [(503, {})]
+        client = self.client_for_server(backoff_base=0.01)
+        response = client.post('graphql.json', json={'query': 'mutation { bulkOperationRunQuery }'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(client.metrics()['requests'], 1)
+
+    def test_post_is_retried_on_429(self):
+        self.server.failures = [(429, {'Retry-After': '0.05'})]
+        client = self.client_for_server()
+        response = client.post('graphql.json', json={'query': '{ currentBulkOperation { id } }'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.metrics()['retries'], 1)
+
+    def test_post_is_retried_when_the_connection_is_refused(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        client = ShopifyClient(f"http://127.0.0.1:{port}", max_retries=2, backoff_base=0.01)
+        with self.assertRaises(requests.ConnectionError):
+            client.post('graphql.json', json={'query': '{ shop { id } }'})
+        self.assertEqual(client.metrics()['connection_errors'], 3)
+
+
+class ListEndpointErrorTests(FakeShopifyTestCase):
+
+    def test_bad_parameters_are_rejected(self):
+        for path in ('/get_shopify_orders/', '/get_shopify_customers/', '/get_shopify_products/', '/get_shopify_orders/stream/'):
+            for params in ({'page_size': 'ten'}, {'page_size': '0'}, {'source': 'ftp'}):
+                response = self.client.get(path, params)
+                self.assertEqual(response.status_code, 400, (path, params))
+                self.assertIn('error', response.json())
+
+    @override_settings(SHOPIFY_MAX_RETRIES=0)
+    def test_upstream_failure_is_a_bad_gateway(self):
+        self.server.failures = [(503, {})]
+        response = self.client.get('/get_shopify_orders/')
+        self.assertEqual(response.status_code, 502)
+        self.assertIn('error', response.json())
+
+    @override_settings(SHOPIFY_MAX_RETRIES=0, LIST_REVALIDATE_SECONDS=0)
+    def test_failed_revalidation_is_a_bad_gateway(self):
+        self.assertEqual(self.client.get('/get_shopify_customers/').status_code, 200)
+        self.server.failures = [(503, {})]
+        self.assertEqual(self.client.get('/get_shopify_customers/').status_code, 502)
+        self.assertEqual(self.client.get('/get_shopify_customers/')['X-List-Cache'], 'revalidated')
+
+
+class CachedRecordsTests(FakeShopifyTestCase):
+
+    def test_records_are_fetched_again_only_when_the_catalog_changed(self):
+        derived = []
+
+        def derive(records):
+            derived.append(len(records))
+            return len(records)
+
+        def read():
+            return conditional.cached_records('products', product_records, derive=derive)
+
+        records, count, status = read()
+        self.assertEqual((len(records), count, status), (23, 23, 'miss'))
+        self.assertEqual(read()[2], 'hit')
+        client = shopify_client.get_client()
+        with override_settings(LIST_REVALIDATE_SECONDS=0):
+            before = client.metrics()['requests']
+            self.assertEqual(read()[2], 'revalidated')
+            # A count and an updated_at_min query instead of every page
+            self.assertEqual(client.metrics()['requests'] - before, 2)
+
+            self.fixtures['products'].pop()
+            records, count, status = read()
+            self.assertEqual((count, status), (22, 'miss'))
+        conditional.invalidate('products')
+        self.assertEqual(read()[2], 'miss')
+        self.assertEqual(derived, [23, 22, 22])
+
+
+class DashboardTests(FakeShopifyTestCase):
+
+    def test_bad_parameters_are_rejected(self):
+        for params in ({'page_size': 'abc'}, {'page_size': '-5'}, {'source': 'ftp'}):
+            response = self.client.get('/get_dashboard/', params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.json())
+
+    def test_timed_out_fetch_stops_walking_pages(self):
+        self.server.latency = 0.1
+        with override_settings(DASHBOARD_RESOURCE_TIMEOUT=0.25):
+            response = self.client.get('/get_dashboard/', {'page_size': 2})
+        self.assertEqual(response.status_code, 502)
+        self.assertIn('timed out', response.json()['errors']['products'])
+        # The worker threads notice the deadline at their next page and stop calling Shopify
+        time.sleep(0.5)
+        requests_made = shopify_client.get_client().metrics()['requests']
+        time.sleep(0.5)
+        self.assertEqual(shopify_client.get_client().metrics()['requests'], requests_made)
+        self.assertLess(requests_made, 3 * 6)
+
+
+class PacingTests(FakeShopifyTestCase):
+    server_options = {'bucket_size': 6, 'leak_rate': 20.0}
+
+    def test_paced_client_stays_under_the_bucket(self):
+        client = self.client_for_server(bucket_size=6, leak_rate=20.0, headroom=1)
+        for _ in range(20):
+            self.assertEqual(client.get('products/count.json').status_code, 200)
+        metrics = client.metrics()
+        self.assertEqual(self.server.rejected, 0)
+        self.assertEqual(metrics['throttled_responses'], 0)
+        self.assertGreater(metrics['throttle_wait_seconds'], 0)
+
+    def test_bucket_follows_the_call_limit_header(self):
+        client = self.client_for_server(bucket_size=40, leak_rate=20.0)
+        client.get('products/count.json')
+        # The header reports the server's bucket size, which replaces the configured one
+        self.assertEqual(client.bucket.size, 6)
+        self.assertGreaterEqual(client.bucket.fill, 1)
+
+    def test_unpaced_burst_is_throttled(self):
+        client = self.client_for_server(max_retries=0)
+        statuses = [client.get('products/count.json', paced=False).status_code for _ in range(20)]
+        self.assertIn(429, statuses)
+        self.assertGreater(self.server.rejected, 0)
+
+
+class SyncTests(FakeShopifyTestCase):
+
+    def test_full_sync_prunes_rows_missing_upstream(self):
+        self.assertEqual(sync_resource('products', full=True, page_size=10), 23)
+        removed = self.fixtures['products'][:3]
+        del self.fixtures['products'][:3]
+        removed_ids = [product['id'] for product in removed]
+
+        # An incremental sync cannot tell that they are gone
+        sync_resource('products', page_size=10)
+        self.assertEqual(Product.objects.count(), 23)
+
+        sync_resource('products', full=True, page_size=10)
+        self.assertEqual(Product.objects.count(), 20)
+        self.assertFalse(Product.objects.filter(shopify_id__in=removed_ids).exists())
+        self.assertFalse(Variant.objects.filter(shopify_id__in=[v['id'] for p in removed for v in p['variants']]).exists())
+
+    def test_full_sync_prunes_orders_and_their_line_items(self):
+        sync_resource('orders', full=True)
+        removed = self.fixtures['orders'].pop()
+        sync_resource('orders', full=True)
+        self.assertEqual(Order.objects.count(), 11)
+        self.assertFalse(LineItem.objects.filter(order__shopify_id=removed['id']).exists())
+
+
+class BulkTests(FakeShopifyTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.server.bulk_delay = 0
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def operation(self, products):
+        # A generated bulk result file for the fake bulk endpoint to serve
+        path = os.path.join(self.directory, f"products-{products}.jsonl")
+        write_bulk_jsonl(path, 'products', synthetic_products(products))
+        self.server.bulk_files['products'] = path
+        return BulkOperation(client=self.client_for_server(leak_rate=1000), poll_interval=0.01)
+
+    def test_bulk_sync_reassembles_children_and_prunes(self):
+        upsert_products([{'id': 10 ** 9, 'title': 'Gone upstream', 'variants': [{'id': 10 ** 10, 'price': '1.00'}]}])
+        result = bulk_sync_resource('products', batch_size=400, operation=self.operation(3000))
+
+        expected = list(synthetic_products(3000))
+        self.assertEqual(result['synced'], 3000)
+        self.assertEqual(result['deleted'], 1)
+        self.assertEqual(result['orphans'], 0)
+        self.assertEqual(result['lines'], 3000 + sum(len(product['variants']) for product in expected))
+        self.assertEqual(Product.objects.count(), 3000)
+        self.assertEqual(Variant.objects.count(), sum(len(product['variants']) for product in expected))
+        self.assertFalse(Product.objects.filter(shopify_id=10 ** 9).exists())
+        for product in (expected[0], expected[1234], expected[-1]):
+            variants = Variant.objects.filter(product__shopify_id=product['id']).order_by('position')
+            self.assertEqual([(v.shopify_id, v.sku, str(v.price), v.inventory_quantity) for v in variants],
+                             [(v['id'], v['sku'], v['price'], v['inventory_quantity']) for v in product['variants']])
+
+    def peak_memory(self, products):
+        operation = self.operation(products)
+        tracemalloc.start()
+        try:
+            counts = consume(operation.records('products'))
+            return counts, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_streaming_memory_does_not_grow_with_the_file(self):
+        (small, _), small_peak = self.peak_memory(2000)
+        (large, _), large_peak = self.peak_memory(20000)
+        self.assertEqual((small, large), (2000, 20000))
+        # Ten times the products, about the same peak: one parent and one download chunk at a time
+        self.assertLess(large_peak, small_peak * 2)
+        self.assertLess(large_peak, os.path.getsize(self.server.bulk_files['products']) / 10)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], SHOPIFY_API_SECRET='webhook-secret')
+class WebhookTests(TestCase):
+
+    def post(self, topic, payload, webhook_id=None, signature=None):
+        body = json.dumps(payload).encode('utf-8')
+        if signature is None:
+            signature = base64.b64encode(hmac.new(b'webhook-secret', body, hashlib.sha256).digest()).decode('ascii')
+        headers = {'HTTP_X_SHOPIFY_TOPIC': topic, 'HTTP_X_SHOPIFY_HMAC_SHA256': signature}
+        if webhook_id:
+            headers['HTTP_X_SHOPIFY_WEBHOOK_ID'] = webhook_id
+        return self.client.post('/webhooks/products/', body, content_type='application/json', **headers)
+
+    def product(self, title, updated_at):
+        return {'id': 7, 'title': title, 'updated_at': updated_at,
+                'variants': [{'id': 70, 'price': '9.50', 'inventory_quantity': 3}]}
+
+    def drain(self):
+        # What run_index_worker does to the mirror, without the vector index
+        events = pending_events(100)
+        apply_to_mirror(*coalesce(events))
+        WebhookEvent.objects.filter(id__in=[event.id for event in events]).update(processed_at=timezone.now())
+
+    def test_bad_or_missing_signature_is_rejected(self):
+        payload = self.product('Mug', '2024-01-01T00:00:00Z')
+        self.assertEqual(self.post('products/create', payload, signature='').status_code, 401)
+        self.assertEqual(self.post('products/create', payload, signature='bm90IHRoZSBobWFj').status_code, 401)
+        self.assertFalse(WebhookEvent.objects.exists())
+        self.assertEqual(self.post('products/create', payload).status_code, 200)
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+    def test_duplicate_delivery_is_dropped(self):
+        payload = self.product('Mug', '2024-01-01T00:00:00Z')
+        self.assertEqual(self.post('products/create', payload, webhook_id='delivery-1').json(), {'queued': True})
+        self.assertEqual(self.post('products/create', payload, webhook_id='delivery-1').status_code, 200)
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+    def test_create_then_delete_leaves_no_row(self):
+        self.post('products/create', self.product('Mug', '2024-01-01T00:00:00Z'), webhook_id='1')
+        self.post('products/delete', {'id': 7}, webhook_id='2')
+        self.drain()
+        self.assertFalse(Product.objects.filter(shopify_id=7).exists())
+
+        # Same outcome when the create was already applied in an earlier batch
+        self.post('products/create', self.product('Mug', '2024-01-02T00:00:00Z'), webhook_id='3')
+        self.drain()
+        self.assertTrue(Product.objects.filter(shopify_id=7).exists())
+        self.post('products/delete', {'id': 7}, webhook_id='4')
+        self.drain()
+        self.assertFalse(Product.objects.filter(shopify_id=7).exists())
+        self.assertFalse(Variant.objects.filter(shopify_id=70).exists())
+
+    def test_late_older_update_does_not_overwrite_newer(self):
+        self.post('products/update', self.product('New title', '2024-01-02T00:00:00Z'), webhook_id='1')
+        self.post('products/update', self.product('Old title', '2024-01-01T00:00:00Z'), webhook_id='2')
+        self.drain()
+        self.assertEqual(Product.objects.get(shopify_id=7).title, 'New title')
+
+        # The older delivery can also land in a later batch than the newer one
+        self.post('products/update', self.product('Stale title', '2024-01-01T12:00:00Z'), webhook_id='3')
+        self.drain()
+        self.assertEqual(Product.objects.get(shopify_id=7).title, 'New title')
+        self.post('products/update', self.product('Newest title', '2024-01-03T00:00:00Z'), webhook_id='4')
+        self.drain()
+        self.assertEqual(Product.objects.get(shopify_id=7).title, 'Newest title')
+
+
+class SalesRollupTests(SimpleTestCase):
+
+    def setUp(self):
+        jan1, jan2, jan8, feb1 = date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 8), date(2024, 2, 1)
+        self.rollup = SalesRollup(
+            [
+                (jan1, 1, 'Mug', Decimal('30.00'), 3, 2),
+                (jan1, 2, 'Cap', Decimal('50.00'), 1, 1),
+                (jan2, 1, 'Mug', Decimal('25.00'), 2, 1),
+                (jan8, 3, 'Tee', Decimal('15.00'), 6, 1),
+                (feb1, 2, 'Cap', Decimal('100.00'), 2, 2),
+            ],
+            [
+                (jan1, 10, Decimal('80.00'), 2),
+                (jan2, 11, Decimal('25.00'), 1),
+                (jan8, 10, Decimal('15.00'), 1),
+                (feb1, 11, Decimal('100.00'), 2),
+            ],
+        )
+
+    def test_top_products(self):
+        top = self.rollup.top_products(date(2024, 1, 1), date(2024, 1, 8))
+        self.assertEqual(top, [
+            {'product_id': 1, 'title': 'Mug', 'revenue': 55.0, 'units': 5},
+            {'product_id': 2, 'title': 'Cap', 'revenue': 50.0, 'units': 1},
+            {'product_id': 3, 'title': 'Tee', 'revenue': 15.0, 'units': 6},
+        ])
+        by_units = self.rollup.top_products(date(2024, 1, 1), date(2024, 1, 8), limit=2, metric='units')
+        self.assertEqual([row['product_id'] for row in by_units], [3, 1])
+        self.assertEqual(self.rollup.top_products(date(2024, 1, 3), date(2024, 1, 7)), [])
+
+    def test_time_series(self):
+        daily = self.rollup.time_series(date(2024, 1, 1), date(2024, 1, 8))
+        self.assertEqual([row['revenue'] for row in daily], [80.0, 25.0, 0.0, 0.0, 0.0, 0.0, 0.0, 15.0])
+        self.assertEqual(daily[0]['period'], '2024-01-01')
+        weekly = self.rollup.time_series(date(2024, 1, 1), date(2024, 1, 14), interval='week')
+        self.assertEqual(weekly, [{'period': '2024-01-01', 'revenue': 105.0}, {'period': '2024-01-08', 'revenue': 15.0}])
+        monthly = self.rollup.time_series(date(2024, 1, 1), date(2024, 2, 29), metric='orders', interval='month')
+        self.assertEqual(monthly, [{'period': '2024-01-01', 'orders': 4}, {'period': '2024-02-01', 'orders': 2}])
+
+        mug = self.rollup.time_series(date(2024, 1, 1), date(2024, 1, 2), metric='units', product_id=1)
+        self.assertEqual([row['units'] for row in mug], [3, 2])
+        customer = self.rollup.time_series(date(2024, 1, 1), date(2024, 1, 8), interval='week', customer_id=10)
+        self.assertEqual([row['revenue'] for row in customer], [80.0, 15.0])
+        with self.assertRaises(ValueError):
+            self.rollup.time_series(date(2024, 1, 1), date(2024, 1, 8), metric='units', customer_id=10)
+
+    def test_compare(self):
+        comparison = self.rollup.compare(date(2024, 1, 8), date(2024, 2, 1), date(2024, 1, 1), date(2024, 1, 2), limit=1)
+        self.assertEqual(comparison['period'], {'start': '2024-01-08', 'end': '2024-02-01', 'revenue': 115.0, 'orders': 3, 'units': 8})
+        self.assertEqual(comparison['previous_period'], {'start': '2024-01-01', 'end': '2024-01-02', 'revenue': 105.0, 'orders': 3, 'units': 6})
+        self.assertEqual(comparison['change_percent'], {'revenue': 9.52, 'units': 33.33, 'orders': 0.0})
+        self.assertEqual(comparison['top_gainers'], [{'product_id': 2, 'title': 'Cap', 'revenue_change': 50.0}])
+        self.assertEqual(comparison['top_decliners'], [{'product_id': 1, 'title': 'Mug', 'revenue_change': -55.0}])
+
+        # Without a previous period, the same number of days right before it
+        default = self.rollup.compare(date(2024, 1, 2), date(2024, 1, 2))
+        self.assertEqual(default['previous_period']['start'], '2024-01-01')
+        self.assertEqual(default['change_percent']['revenue'], -68.75)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class SalesEndpointTests(TestCase):
+
+    def test_limit_must_be_a_positive_integer(self):
+        for path in ('/sales/top_products/', '/sales/top_customers/', '/sales/compare/'):
+            for limit in ('0', '-3', 'ten'):
+                response = self.client.get(path, {'limit': limit})
+                self.assertEqual(response.status_code, 400, (path, limit))
+                self.assertIn('limit', response.json()['error'])
+            self.assertEqual(self.client.get(path, {'limit': '1'}).status_code, 200)
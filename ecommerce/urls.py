@@ -1,6 +1,9 @@
 from django.urls import path
 # from .views import get_insights
 from .views import get_shopify_products, get_shopify_orders,get_shopify_customers
+from .views import stream_shopify_products, stream_shopify_orders, stream_shopify_customers
+from .views import get_dashboard, get_shopify_client_metrics, shopify_product_webhook
+from .views import get_top_products, get_top_customers, get_sales_time_series, get_sales_comparison
 
 urlpatterns = [
 path('get_shopify_products/', get_shopify_products,
@@ -9,4 +12,24 @@ path('get_shopify_orders/', get_shopify_orders,
 name='get_shopify_orders'),
 path('get_shopify_customers/', get_shopify_customers,
 name='get_shopify_customers'),
+path('get_shopify_products/stream/', stream_shopify_products,
+name='stream_shopify_products'),
+path('get_shopify_orders/stream/', stream_shopify_orders,
+name='stream_shopify_orders'),
+path('get_shopify_customers/stream/', stream_shopify_customers,
+name='stream_shopify_customers'),
+path('get_dashboard/', get_dashboard,
+name='get_dashboard'),
+path('shopify_client_metrics/', get_shopify_client_metrics,
+name='shopify_client_metrics'),
+path('webhooks/products/', shopify_product_webhook,
+name='shopify_product_webhook'),
+path('sales/top_products/', get_top_products,
+name='sales_top_products'),
+path('sales/top_customers/', get_top_customers,
+name='sales_top_customers'),
+path('sales/time_series/', get_sales_time_series,
+name='sales_time_series'),
+path('sales/compare/', get_sales_comparison,
+name='sales_compare'),
 ]
\ No newline at end of file
@@ -1,97 +1,284 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-import shopify
-import os
-from decouple import config
+import json
+import asyncio
+import time
 import requests
-from requests.auth import HTTPBasicAuth
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from asgiref.sync import sync_to_async
+from .catalog import product_records, order_records, customer_records, resolve_source
+from .conditional import collection_response, invalidate
+from django.utils.dateparse import parse_date
+from .analytics import INTERVALS, METRICS, get_rollup
+from .shopify_client import get_client
+from .stores import is_default_shop, normalize_shop
+from .webhooks import PRODUCT_TOPICS, enqueue, verify_hmac
+from ai_shopify_dashboard.timing import stage
 
-SHOP_NAME = settings.SHOP_NAME
-API_KEY = settings.SHOPIFY_API_KEY
-PASSWORD = settings.SHOPIFY_PASSWORD
+def page_size_param(request):
+    return parse_page_size(request.query_params.get('page_size'))
 
 
+def parse_page_size(page_size):
+    if not page_size:
+        return None
+    try:
+        page_size = int(page_size)
+    except ValueError:
+        page_size = 0
+    if page_size < 1:
+        raise ValueError("'page_size' must be a positive integer")
+    return min(page_size, 250)
+
+
+def collection_view(request, resource, records):
+    # ETag / If-None-Match: unchanged polls get a 304 from the cached body, see ecommerce/conditional.py
+    try:
+        page_size = page_size_param(request)
+        resolve_source(request.query_params.get('source'))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    try:
+        return collection_response(request, resource, records, page_size)
+    except requests.RequestException as e:
+        # Shopify unreachable or failing, also while checking whether a cached list is still current
+        print(f"Error fetching Shopify {resource}:", str(e))
+        return Response({"error": str(e)}, status=502)
+    except Exception as e:
+        print(f"Error fetching Shopify {resource}:", str(e))
+        return Response({"error": str(e)}, status=500)
 
 
-SHOP_URL =f"https://{API_KEY}:{PASSWORD}@{SHOP_NAME}/admin/api/2023-04"
+def stream_view(request, records):
+    try:
+        page_size = page_size_param(request)
+        source = resolve_source(request.query_params.get('source'))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    return ndjson_response(records(source, page_size))
 
-url = f'https://{SHOP_NAME}.myshopify.com/admin/api/2023-04/products.json'
 
-response = requests.get(url, auth=HTTPBasicAuth(API_KEY, PASSWORD))
+def ndjson_response(records):
+    # One JSON document per line, each page is sent as soon as Shopify returns it
+    def lines():
+        try:
+            for record in records:
+                yield json.dumps(record, cls=DjangoJSONEncoder) + "\n"
+        except Exception as e:
+            print("Error streaming Shopify records:", str(e))
+            yield json.dumps({"error": str(e)}) + "\n"
+    return StreamingHttpResponse(lines(), content_type='application/x-ndjson')
 
-if response.status_code == 200:
-    products = response.json()
-    print("products",products)
-else:
-    print(f"Error {response.status_code}: {response.json()}")
-    
-# Function to set up Shopify session
-def shopify_session():
-    shop_url =f"https://{API_KEY}:{PASSWORD}@{SHOP_NAME}.myshopify.com/admin"
-    print("shop url ",shop_url)
-    shopify.ShopifyResource.set_site(shop_url)
 
-    
 @api_view(['GET'])
 def get_shopify_products(request):
-    print(f"Request type - get shopify products: {type(request)}")
-    try:
-        shopify_session()  # Establish the session with Shopify
-        products = shopify.Product.find()  # Fetch products from Shopify
-        
-        product_list = []
-        for product in products:
-            product_list.append({
-                "id": product.id,
-                "title": product.title,
-                "inventory_quantity": product.variants[0].inventory_quantity,
-                "price": product.variants[0].price
-            })
-        
-        return Response({"products": product_list})
-    
-    except Exception as e:
-        print("Error fetching Shopify products:", str(e))
-        return Response({"error": str(e)}, status=500)
+    return collection_view(request, 'products', product_records)
 
 
 
 # Fetch recent orders from Shopify
 @api_view(['GET'])
 def get_shopify_orders(request):
-    shopify_session()
-    orders = shopify.Order.find()
-    order_list = []
-    for order in orders:
-        order_list.append({
-            "id": order.id,
-            "total_price": order.total_price,
-            "customer_email": order.email,
-            "line_items": [
-                {
-                    "product_title": item.title,
-                    "quantity": item.quantity,
-                    "price": item.price
-                }
-            for item in order.line_items
-            ]
-        })
-    return Response({"orders": order_list})
+    return collection_view(request, 'orders', order_records)
 
 
 @api_view(['GET'])
 def get_shopify_customers(request):
-    shopify_session()
-    customers = shopify.Customer.find()
-    customer_list = []
-    for customer in customers:
-        print(vars(customer))
-        customer_list.append({
-            "id": customer.id,
-            "email": getattr(customer, 'email', 'N/A'),  # Handle missing email attribute
-            "first_name": getattr(customer, 'first_name', 'N/A'),
-            "last_name": getattr(customer, 'last_name', 'N/A'),
-            "orders_count": getattr(customer, 'orders_count', 0)
-        })
-    return Response({"customers": customer_list})
+    return collection_view(request, 'customers', customer_records)
+
+
+@api_view(['GET'])
+def stream_shopify_products(request):
+    return stream_view(request, product_records)
+
+
+@api_view(['GET'])
+def stream_shopify_orders(request):
+    return stream_view(request, order_records)
+
+
+@api_view(['GET'])
+def stream_shopify_customers(request):
+    return stream_view(request, customer_records)
+
+
+@api_view(['GET'])
+def get_shopify_client_metrics(request):
+    # Requests, retries and time spent waiting on the Shopify call limit in this process
+    return Response(get_client().metrics())
+
+
+def date_param(request, name, default=None):
+    value = request.query_params.get(name)
+    if not value:
+        return default
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f"'{name}' must be a date (YYYY-MM-DD)")
+    return parsed
+
+
+def sales_period(request, rollup):
+    # Defaults to the last 30 days that have orders
+    default_start, default_end = rollup.default_period()
+    end = date_param(request, 'end', default_end)
+    start = date_param(request, 'start', default_start if end == default_end else end - (default_end - default_start))
+    if start > end:
+        raise ValueError("'start' must not be after 'end'")
+    return start, end
+
+
+def choice_param(request, name, choices, default):
+    value = request.query_params.get(name, default)
+    if value not in choices:
+        raise ValueError(f"'{name}' must be one of {', '.join(choices)}")
+    return value
+
+
+def limit_param(request, default, maximum):
+    try:
+        limit = int(request.query_params.get('limit', default))
+    except ValueError:
+        raise ValueError("'limit' must be an integer") from None
+    if limit < 1:
+        raise ValueError("'limit' must be at least 1")
+    return min(limit, maximum)
+
+
+@api_view(['GET'])
+def get_top_products(request):
+    # Answered from the precomputed sales rollups, see ecommerce/analytics.py
+    try:
+        rollup = get_rollup()
+        start, end = sales_period(request, rollup)
+        metric = choice_param(request, 'metric', ('revenue', 'units'), 'revenue')
+        limit = limit_param(request, 10, 250)
+        products = rollup.top_products(start, end, limit, metric)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    return Response({"start": start, "end": end, "metric": metric, "products": products})
+
+
+@api_view(['GET'])
+def get_top_customers(request):
+    try:
+        rollup = get_rollup()
+        start, end = sales_period(request, rollup)
+        limit = limit_param(request, 10, 250)
+        customers = rollup.top_customers(start, end, limit)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    return Response({"start": start, "end": end, "customers": customers})
+
+
+@api_view(['GET'])
+def get_sales_time_series(request):
+    try:
+        rollup = get_rollup()
+        start, end = sales_period(request, rollup)
+        metric = choice_param(request, 'metric', METRICS, 'revenue')
+        interval = choice_param(request, 'interval', INTERVALS, 'day')
+        product_id = request.query_params.get('product_id')
+        customer_id = request.query_params.get('customer_id')
+        series = rollup.time_series(start, end, metric, interval,
+                                    product_id=int(product_id) if product_id else None,
+                                    customer_id=int(customer_id) if customer_id else None)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    return Response({"start": start, "end": end, "metric": metric, "interval": interval, "series": series})
+
+
+@api_view(['GET'])
+def get_sales_comparison(request):
+    # Period over period: the requested period against previous_start..previous_end, or the equally long period before it
+    try:
+        rollup = get_rollup()
+        start, end = sales_period(request, rollup)
+        previous_start = date_param(request, 'previous_start')
+        previous_end = date_param(request, 'previous_end')
+        limit = limit_param(request, 5, 50)
+        comparison = rollup.compare(start, end, previous_start, previous_end, limit)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    return Response(comparison)
+
+
+async def fetch_resource(name, records, source, page_size):
+    # Blocking fetch in a worker thread, bounded by a per-resource timeout
+    start = time.perf_counter()
+    deadline = time.monotonic() + settings.DASHBOARD_RESOURCE_TIMEOUT
+    def fetch_all():
+        # Runs in a worker thread with the request's context, so the stage lands in its Server-Timing.
+        # wait_for cannot stop the thread, the walk gives up by itself once the deadline passed
+        # instead of spending the call limit on pages nobody waits for
+        data = []
+        with stage(f"{name}_fetch"):
+            for record in records(source, page_size):
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"{name} fetch passed its deadline")
+                data.append(record)
+        return data
+    fetch = sync_to_async(fetch_all, thread_sensitive=False)
+    try:
+        data = await asyncio.wait_for(fetch(), timeout=settings.DASHBOARD_RESOURCE_TIMEOUT)
+        error = None
+    except (asyncio.TimeoutError, TimeoutError):
+        data, error = None, f"timed out after {settings.DASHBOARD_RESOURCE_TIMEOUT}s"
+    except Exception as e:
+        print(f"Error fetching Shopify {name}:", str(e))
+        data, error = None, str(e)
+    return name, data, error, time.perf_counter() - start
+
+
+async def get_dashboard(request):
+    # Products, orders and customers fetched concurrently: page load costs the slowest call, not the sum
+    try:
+        page_size = parse_page_size(request.GET.get('page_size'))
+        source = resolve_source(request.GET.get('source'))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    results = await asyncio.gather(
+        fetch_resource('products', product_records, source, page_size),
+        fetch_resource('orders', order_records, source, page_size),
+        fetch_resource('customers', customer_records, source, page_size),
+    )
+
+    payload = {"errors": {}, "timings": {}}
+    for name, data, error, seconds in results:
+        payload[name] = data
+        payload["timings"][name] = round(seconds, 3)
+        if error:
+            payload["errors"][name] = error
+    # Partial results are still useful to the dashboard, only fail when nothing came back
+    status = 502 if len(payload["errors"]) == len(results) else 200
+    return JsonResponse(payload, status=status)
+
+
+@csrf_exempt
+@require_POST
+def shopify_product_webhook(request):
+    # Only verify and queue here: Shopify expects an answer within 5 seconds, run_index_worker does the indexing
+    if not verify_hmac(request.body, request.headers.get('X-Shopify-Hmac-Sha256')):
+        return JsonResponse({"error": "Invalid webhook signature"}, status=401)
+    topic = request.headers.get('X-Shopify-Topic')
+    if topic not in PRODUCT_TOPICS:
+        # Acknowledge anyway, Shopify keeps retrying (and eventually drops the subscription) on errors
+        return JsonResponse({"queued": False, "ignored_topic": topic})
+    shop = normalize_shop(request.headers.get('X-Shopify-Shop-Domain'))
+    if shop and not is_default_shop(shop):
+        # The mirror and the worker's index only follow the default store
+        return JsonResponse({"queued": False, "ignored_shop": shop})
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict) or 'id' not in payload:
+        return JsonResponse({"error": "Malformed webhook payload"}, status=400)
+    enqueue(topic, payload, request.headers.get('X-Shopify-Webhook-Id'), request.headers.get('X-Shopify-Shop-Domain'))
+    # The product list changed, the next poll fetches it instead of trusting the cached body
+    invalidate('products', shop)
+    return JsonResponse({"queued": True})
@@ -0,0 +1,88 @@
+import base64
+import hashlib
+import hmac
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from .models import Product, WebhookEvent
+from .sync import upsert_products
+
+PRODUCT_TOPICS = ('products/create', 'products/update', 'products/delete')
+
+
+def verify_hmac(body, signature, secret=None):
+    # Shopify signs the raw request body: base64(HMAC-SHA256(app secret, body))
+    secret = secret or settings.SHOPIFY_API_SECRET
+    if not secret or not signature:
+        return False
+    digest = base64.b64encode(hmac.new(secret.encode('utf-8'), body, hashlib.sha256).digest()).decode('ascii')
+    return hmac.compare_digest(digest, signature)
+
+
+def enqueue(topic, payload, webhook_id=None, shop_domain=''):
+    # A redelivered webhook has the same id and is dropped by the unique constraint
+    WebhookEvent.objects.bulk_create([
+        WebhookEvent(webhook_id=webhook_id or None, topic=topic, shop_domain=shop_domain or '',
+                     shopify_id=payload['id'], payload=payload)
+    ], ignore_conflicts=True)
+
+
+def pending_events(limit):
+    return list(WebhookEvent.objects.filter(processed_at__isnull=True).order_by('id')[:limit])
+
+
+def pending_count():
+    return WebhookEvent.objects.filter(processed_at__isnull=True).count()
+
+
+def coalesce(events):
+    """
+    Reduce a batch of product events to the final state of each product: a list of
+    product payloads to upsert and a list of deleted product ids. Webhooks can arrive
+    out of order, so among creates/updates the newest ``updated_at`` wins; a delete
+    wins over any create/update that arrived before it.
+    """
+    latest = {}
+    deleted_at = {}
+    for event in events:
+        if event.topic == 'products/delete':
+            deleted_at[event.shopify_id] = event.id
+            continue
+        updated_at = parse_datetime(event.payload.get('updated_at') or '')
+        key = (updated_at.timestamp() if updated_at else 0, event.id)
+        if event.shopify_id not in latest or key >= latest[event.shopify_id][0]:
+            latest[event.shopify_id] = (key, event)
+
+    upserts = []
+    for shopify_id, ((_, event_id), event) in latest.items():
+        if deleted_at.get(shopify_id, -1) < event_id:
+            upserts.append(event.payload)
+    deleted = [shopify_id for shopify_id, event_id in deleted_at.items()
+               if shopify_id not in latest or latest[shopify_id][0][1] < event_id]
+    return upserts, deleted
+
+
+def drop_stale(upserts):
+    # A late delivery from an earlier batch must not roll back a newer product the mirror already has
+    stored = dict(Product.objects.filter(shopify_id__in=[payload['id'] for payload in upserts])
+                  .exclude(updated_at=None).values_list('shopify_id', 'updated_at'))
+    fresh = []
+    for payload in upserts:
+        updated_at = parse_datetime(payload.get('updated_at') or '')
+        if payload['id'] in stored and updated_at and updated_at < stored[payload['id']]:
+            continue
+        fresh.append(payload)
+    return fresh
+
+
+@transaction.atomic
+def apply_to_mirror(upserts, deleted):
+    # Keeps CATALOG_SOURCE=mirror as fresh as the vector index, returns the upserts that were applied
+    upserts = drop_stale(upserts)
+    if upserts:
+        upsert_products(upserts)
+    if deleted:
+        Product.objects.filter(shopify_id__in=deleted).delete()
+    return upserts